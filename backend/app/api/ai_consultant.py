@@ -1,18 +1,22 @@
 from fastapi import APIRouter, HTTPException, Body
 from app.core.firebase import db
+from app.services import analytics
 import datetime
 import os
-import google.generativeai as genai
 import re
 import traceback
-from collections import defaultdict
+from functools import lru_cache
 
 router = APIRouter()
 
 # ---------- Configuração do Gemini ----------
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-  # ✅ modelo correto
+@lru_cache(maxsize=1)
+def get_model():
+    """Configura o SDK do Gemini apenas na primeira pergunta que precisa do LLM."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel("models/gemini-2.5-flash")  # ✅ modelo correto
 
 # ---------- Funções utilitárias ----------
 def _count_docs_safe(collection_name: str) -> int:
@@ -33,7 +37,9 @@ def _try_first_nonzero(*vals):
 def summarize_data_structured():
     """Lê dados reais do Firestore e retorna resumo estruturado (agora completo)."""
     try:
-        reservas = [r.to_dict() for r in db.collection("reservations").stream()]
+        # Reservas: contagens vetorizadas no snapshot colunar (sem reler todos os documentos)
+        frame = analytics.snapshot.frame()
+        reserva_exemplo = next((r.to_dict() for r in db.collection("reservations").limit(1).stream()), None)
         hospedes = [h.to_dict() for h in db.collection("guests").stream()]
         manutencoes = [m.to_dict() for m in db.collection("maintenance").stream()]
         financeiro = [f.to_dict() for f in db.collection("incomes").stream()]
@@ -51,21 +57,12 @@ def summarize_data_structured():
         total_expenses = sum(float(d.get("amount", 0)) for d in despesas)
         lucro_estimado = total_incomes - total_expenses
 
-        # 🔹 Reservas por mês
-        reservas_por_mes = defaultdict(int)
-        for r in reservas:
-            try:
-                data = r.get("checkIn") or r.get("date")
-                if data:
-                    d = datetime.datetime.strptime(data[:10], "%Y-%m-%d")
-                    chave = f"{d.year}-{d.month:02d}"
-                    reservas_por_mes[chave] += 1
-            except Exception:
-                pass
+        # 🔹 Reservas por mês (do check-in)
+        reservas_por_mes = frame.sum_by_month(frame["checkIn"])
 
         data = {
             "totais": {
-                "reservas": len(reservas),
+                "reservas": len(frame),
                 "hospedes": len(hospedes),
                 "empresas": len(empresas),
                 "manutencoes": len(manutencoes),
@@ -78,10 +75,10 @@ def summarize_data_structured():
                 "lucro_estimado": lucro_estimado,
             },
             "estatisticas": {
-                "reservas_por_mes": dict(reservas_por_mes)
+                "reservas_por_mes": reservas_por_mes
             },
             "amostras": {
-                "reserva_exemplo": reservas[0] if reservas else None,
+                "reserva_exemplo": reserva_exemplo,
                 "hospede_exemplo": hospedes[0] if hospedes else None,
                 "empresa_exemplo": empresas[0] if empresas else None,
                 "financeiro_exemplo": financeiro[0] if financeiro else None,
@@ -167,7 +164,7 @@ def ai_consult(payload: dict = Body(...)):
 
         full_prompt = f"{system_prompt}\n\n=== DADOS ===\n{data}\n\nPergunta: {question}"
 
-        response = model.generate_content(full_prompt)
+        response = get_model().generate_content(full_prompt)
         resposta = (response.text or "").strip()
 
         db.collection("ia_logs").add({
@@ -0,0 +1,126 @@
+# app/api/analytics.py
+import calendar
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services import analytics, forecast, kpis
+
+router = APIRouter()
+
+GROUPS = ("month", "status", "payment", "method", "room", "company")
+MAX_KPI_DAYS = 3 * 366
+
+
+def _parse_day(value: str | None, field: str) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field} inválido (use yyyy-MM-dd)")
+
+
+@router.get("/analytics/snapshot")
+def analytics_snapshot_stats():
+    """Tamanho e memória do snapshot colunar de reservas."""
+    try:
+        return analytics.snapshot.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/reservations")
+def reservations_breakdown(
+    group_by: str = Query("month", alias="groupBy", description=" | ".join(GROUPS)),
+    from_day: str | None = Query(None, alias="from", description="Check-in a partir de (yyyy-MM-dd)"),
+    to_day: str | None = Query(None, alias="to", description="Check-in até (yyyy-MM-dd)"),
+):
+    """
+    Reservas agrupadas (quantidade, noites, valor total e recebido em
+    centavos), calculadas de forma vetorizada sobre o snapshot colunar.
+    """
+    try:
+        import numpy as np
+
+        if group_by not in GROUPS:
+            raise HTTPException(status_code=400, detail=f"groupBy deve ser um de {', '.join(GROUPS)}")
+        first, last = _parse_day(from_day, "from"), _parse_day(to_day, "to")
+
+        frame = analytics.snapshot.frame()
+        check_in = frame["checkIn"]
+        mask = check_in > 0
+        if first:
+            mask &= check_in >= first.toordinal()
+        if last:
+            mask &= check_in <= last.toordinal()
+
+        if group_by == "month":
+            keys = frame.month_index(check_in[mask])
+            low = int(keys.min()) if len(keys) else 0
+            keys = keys - low
+            label = lambda i: frame.month_label(low + i)
+        else:
+            keys = frame[group_by][mask].astype("int64")
+            names = {
+                "status": analytics.STATUS_CODES, "payment": analytics.PAYMENT_CODES,
+                "method": frame.methods, "room": frame.rooms, "company": frame.companies,
+            }[group_by]
+            label = lambda i: names[i] or None
+
+        nights = np.clip(frame["checkOut"][mask] - check_in[mask], 0, None)
+        counts = np.bincount(keys, minlength=1)
+        sums = {
+            "nights": np.bincount(keys, weights=nights, minlength=1),
+            "amountCents": np.bincount(keys, weights=frame["amount"][mask], minlength=1),
+            "receivedCents": np.bincount(keys, weights=frame["received"][mask], minlength=1),
+        }
+        groups = [
+            {"key": label(i), "count": int(counts[i])} | {name: int(values[i]) for name, values in sums.items()}
+            for i in np.flatnonzero(counts)
+        ]
+        return {"groupBy": group_by, "total": int(mask.sum()), "groups": groups}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/kpis")
+def hotel_kpis(
+    from_day: str | None = Query(None, alias="from", description="Data inicial (yyyy-MM-dd, padrão: 1º dia do mês)"),
+    to_day: str | None = Query(None, alias="to", description="Data final inclusiva (yyyy-MM-dd, padrão: fim do mês)"),
+    trend: bool = Query(False, description="Incluir a série mensal do período"),
+):
+    """
+    Ocupação (total e por noite), ADR, RevPAR, permanência média,
+    antecedência e taxa de cancelamento do imóvel, de cada quarto (inclusive
+    quartos de empresas) e de cada empresa. Resultado em cache por período.
+    """
+    try:
+        today = date.today()
+        first = _parse_day(from_day, "from") or today.replace(day=1)
+        last = _parse_day(to_day, "to") or first.replace(day=calendar.monthrange(first.year, first.month)[1])
+        if first > last or (last - first).days >= MAX_KPI_DAYS:
+            raise HTTPException(status_code=400, detail=f"Período inválido (from <= to, até {MAX_KPI_DAYS} dias)")
+        return kpis.cached(first, last, trend)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/forecast")
+def occupancy_forecast(
+    days: int = Query(forecast.HORIZON_DAYS, ge=1, le=forecast.HORIZON_DAYS, description="Dias a partir de hoje"),
+):
+    """
+    Previsão diária de ocupação e receita: carteira já reservada mais a
+    captação esperada (ritmo histórico × sazonalidade de dia da semana e mês).
+    O modelo fica em cache e só a parte recente é recalculada.
+    """
+    try:
+        result = forecast.model.current()
+        return result | {"days": result["days"][:days]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,50 @@
+# app/api/availability.py
+import time
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.api.calendar import parse_date
+from app.services import availability
+
+router = APIRouter()
+
+MAX_WINDOW_DAYS = availability.HORIZON_DAYS
+
+
+# ===========================
+# 🔹 QUARTOS LIVRES NO PERÍODO
+# ===========================
+@router.get("/availability")
+def get_availability(
+    start: str = Query(..., description="Data de entrada (yyyy-MM-dd)"),
+    end: str = Query(..., description="Data de saída (yyyy-MM-dd, exclusiva)"),
+    room_type: str | None = Query(None, alias="roomType"),
+    capacity: int | None = Query(None, ge=1, description="Número mínimo de hóspedes"),
+):
+    """
+    Quartos (inclusive os de empresas) sem reserva nem manutenção em
+    nenhuma noite de [start, end). Quartos sem capacidade conhecida não
+    entram quando `capacity` é informado.
+    """
+    d_start, d_end = parse_date(start), parse_date(end)
+    if d_end <= d_start:
+        raise HTTPException(status_code=400, detail="A data de saída deve ser posterior à de entrada")
+    if (d_end - d_start).days > MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Período máximo: {MAX_WINDOW_DAYS} dias")
+
+    try:
+        availability.index.ensure_fresh()
+        started = time.perf_counter()
+        rooms = availability.index.free_rooms(d_start, d_end, room_type=room_type, min_capacity=capacity)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "start": start,
+        "end": end,
+        "nights": (d_end - d_start).days,
+        "count": len(rooms),
+        "rooms": [room.as_dict() for room in rooms],
+        "queryMs": round(elapsed_ms, 3),
+    }
@@ -1,8 +1,11 @@
 # app/api/calendar.py
-from fastapi import APIRouter, HTTPException, Query, Body
-from app.core.firebase import db
-from datetime import datetime
-from google.cloud import firestore
+import threading
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response
+from app.core import cache, events, versions
+from app.core.firebase import db, firestore
+from app.services import analytics, availability, financial_rollups, reservation_model, room_calendar
+from datetime import datetime, date, timedelta
 
 router = APIRouter()
 
@@ -17,6 +20,17 @@ def parse_date(date_str: str):
         raise HTTPException(status_code=400, detail=f"Data inválida: {date_str}")
 
 
+def reservations_checking_out_since(first_day: date) -> list[dict]:
+    """
+    Reservas com checkOut >= first_day.
+    Usa o cache de reservas recentes quando ele cobre o período pedido;
+    para períodos antigos faz a varredura completa.
+    """
+    if first_day >= cache.recent_cutoff():
+        return cache.get("reservations_recent")
+    return [(doc.to_dict() or {}) | {"id": doc.id} for doc in db.collection("reservations").stream()]
+
+
 # ------------------------------------------------------------
 # ✅ 1. Endpoint — Ocupação mensal
 # ------------------------------------------------------------
@@ -26,38 +40,17 @@ def get_month_occupancy(
     month: int = Query(..., description="Mês (1-12)"),
 ):
     """
-    Retorna a contagem de reservas para cada dia do mês.
+    Retorna a contagem de reservas para cada dia do mês
+    (vetorizada sobre o snapshot colunar de `analytics`).
     """
     try:
-        reservations_ref = db.collection("reservations").get()
-
         # calcula quantos dias tem no mês
         from calendar import monthrange
         total_days = monthrange(year, month)[1]
 
-        daily_counts = {day: 0 for day in range(1, total_days + 1)}
-
-        for doc in reservations_ref:
-            data = doc.to_dict()
-            if data.get("status") == "cancelado":
-                continue
-
-            check_in = data.get("checkIn")
-            check_out = data.get("checkOut")
-
-            if not check_in or not check_out:
-                continue
-
-            try:
-                d_in = datetime.strptime(check_in, "%Y-%m-%d").date()
-                d_out = datetime.strptime(check_out, "%Y-%m-%d").date()
-            except:
-                continue
-
-            for day in range(1, total_days + 1):
-                d = datetime(year, month, day).date()
-                if d_in <= d < d_out:
-                    daily_counts[day] += 1
+        # noites [checkIn, checkOut) das reservas não canceladas, recortadas ao mês
+        counts = analytics.snapshot.frame().occupancy(date(year, month, 1), total_days)
+        daily_counts = {day: int(count) for day, count in enumerate(counts, start=1)}
 
         return {"year": year, "month": month, "days": daily_counts}
 
@@ -75,32 +68,14 @@ def get_daily_movements(date: str = Query(...)):
     checkins = []
     checkouts = []
 
-    reservations_ref = db.collection("reservations").stream()
-    for res in reservations_ref:
-        data = res.to_dict()
-
+    for data in reservations_checking_out_since(selected_date):
         # Valida datas
-        check_in = data.get("checkIn")
-        check_out = data.get("checkOut")
-        if not check_in or not check_out:
+        d_in = reservation_model.check_in_date(data)
+        d_out = reservation_model.check_out_date(data)
+        if not d_in or not d_out:
             continue
 
-        try:
-            d_in = datetime.strptime(check_in, "%Y-%m-%d").date()
-            d_out = datetime.strptime(check_out, "%Y-%m-%d").date()
-        except:
-            continue
-
-        # 🔹 Corrige os campos
-        guest_name = (
-            data.get("guestOrCompany")
-            or data.get("guestName")
-            or data.get("companyName")
-            or data.get("guest")
-            or "—"
-        )
-
-       
+        guest_name = reservation_model.display_name(data)
 
         room_number = (
             data.get("room")
@@ -144,6 +119,14 @@ def create_pre_reservation(payload: dict = Body(...)):
         if not all([check_in, check_out, room_number]):
             raise HTTPException(status_code=400, detail="Campos obrigatórios: checkIn, checkOut, roomNumber")
 
+        d_in, d_out = parse_date(check_in), parse_date(check_out)
+        if d_out <= d_in:
+            raise HTTPException(status_code=400, detail="checkOut deve ser posterior ao checkIn")
+
+        room_key = room_calendar.key_for(room_number)
+        if room_key is None:
+            raise HTTPException(status_code=404, detail=f"Quarto não encontrado: {room_number}")
+
         new_doc = {
             "status": "confirmado",
             "checkIn": check_in,
@@ -155,10 +138,131 @@ def create_pre_reservation(payload: dict = Body(...)):
             "createdAt": firestore.SERVER_TIMESTAMP,
         }
 
-        # Cria no Firestore (coleção 'reservations')
-        db.collection("reservations").add(new_doc)
+        # Verificação de sobreposição e insert na mesma transação (409 em conflito)
+        res_ref = db.collection("reservations").document()
 
-        return {"message": "Pré-reserva criada com sucesso", "data": new_doc}
+        def insert(transaction):
+            room_calendar.reserve(transaction, room_key, res_ref.id, d_in, d_out)
+            doc = reservation_model.normalize(new_doc)
+            transaction.set(res_ref, doc)
+            financial_rollups.stage_change(transaction, "reservations", None, doc)
+
+        firestore.transactional(insert)(db.transaction())
+        versions.bump("reservations")
+        events.publish("reservation", {"id": res_ref.id, "action": "created", "roomId": room_number})
+
+        return {"message": "Pré-reserva criada com sucesso", "id": res_ref.id, "data": new_doc}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+
+# ------------------------------------------------------------
+# 🔧 Reconstrói as agendas por quarto (verificação de sobreposição)
+# ------------------------------------------------------------
+@router.post("/calendar/room-calendars/rebuild")
+def rebuild_room_calendars():
+    """
+    Reconcilia `room_calendars` com as reservas (um quarto por transação).
+    Use após alterações feitas direto no Firestore; pode rodar com a
+    recepção em operação.
+    """
+    try:
+        return room_calendar.rebuild()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ------------------------------------------------------------
+# ✅ 4. Endpoint — Grade quarto × dia (visão Gantt)
+# ------------------------------------------------------------
+GRID_MAX_DAYS = 366
+GRID_CACHE_SIZE = 32
+MAINTENANCE_CELL = "manutencao"
+
+_grid_cache: OrderedDict = OrderedDict()  # (início, dias, geração do índice) -> grade
+_grid_lock = threading.Lock()
+
+
+def _run_length(cells: list) -> list[list]:
+    """[(id, status) | None por dia] -> [[dia_inicial, qtd_dias, id, status], ...] (dias vazios omitidos)."""
+    runs = []
+    for day, cell in enumerate(cells):
+        if cell is None:
+            continue
+        if runs and runs[-1][0] + runs[-1][1] == day and (runs[-1][2], runs[-1][3]) == cell:
+            runs[-1][1] += 1
+        else:
+            runs.append([day, 1, *cell])
+    return runs
+
+
+def _build_grid(first_day: date, days: int) -> dict:
+    window_start = availability.day_index(first_day)
+    rows = []
+    for room, stays, blocks in availability.index.timeline(first_day, first_day + timedelta(days=days)):
+        cells = [None] * days
+        for start, end in blocks:
+            for i in range(max(start - window_start, 0), min(end - window_start, days)):
+                cells[i] = (None, MAINTENANCE_CELL)
+        for stay in stays:
+            for i in range(max(stay.start - window_start, 0), min(stay.end - window_start, days)):
+                cells[i] = (stay.id, stay.status)
+        rows.append({**room.as_dict(), "runs": _run_length(cells)})
+
+    rows.sort(key=lambda r: (r["companyId"] or "", r["number"].zfill(8)))
+    return {
+        "start": first_day.isoformat(),
+        "days": days,
+        "columns": ["day", "length", "stayId", "status"],
+        "statuses": [
+            availability.STAY_RESERVED, availability.STAY_IN_HOUSE,
+            availability.STAY_DONE, MAINTENANCE_CELL,
+        ],
+        "rooms": rows,
+    }
+
+
+@router.get("/calendar/grid")
+def get_calendar_grid(
+    request: Request,
+    response: Response,
+    start: str = Query(..., description="Primeiro dia (yyyy-MM-dd)"),
+    days: int = Query(60, ge=1, le=GRID_MAX_DAYS),
+):
+    """
+    Matriz quarto × dia para a janela [start, start + days).
+    Cada quarto traz `runs` = [dia, qtd_dias, id_da_estadia, status] com
+    dias consecutivos da mesma estadia agrupados (run-length); `dia` é o
+    deslocamento a partir de `start` e dias livres não aparecem.
+    Manutenção aparece com `stayId` nulo e status "manutencao".
+    """
+    first_day = parse_date(start)
+    if first_day < date.today() - timedelta(days=availability.LOOKBACK_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"A grade cobre no máximo {availability.LOOKBACK_DAYS} dias para trás",
+        )
+    not_modified = versions.conditional(request, response, "rooms", "companies", "reservations", "maintenance")
+    if not_modified:
+        return not_modified
+
+    try:
+        availability.index.ensure_fresh()
+        key = (first_day, days, availability.index.generation)
+        with _grid_lock:
+            grid = _grid_cache.get(key)
+            if grid is not None:
+                _grid_cache.move_to_end(key)
+                return grid
+
+        grid = _build_grid(first_day, days)
+        with _grid_lock:
+            _grid_cache[key] = grid
+            while len(_grid_cache) > GRID_CACHE_SIZE:
+                _grid_cache.popitem(last=False)
+        return grid
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,78 @@
+# app/api/cash_close.py
+from datetime import date, timedelta
+
+from fastapi import APIRouter, HTTPException, Body, Query
+
+from app.services import cash_close
+
+router = APIRouter()
+
+MAX_RANGE_DAYS = 366
+
+
+@router.get("/cash-close")
+def list_cash_closes(
+    from_day: str | None = Query(None, alias="from", description="Data inicial (yyyy-MM-dd)"),
+    to_day: str | None = Query(None, alias="to", description="Data final (yyyy-MM-dd, padrão: ontem)"),
+    entries: bool = Query(False, description="Incluir lançamentos e despesas de cada dia"),
+):
+    """Fechamentos do período (um documento por dia), dias ainda abertos e a soma."""
+    try:
+        last = cash_close.parse_day(to_day) if to_day else date.today() - timedelta(days=1)
+        first = cash_close.parse_day(from_day) if from_day else last.replace(day=1)
+        if first > last or (last - first).days >= MAX_RANGE_DAYS:
+            raise HTTPException(status_code=400, detail=f"Período inválido (from <= to, até {MAX_RANGE_DAYS} dias)")
+        return cash_close.read_range(first, last, with_entries=entries)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/cash-close/close-pending")
+def close_pending_days():
+    """Fecha os dias anteriores ainda abertos (mesmo job do CASH_CLOSE_AUTO)."""
+    try:
+        return {"closed": cash_close.close_pending()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cash-close/{day}")
+def get_cash_close(day: str):
+    """Fechamento gravado do dia; se ainda aberto, uma prévia calculada (`closed: false`)."""
+    try:
+        d = cash_close.parse_day(day)
+        closed = cash_close.get(d)
+        if closed is not None:
+            return closed | {"closed": True}
+        return cash_close.compute(d) | {"closed": False}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/cash-close/{day}")
+def close_day(day: str, payload: dict = Body(default={})):
+    """Fecha o caixa do dia (imutável; 409 se já fechado)."""
+    try:
+        snapshot = cash_close.close(cash_close.parse_day(day), payload.get("closedBy"))
+        return {"message": f"Caixa de {day} fechado", "close": snapshot}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cash-close/{day}/reconcile")
+def reconcile_day(day: str):
+    """Diferença entre o fechamento gravado e os documentos atuais do dia."""
+    try:
+        return cash_close.reconcile(cash_close.parse_day(day))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from datetime import date
-from firebase_admin import firestore
+from app.core import versions
+from app.core.firebase import db
 
 router = APIRouter()
-db = firestore.client()
 
 # =====================================================
 # 🔹 MODELO Pydantic
@@ -19,37 +19,15 @@ class Company(BaseModel):
 
 
 
-# =====================================================
-# 🔹 FUNÇÃO AUXILIAR — Atualiza status e informações do quarto
-# =====================================================
-def update_room_status(room_id: str, new_status: str, company_name: str = None, notes: str = None):
-    """
-    Atualiza o status do quarto e os dados da empresa no Firestore.
-    """
-    try:
-        room_ref = db.collection("rooms").document(room_id)
-        update_data = {"status": new_status}
-
-        if new_status == "disponível":
-            update_data["guest"] = None
-            update_data["guestNotes"] = None
-        else:
-            update_data["guest"] = company_name or ""
-            update_data["guestNotes"] = notes or ""
-
-        room_ref.update(update_data)
-        print(f"✅ Quarto {room_id} → {new_status} | Empresa: {company_name or '—'} | Notas: {notes or '—'}")
-
-    except Exception as e:
-        print(f"⚠️ Erro ao atualizar status do quarto {room_id}: {e}")
-
-
 # =====================================================
 # 🔹 LISTAR EMPRESAS
 # =====================================================
 @router.get("/companies")
-def get_companies():
+def get_companies(request: Request, response: Response):
     """Lista todas as empresas"""
+    not_modified = versions.conditional(request, response, "companies")
+    if not_modified:
+        return not_modified
     try:
         companies = []
         for doc in db.collection("companies").stream():
@@ -78,6 +56,7 @@ def create_company(company: dict):
             "createdAt": date.today().isoformat(),
         }
         company_ref.set(company_data)
+        versions.bump("companies")
 
         return {
             "message": "Empresa criada com sucesso!",
@@ -107,6 +86,7 @@ def update_company(company_id: str, company: Company):
             "email": company.email or "",
             "phone": company.phone or "",
         })
+        versions.bump("companies")
 
         print(f"✏️ Empresa {company_id} atualizada com sucesso.")
         return {"message": "Empresa atualizada com sucesso!"}
@@ -129,6 +109,7 @@ def delete_company(company_id: str):
             raise HTTPException(status_code=404, detail="Empresa não encontrada.")
 
         company_ref.delete()
+        versions.bump("companies")
         return {"message": "Empresa removida com sucesso."}
 
     except Exception as e:
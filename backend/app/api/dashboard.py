@@ -1,10 +1,13 @@
 from fastapi import APIRouter, HTTPException
-from datetime import datetime, date
-from app.core.firebase import db
+from datetime import date
+from app.core import cache
+from app.core.singleflight import coalesce
+from app.services import reservation_model
 
 router = APIRouter()
 
 @router.get("/dashboard")
+@coalesce("dashboard", ttl=5, collections=("reservations", "rooms", "companies", "maintenance"))
 def get_dashboard():
     """
     Retorna informações resumidas para o dashboard principal.
@@ -13,10 +16,11 @@ def get_dashboard():
     try:
         today = date.today()
 
-        # --- Coleções principais ---
-        reservations_ref = db.collection("reservations").stream()
-        rooms_ref = db.collection("rooms").stream()
-        companies_ref = db.collection("companies").stream()
+        # --- Coleções principais (cache em memória) ---
+        # Check-ins/check-outs de hoje sempre estão entre as reservas recentes
+        reservations = cache.get("reservations_recent")
+        rooms = cache.get("rooms")
+        company_rooms = cache.get("company_rooms")
 
         total_rooms = 0
         occupied_rooms = 0
@@ -30,8 +34,7 @@ def get_dashboard():
         rooms_map = {}
 
         # 🔹 Coleta quartos principais
-        for r in rooms_ref:
-            room = r.to_dict()
+        for room in rooms:
             total_rooms += 1
             status = room.get("status", "").lower()
 
@@ -40,7 +43,7 @@ def get_dashboard():
                 room.get("name")
                 or room.get("number")
                 or room.get("roomNumber")
-                or r.id
+                or room["id"]
             )
 
             # Remove prefixos e espaços extras
@@ -53,7 +56,7 @@ def get_dashboard():
                 .strip()
             )
 
-            rooms_map[r.id] = room_clean
+            rooms_map[room["id"]] = room_clean
 
             if status == "ocupado":
                 occupied_rooms += 1
@@ -63,59 +66,46 @@ def get_dashboard():
                 available_rooms += 1
 
         # 🔹 Coleta quartos de empresas (subcoleções)
-        for company in companies_ref:
-            sub_rooms = db.collection(f"companies/{company.id}/rooms").stream()
-            for r in sub_rooms:
-                d = r.to_dict()
-                total_rooms += 1
-
-                raw_name = (
-                    d.get("name")
-                    or d.get("number")
-                    or d.get("roomNumber")
-                    or r.id
-                )
+        for d in company_rooms:
+            total_rooms += 1
 
-                room_clean = (
-                    str(raw_name)
-                    .replace("RM-", "")
-                    .replace("RM ", "")
-                    .replace("Quarto", "")
-                    .replace("QUARTO", "")
-                    .strip()
-                )
+            raw_name = (
+                d.get("name")
+                or d.get("number")
+                or d.get("roomNumber")
+                or d["id"]
+            )
 
-                rooms_map[r.id] = room_clean
+            room_clean = (
+                str(raw_name)
+                .replace("RM-", "")
+                .replace("RM ", "")
+                .replace("Quarto", "")
+                .replace("QUARTO", "")
+                .strip()
+            )
 
-                status = d.get("status", "").lower()
-                if status == "ocupado":
-                    occupied_rooms += 1
-                elif status == "manutenção":
-                    maintenance_rooms += 1
-                else:
-                    available_rooms += 1
+            rooms_map[d["id"]] = room_clean
+
+            status = d.get("status", "").lower()
+            if status == "ocupado":
+                occupied_rooms += 1
+            elif status == "manutenção":
+                maintenance_rooms += 1
+            else:
+                available_rooms += 1
 
         # 🔹 Processa reservas do dia
-        for res in reservations_ref:
-            data = res.to_dict()
+        for data in reservations:
 
             # Pega datas de checkin e checkout
-            try:
-                check_in = datetime.strptime(data.get("checkIn"), "%Y-%m-%d").date()
-                check_out = datetime.strptime(data.get("checkOut"), "%Y-%m-%d").date()
-            except Exception:
+            check_in = reservation_model.check_in_date(data)
+            check_out = reservation_model.check_out_date(data)
+            if not check_in or not check_out:
                 continue
 
             # Nome do hóspede / empresa
-            guest_name = (
-                data.get("guestOrCompany")
-                or data.get("guestName")
-                or data.get("guest")
-                or data.get("name")
-                or data.get("companyName")
-                or data.get("company")
-                or "—"
-            )
+            guest_name = reservation_model.display_name(data)
 
             # 🔹 Resolve nome do quarto (por ID, número ou texto direto)
             room_ref = data.get("room") or data.get("roomNumber") or data.get("room_name")
@@ -150,7 +140,7 @@ def get_dashboard():
             # 🔹 Check-ins de hoje
             if check_in == today:
                 checkins_today.append({
-                    "id": res.id,
+                    "id": data["id"],
                     "guest": guest_name,
                     "room": room_name,
                 })
@@ -158,7 +148,7 @@ def get_dashboard():
             # 🔹 Check-outs de hoje
             if check_out == today:
                 checkouts_today.append({
-                    "id": res.id,
+                    "id": data["id"],
                     "guest": guest_name,
                     "room": room_name,
                 })
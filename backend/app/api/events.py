@@ -0,0 +1,75 @@
+# app/api/events.py
+import asyncio
+import json
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core import events
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+
+
+def _format(event: events.Event) -> str:
+    payload = json.dumps({"type": event.type, "ts": event.ts, **event.data}, ensure_ascii=False, default=str)
+    return f"id: {event.id}\nevent: {event.type}\ndata: {payload}\n\n"
+
+
+# ===========================
+# 🔹 FEED DE MUDANÇAS (SSE)
+# ===========================
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    types: str | None = Query(None, description="Filtro por tipo, ex.: room.status,reservation"),
+    last_event_id: str | None = Header(None),
+    last_id: str | None = Query(None, alias="lastEventId"),
+):
+    """
+    Stream Server-Sent Events com mudanças de status de quartos, reservas e
+    manutenções. Reconexões com `Last-Event-ID` recebem os eventos perdidos;
+    se não for possível, o servidor envia `reset` e o cliente deve recarregar
+    as listas completas.
+    """
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    resume_from = last_event_id or last_id
+
+    async def stream():
+        # Assina antes do replay para não perder eventos publicados no meio
+        queue = events.subscribe()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+
+            backlog = events.replay(resume_from)
+            last_seq = 0
+            if backlog is None:
+                yield "event: reset\ndata: {}\n\n"
+                backlog = []
+
+            for event in backlog:
+                last_seq = event.seq
+                if wanted is None or event.type in wanted:
+                    yield _format(event)
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event.seq <= last_seq:
+                    continue
+                last_seq = event.seq
+                if wanted is None or event.type in wanted:
+                    yield _format(event)
+        finally:
+            events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
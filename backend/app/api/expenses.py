@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Body
-from app.core.firebase import db
-from google.cloud import firestore
+from fastapi import APIRouter, HTTPException, Body, Query
+from app.core import versions
+from app.core.firebase import db, firestore
+from app.core.singleflight import coalesce
+from app.services import expense_analytics, financial_rollups
 from typing import Dict, Any
+from datetime import date
+import re
 
 router = APIRouter()
 
+MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+MAX_ANALYTICS_MONTHS = 120
+
 @router.get("/expenses")
 def list_expenses():
     """
@@ -41,14 +48,47 @@ def create_expense(payload: Dict[str, Any] = Body(...)):
         if not all([description, category, date, amount]):
             raise HTTPException(status_code=400, detail="Campos obrigatórios ausentes.")
 
-        db.collection("expenses").add({
+        expense = {
             "description": description,
             "category": category,
             "date": date,
             "amount": amount,
             "createdAt": firestore.SERVER_TIMESTAMP,
-        })
+        }
+        # Despesa e consolidado do mês no mesmo commit
+        batch = db.batch()
+        batch.set(db.collection("expenses").document(), expense)
+        financial_rollups.stage_change(batch, "expenses", None, expense)
+        batch.commit()
+        versions.bump("expenses")
 
         return {"message": "Despesa adicionada com sucesso"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/expenses/analytics")
+@coalesce("expense-analytics", ttl=10, collections=("expenses", "settings"))
+def expense_analytics_report(
+    from_month: str | None = Query(None, alias="from", description="Mês inicial (yyyy-MM, padrão: 11 meses atrás)"),
+    to_month: str | None = Query(None, alias="to", description="Mês final (yyyy-MM, padrão: mês atual)"),
+):
+    """
+    Despesas por categoria × mês (consolidados `financial_monthly`), variação
+    mês a mês e, para o mês corrente, projeção contra os orçamentos de
+    settings.expenseBudgets.
+    """
+    today = date.today()
+    last = to_month or today.strftime("%Y-%m")
+    first = from_month or last
+    if not (MONTH_RE.match(first) and MONTH_RE.match(last)) or first > last:
+        raise HTTPException(status_code=400, detail="Use from/to no formato yyyy-MM, com from <= to")
+    if not from_month:
+        # padrão: 12 meses terminando em `to`
+        first = financial_rollups.months_between(f"{int(last[:4]) - 1:04d}-{last[5:7]}", last)[1]
+    if len(financial_rollups.months_between(first, last)) > MAX_ANALYTICS_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Período máximo de {MAX_ANALYTICS_MONTHS} meses")
+    try:
+        return expense_analytics.analyze(first, last, today)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,115 @@
-from fastapi import APIRouter, HTTPException
+import calendar
+import re
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
 from app.core.firebase import db
+from app.core.singleflight import coalesce
 from app.api.reservations import safe_float  # função segura de conversão
+from app.services import cash_close, financial_rollups, receivables, reservation_model
 
 router = APIRouter()
 
+MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+PAYMENT_METHODS = ("Cartão", "PIX", "Dinheiro", "Transferência")
+
+
+def brl(value: float) -> str:
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _insights(total_revenue: float, pending_value: float, total_expenses: float) -> list[str]:
+    insights = []
+    if pending_value > 0:
+        insights.append("Existem reservas pendentes aguardando pagamento.")
+    if total_revenue > 0:
+        insights.append("Reservas confirmadas e receitas manuais estão gerando receita consistente.")
+    if total_expenses > 0:
+        insights.append("Despesas registradas estão afetando o lucro estimado.")
+    if total_revenue - total_expenses < 0:
+        insights.append("Lucro negativo — reveja tarifas e custos operacionais.")
+    return insights
+
+
+def _reservation_entry(doc_id: str, data: dict):
+    """
+    (é_empresa, entrada da lista, recebido, em_aberto) de uma reserva, ou
+    None se não entra na lista. Parcialmente paga: o recebido conta como
+    receita e só o saldo fica em aberto.
+    """
+    valor_total = reservation_model.amount(data)
+    valor_pago = reservation_model.amount_received(data)
+
+    # Definir status de pagamento
+    status_pagamento = (data.get("paymentStatus") or data.get("statusPagamento") or "").lower()
+
+    if not status_pagamento:
+        # fallback inteligente
+        if valor_pago <= 0 and valor_total > 0:
+            status_pagamento = "pendente"
+        elif valor_pago >= valor_total:
+            status_pagamento = "pago"
+
+    if "pendente" in status_pagamento or "parcial" in status_pagamento:
+        # Saldo devedor mantido pelo livro de pagamentos (total − recebido nos antigos)
+        recebido = max(valor_pago, 0.0)
+        status, valor = "Em aberto", reservation_model.balance_due(data) or max(valor_total - recebido, 0.0)
+    elif any(k in status_pagamento for k in ["confirmado", "pago", "aprovado"]):
+        status, valor = "Pago", valor_pago if valor_pago > 0 else valor_total
+        recebido = valor
+    else:
+        return None
+
+    entry = {
+        "id": doc_id,
+        "name": reservation_model.display_name(data),
+        "dueDate": data.get("checkOut") or "--",
+        "amount": brl(valor),
+        "status": status,
+    }
+    is_company = bool(data.get("companyName") or data.get("companyId"))
+    return is_company, entry, recebido, valor if status == "Em aberto" else 0.0
+
+
+def _income_entry(doc_id: str, data: dict) -> dict:
+    return {
+        "id": doc_id,
+        "name": data.get("description") or "Receita manual",
+        "dueDate": data.get("date"),
+        "amount": brl(safe_float(data.get("amount") or 0)),
+        "status": "Pago",
+    }
+
+
+def _by_due_date(entries: list[dict]) -> list[dict]:
+    """Em aberto primeiro, depois por vencimento (mais antigo no topo)."""
+    return sorted(entries, key=lambda e: (e["status"] != "Em aberto", str(e.get("dueDate") or "")))
+
+
 @router.get("/financial-dashboard")
-def get_financial_dashboard():
+@coalesce("financial-dashboard", ttl=10, collections=("reservations", "incomes", "expenses"))
+def get_financial_dashboard(
+    from_month: str | None = Query(None, alias="from", description="Mês inicial (yyyy-MM)"),
+    to_month: str | None = Query(None, alias="to", description="Mês final (yyyy-MM)"),
+):
     """
     Dashboard financeiro:
     - Reservas automáticas (pendentes e pagas)
     - Receitas manuais (incomes)
     - Despesas (expenses)
+
+    Com `from`/`to` os totais vêm dos fechamentos de caixa imutáveis
+    `cash_close/{dia}` (dias ainda abertos são calculados na hora) e as
+    listas só das reservas/receitas do período.
     """
+    if from_month or to_month:
+        first, last = from_month or to_month, to_month or from_month
+        if not (MONTH_RE.match(first) and MONTH_RE.match(last)) or first > last:
+            raise HTTPException(status_code=400, detail="Use from/to no formato yyyy-MM, com from <= to")
+        try:
+            return _period_dashboard(first, last)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
     try:
         reservations_ref = db.collection("reservations").stream()
@@ -22,12 +120,7 @@ def get_financial_dashboard():
         pending_value = 0.0
         total_expenses = 0.0
 
-        payment_methods = {
-            "Cartão": 0.0,
-            "PIX": 0.0,
-            "Dinheiro": 0.0,
-            "Transferência": 0.0,
-        }
+        payment_methods = {method: 0.0 for method in PAYMENT_METHODS}
 
         receivables_companies = []
         receivables_general = []
@@ -37,114 +130,126 @@ def get_financial_dashboard():
             data = res.to_dict() or {}
 
             # Ignorar canceladas
-            if "cancelado" in (data.get("status") or "").lower():
+            if reservation_model.stay_status(data) == reservation_model.STATUS_CANCELED:
+                continue
+
+            result = _reservation_entry(res.id, data)
+            if result is None:
                 continue
+            is_company, entry, recebido, em_aberto = result
+            (receivables_companies if is_company else receivables_general).append(entry)
 
-            valor_total = safe_float(data.get("value") or data.get("totalAmount") or 0)
-            valor_pago = safe_float(data.get("amountReceived") or 0)
-            metodo = data.get("paymentMethod") or "Outros"
-
-            # Definir status de pagamento
-            status_pagamento = (data.get("paymentStatus") or data.get("statusPagamento") or "").lower()
-
-            if not status_pagamento:
-                # fallback inteligente
-                if valor_pago <= 0 and valor_total > 0:
-                    status_pagamento = "pendente"
-                elif valor_pago >= valor_total:
-                    status_pagamento = "pago"
-
-            guest = (
-                data.get("guestOrCompany")
-                or data.get("guestName")
-                or data.get("companyName")
-                or "—"
-            )
-            due_date = data.get("checkOut") or "--"
-            is_company = bool(data.get("companyName") or data.get("companyId"))
-
-            # PENDENTE
-            if "pendente" in status_pagamento:
-                pending_value += valor_total
-                entry = {
-                    "id": res.id,
-                    "name": guest,
-                    "dueDate": due_date,
-                    "amount": f"R$ {valor_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                    "status": "Em aberto",
-                }
-                (receivables_companies if is_company else receivables_general).append(entry)
-
-            # PAGO
-            elif any(k in status_pagamento for k in ["confirmado", "pago", "aprovado"]):
-                valor_final = valor_pago if valor_pago > 0 else valor_total
-                total_revenue += valor_final
-                entry = {
-                    "id": res.id,
-                    "name": guest,
-                    "dueDate": due_date,
-                    "amount": f"R$ {valor_final:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                    "status": "Pago",
-                }
-                (receivables_companies if is_company else receivables_general).append(entry)
-                payment_methods[metodo] = payment_methods.get(metodo, 0.0) + valor_final
+            pending_value += em_aberto
+            if recebido > 0:
+                total_revenue += recebido
+                metodo = data.get("paymentMethod") or "Outros"
+                payment_methods[metodo] = payment_methods.get(metodo, 0.0) + recebido
 
         # 🔸 Receitas manuais
         for inc in incomes_ref:
             data = inc.to_dict() or {}
+            if data.get("duplicateOf"):
+                continue  # mesma entrada do pagamento da reserva
             valor = safe_float(data.get("amount") or 0)
             metodo = data.get("method") or "Outros"
 
             total_revenue += valor
             payment_methods[metodo] = payment_methods.get(metodo, 0.0) + valor
-
-            receivables_general.append({
-                "id": inc.id,
-                "name": data.get("description") or "Receita manual",
-                "dueDate": data.get("date"),
-                "amount": f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                "status": "Pago",
-            })
+            receivables_general.append(_income_entry(inc.id, data))
 
         # 🔻 Despesas
         for e in expenses_ref:
             data = e.to_dict() or {}
             total_expenses += safe_float(data.get("amount") or 0)
 
-        # KPIs principais
-        estimated_profit = total_revenue - total_expenses
-        kpis = {
-            "grossRevenue": f"R$ {total_revenue:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-            "receivables": f"R$ {pending_value:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-            "expenses": f"R$ {total_expenses:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-            "estimatedProfit": f"R$ {estimated_profit:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-        }
-
-        # Insights
-        insights = []
-        if pending_value > 0:
-            insights.append("Existem reservas pendentes aguardando pagamento.")
-        if total_revenue > 0:
-            insights.append("Reservas confirmadas e receitas manuais estão gerando receita consistente.")
-        if total_expenses > 0:
-            insights.append("Despesas registradas estão afetando o lucro estimado.")
-        if estimated_profit < 0:
-            insights.append("Lucro negativo — reveja tarifas e custos operacionais.")
-
-        # Distribuição de métodos de pagamento
-        payment_overview = [
-            {"method": k, "amount": f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")}
-            for k, v in payment_methods.items() if v > 0
-        ]
-
         return {
-            "kpis": kpis,
-            "paymentOverview": payment_overview,
-            "insights": insights,
-            "receivablesCompanies": receivables_companies,
-            "receivablesGeneral": receivables_general,
+            "kpis": {
+                "grossRevenue": brl(total_revenue),
+                "receivables": brl(pending_value),
+                "expenses": brl(total_expenses),
+                "estimatedProfit": brl(total_revenue - total_expenses),
+            },
+            "paymentOverview": [
+                {"method": k, "amount": brl(v)} for k, v in payment_methods.items() if v > 0
+            ],
+            "insights": _insights(total_revenue, pending_value, total_expenses),
+            "receivablesAging": receivables.index.summary(),
+            "receivablesCompanies": _by_due_date(receivables_companies),
+            "receivablesGeneral": _by_due_date(receivables_general),
         }
 
     except Exception as e:
         print("💥 ERRO FINANCIAL DASHBOARD:", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _period_dashboard(first: str, last: str) -> dict:
+    start = date(int(first[:4]), int(first[5:7]), 1)
+    end = date(int(last[:4]), int(last[5:7]), calendar.monthrange(int(last[:4]), int(last[5:7]))[1])
+
+    # Dias fechados saem de cash_close (edições posteriores não mudam o passado)
+    period = cash_close.period_totals(start, end)
+    totals = period["totals"]
+    total_revenue = totals["revenueCents"] / 100
+    total_expenses = totals["expensesCents"] / 100
+
+    methods = {method: 0 for method in PAYMENT_METHODS} | totals["revenueByMethod"]
+
+    # Listas: reservas com checkOut no período (consulta por intervalo em checkOutOrd)
+    receivables_companies, receivables_general = [], []
+    pending_value = 0.0
+
+    query = (
+        db.collection("reservations")
+        .where("checkOutOrd", ">=", start.toordinal())
+        .where("checkOutOrd", "<=", end.toordinal())
+    )
+    for res in query.stream():
+        data = res.to_dict() or {}
+        if reservation_model.stay_status(data) == reservation_model.STATUS_CANCELED:
+            continue
+        result = _reservation_entry(res.id, data)
+        if result:
+            is_company, entry, _, em_aberto = result
+            (receivables_companies if is_company else receivables_general).append(entry)
+            pending_value += em_aberto
+
+    incomes = (
+        db.collection("incomes")
+        .where("date", ">=", start.isoformat())
+        .where("date", "<=", end.isoformat())
+    )
+    receivables_general.extend(
+        _income_entry(inc.id, data) for inc in incomes.stream()
+        if not (data := inc.to_dict() or {}).get("duplicateOf")
+    )
+
+    return {
+        "period": {"from": first, "to": last, "closedDays": len(period["closedDays"]),
+                   "openDays": len(period["openDays"])},
+        "kpis": {
+            "grossRevenue": brl(total_revenue),
+            "receivables": brl(pending_value),
+            "expenses": brl(total_expenses),
+            "estimatedProfit": brl(totals["netCents"] / 100),
+        },
+        "paymentOverview": [
+            {"method": k, "amount": brl(v / 100)} for k, v in methods.items() if v > 0
+        ],
+        "expensesByCategory": [
+            {"category": k, "amount": brl(v / 100)}
+            for k, v in sorted(totals["expensesByCategory"].items(), key=lambda kv: -kv[1])
+        ],
+        "insights": _insights(total_revenue, pending_value, total_expenses),
+        "receivablesCompanies": _by_due_date(receivables_companies),
+        "receivablesGeneral": _by_due_date(receivables_general),
+    }
+
+
+@router.post("/financial-dashboard/rebuild-rollups")
+def rebuild_financial_rollups():
+    """Recalcula `financial_monthly` a partir de reservas, receitas e despesas."""
+    try:
+        return financial_rollups.rebuild()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
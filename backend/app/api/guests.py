@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from datetime import date
-from firebase_admin import firestore
+from app.core import versions
+from app.core.firebase import db
 
 router = APIRouter()
-db = firestore.client()
 
 # =====================================================
 # 🔹 MODELO Pydantic
@@ -16,38 +16,15 @@ class Guest(BaseModel):
     email: str | None = None
 
 
-# =====================================================
-# 🔹 FUNÇÃO AUXILIAR — Atualiza status e informações do quarto
-# (mantida apenas se for usada em outro módulo)
-# =====================================================
-def update_room_status(room_id: str, new_status: str, guest_name: str = None, notes: str = None):
-    """
-    Atualiza o status do quarto e os dados de hóspede no Firestore.
-    """
-    try:
-        room_ref = db.collection("rooms").document(room_id)
-        update_data = {"status": new_status}
-
-        if new_status == "disponível":
-            update_data["guest"] = None
-            update_data["guestNotes"] = None
-        else:
-            update_data["guest"] = guest_name or ""
-            update_data["guestNotes"] = notes or ""
-
-        room_ref.update(update_data)
-        print(f"✅ Quarto {room_id} → {new_status} | Hóspede: {guest_name or '—'} | Notas: {notes or '—'}")
-
-    except Exception as e:
-        print(f"⚠️ Erro ao atualizar status do quarto {room_id}: {e}")
-
-
 # =====================================================
 # 🔹 LISTAR HÓSPEDES
 # =====================================================
 @router.get("/guests")
-def get_guests():
+def get_guests(request: Request, response: Response):
     """Lista todos os hóspedes"""
+    not_modified = versions.conditional(request, response, "guests")
+    if not_modified:
+        return not_modified
     try:
         guests = []
         for doc in db.collection("guests").stream():
@@ -74,6 +51,7 @@ def create_guest(guest: Guest):
             "email": guest.email or "",
             "createdAt": date.today().isoformat(),
         })
+        versions.bump("guests")
 
         return {"message": "Hóspede criado com sucesso!"}
 
@@ -101,6 +79,7 @@ def update_guest(guest_id: str, guest: Guest):
         }
 
         ref.update(update_data)
+        versions.bump("guests")
         return {"message": "Hóspede atualizado com sucesso!"}
 
     except Exception as e:
@@ -120,6 +99,7 @@ def delete_guest(guest_id: str):
             raise HTTPException(status_code=404, detail="Hóspede não encontrado.")
 
         ref.delete()
+        versions.bump("guests")
         return {"message": "Hóspede removido com sucesso."}
 
     except Exception as e:
@@ -0,0 +1,67 @@
+# app/api/imports.py
+import json
+import os
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.services import bulk_import
+
+router = APIRouter()
+
+XLSX_TYPES = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.ms-excel",
+)
+
+
+# ===========================
+# 🔹 IMPORTAÇÃO EM MASSA (CSV/XLSX)
+# ===========================
+@router.post("/import/{kind}")
+async def import_file(
+    kind: str,
+    request: Request,
+    fmt: str | None = Query(None, alias="format", description="csv ou xlsx (padrão: pelo Content-Type)"),
+    on_duplicate: str = Query("skip", alias="onDuplicate", pattern="^(skip|update)$"),
+    dry_run: bool = Query(False, alias="dryRun"),
+):
+    """
+    Recebe o arquivo no corpo da requisição (sem multipart) e responde em
+    NDJSON: uma linha `error` por linha inválida, `progress` a cada 1000
+    linhas e um `summary` final com contagens e vazão.
+
+        curl -X POST --data-binary @hospedes.csv -H "Content-Type: text/csv" \\
+             ".../api/import/guests?dryRun=true"
+    """
+    if kind not in bulk_import.KINDS:
+        raise HTTPException(status_code=404, detail=f"Tipo inválido: {kind}. Use: {', '.join(bulk_import.KINDS)}")
+    if fmt is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        fmt = "xlsx" if content_type in XLSX_TYPES else "csv"
+    if fmt not in bulk_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {fmt}")
+
+    # O corpo vai direto para disco: o arquivo nunca fica inteiro em memória.
+    # A escrita roda no threadpool para não travar o event loop em uploads grandes.
+    tmp = tempfile.NamedTemporaryFile(prefix="import-", suffix=f".{fmt}", delete=False)
+    try:
+        with tmp:
+            async for chunk in request.stream():
+                await run_in_threadpool(tmp.write, chunk)
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+
+    def stream():
+        try:
+            for event in bulk_import.run_import(kind, tmp.name, fmt, on_duplicate=on_duplicate, dry_run=dry_run):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "fatal", "message": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            os.unlink(tmp.name)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,58 +1,67 @@
 # app/api/incomes.py
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Query, Response
 from fastapi.responses import StreamingResponse
-from app.core.firebase import db
-from google.cloud import firestore
+from app.core import versions
+from app.core.firebase import db, firestore
+from app.services import financial_rollups, income_index, reservation_model
 from typing import Dict, Any
 from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
-from datetime import datetime
+from datetime import date, datetime
 
 router = APIRouter()
 
 
+def _parse_day(value: str | None, field: str) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field} inválido (use yyyy-MM-dd)")
+
+
+def _income_rows(first: date | None, last: date | None, page_size: int | None = None,
+                 cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """Receitas do índice `income_index` (manuais e pagamentos, sem duplicatas)."""
+    entries, next_cursor = income_index.page(first, last, page_size, cursor)
+    rows = []
+    for entry in entries:
+        source = entry.get("source")
+        rows.append({
+            "id": entry.get("reservationId") if source == income_index.SOURCE_RESERVATION
+            else entry["fingerprint"].split(":", 1)[-1],
+            "fingerprint": entry["fingerprint"],
+            "description": entry.get("description"),
+            "date": entry.get("date"),
+            "amount": entry.get("amount"),
+            "method": entry.get("method"),
+            "origin": income_index.ORIGINS.get(source, "Manual"),
+        })
+    return rows, next_cursor
+
+
 @router.get("/incomes")
-def list_incomes():
+def list_incomes(
+    response: Response,
+    from_day: str | None = Query(None, alias="from", description="Data inicial (yyyy-MM-dd)"),
+    to_day: str | None = Query(None, alias="to", description="Data final (yyyy-MM-dd)"),
+    page_size: int | None = Query(None, alias="pageSize", ge=1, le=500),
+    cursor: str | None = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+):
     """
-    Lista todas as receitas — manuais e automáticas (do financeiro).
+    Lista as receitas — manuais e automáticas (pagamentos das reservas) —
+    mais recentes primeiro, a partir do índice `income_index`. Com
+    `pageSize` a resposta traz o cursor da próxima página em `X-Next-Cursor`.
     """
     try:
-        incomes_ref = db.collection("incomes").order_by("date", direction=firestore.Query.DESCENDING).stream()
-        reservations_ref = db.collection("reservations").stream()
-
-        incomes = []
-
-        # 🔹 Receitas manuais
-        for doc in incomes_ref:
-            data = doc.to_dict() or {}
-            incomes.append({
-                "id": doc.id,
-                "description": data.get("description"),
-                "date": data.get("date"),
-                "amount": data.get("amount"),
-                "method": data.get("method"),
-                "origin": "Manual",
-            })
-
-        # 🔸 Receitas automáticas (pagamentos confirmados)
-        for res in reservations_ref:
-            data = res.to_dict() or {}
-            status = (data.get("paymentStatus") or data.get("status") or "").lower()
-            if any(k in status for k in ["confirmado", "pago", "aprovado"]):
-                amount = float(data.get("amountReceived") or data.get("value") or 0)
-                if amount > 0:
-                    incomes.append({
-                        "id": res.id,
-                        "description": f"Reserva - {data.get('guestName') or data.get('companyName') or 'Cliente'}",
-                        "date": data.get("checkOut"),
-                        "amount": amount,
-                        "method": data.get("paymentMethod") or "Outros",
-                        "origin": "Automática",
-                    })
-
-        return sorted(incomes, key=lambda x: x["date"], reverse=True)
-
+        rows, next_cursor = _income_rows(
+            _parse_day(from_day, "from"), _parse_day(to_day, "to"), page_size, cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return rows
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -60,7 +69,9 @@ def list_incomes():
 @router.post("/incomes")
 def create_income(payload: Dict[str, Any] = Body(...)):
     """
-    Adiciona uma nova receita manual.
+    Adiciona uma nova receita manual. Com `reservationId` (e opcionalmente
+    `paymentId`) a receita é ligada ao pagamento já lançado na reserva e não
+    é somada de novo (`duplicateOf`).
     """
     try:
         description = payload.get("description")
@@ -71,28 +82,68 @@ def create_income(payload: Dict[str, Any] = Body(...)):
         if not all([description, date, amount, method]):
             raise HTTPException(status_code=400, detail="Campos obrigatórios ausentes.")
 
-        db.collection("incomes").add({
+        income = {
             "description": description,
             "date": date,
             "amount": amount,
             "method": method,
             "createdAt": firestore.SERVER_TIMESTAMP,
-        })
-
+        }
+        reservation_id = payload.get("reservationId")
+        if reservation_id:
+            income["reservationId"] = reservation_id
+            duplicate_of = income_index.match_payment(
+                reservation_id, date, reservation_model.to_cents(amount), payload.get("paymentId")
+            )
+            if duplicate_of:
+                income["duplicateOf"] = duplicate_of
+
+        # Receita, índice e consolidado do mês no mesmo commit
+        income_ref = db.collection("incomes").document()
+        batch = db.batch()
+        batch.set(income_ref, income)
+        financial_rollups.stage_change(batch, "incomes", None, income)
+        income_index.stage(batch, *income_index.manual_entry(income_ref.id, income))
+        batch.commit()
+        versions.bump("incomes")
+
+        if income.get("duplicateOf"):
+            return {"message": "Receita registrada (mesmo pagamento já lançado na reserva).",
+                    "duplicateOf": income["duplicateOf"]}
         return {"message": "Receita adicionada com sucesso."}
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/incomes/rebuild-index")
+def rebuild_income_index():
+    """Recria `income_index` a partir de receitas, livros de pagamento e reservas antigas."""
+    try:
+        result = income_index.rebuild()
+        versions.bump("incomes")
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/incomes/export")
-def export_incomes():
+def export_incomes(
+    from_day: str | None = Query(None, alias="from"),
+    to_day: str | None = Query(None, alias="to"),
+):
     """
-    Exporta todas as receitas (manuais e automáticas) em planilha Excel (.xlsx)
+    Exporta as receitas (manuais e automáticas) em planilha Excel (.xlsx)
     com cabeçalhos e formatação em português.
     """
     try:
-        incomes = list_incomes()
+        # openpyxl só é carregado quando uma exportação é solicitada
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+
+        incomes, _ = _income_rows(_parse_day(from_day, "from"), _parse_day(to_day, "to"))
 
         wb = Workbook()
         ws = wb.active
@@ -160,5 +211,7 @@ def export_incomes():
             }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
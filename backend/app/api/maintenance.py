@@ -1,8 +1,10 @@
 # app/api/maintenance.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from datetime import datetime
+from app.core import events, versions
 from app.core.firebase import db
+from app.services import room_state
 
 router = APIRouter()
 
@@ -22,7 +24,10 @@ class Maintenance(BaseModel):
 # 🔹 LISTAR TODAS AS MANUTENÇÕES
 # ===============================
 @router.get("/maintenance")
-def list_maintenance():
+def list_maintenance(request: Request, response: Response):
+    not_modified = versions.conditional(request, response, "maintenance")
+    if not_modified:
+        return not_modified
     try:
         docs = db.collection("maintenance").get()
         return [doc.to_dict() | {"id": doc.id} for doc in docs]
@@ -40,13 +45,19 @@ def create_maintenance(data: Maintenance):
         maintenance_data = data.dict()
         maintenance_data["openedAt"] = datetime.now().isoformat()
 
-        maintenance_ref.set(maintenance_data)
+        # Chamado + quarto → manutenção no mesmo commit
+        batch = db.batch()
+        batch.set(maintenance_ref, maintenance_data)
+        room_state.stage(batch, room_state.read(data.roomId), room_state.MANUTENCAO)
+        room_state.commit(batch)
 
-        # Atualiza status do quarto para manutenção
-        room_ref = db.collection("rooms").document(data.roomId)
-        room_ref.update({"status": "manutenção"})
+        versions.bump("maintenance")
+        events.publish("maintenance", {"id": maintenance_ref.id, "action": "created", "roomId": data.roomId, "status": data.status})
+        room_state.announce((data.roomId, room_state.MANUTENCAO))
 
         return {"message": "Manutenção registrada e quarto atualizado."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -73,16 +84,24 @@ def update_maintenance(maintenance_id: str, status: str, payload: dict = None):
             if "notes" in payload:
                 update_data["notes"] = payload["notes"]
 
-        ref.update(update_data)
+        # Libera o quarto (no mesmo commit) se concluída
+        room_id = (doc.to_dict() or {}).get("roomId") if status == "concluída" else None
 
-        # Libera o quarto se concluída
-        if status == "concluída":
-            room_id = doc.to_dict().get("roomId")
-            if room_id:
-                db.collection("rooms").document(room_id).update({"status": "disponível"})
+        batch = db.batch()
+        batch.update(ref, update_data)
+        if room_id:
+            room_state.stage(batch, room_state.read(room_id), room_state.DISPONIVEL)
+        room_state.commit(batch)
+
+        versions.bump("maintenance")
+        events.publish("maintenance", {"id": maintenance_id, "action": "updated", "status": status})
+        if room_id:
+            room_state.announce((room_id, room_state.DISPONIVEL))
 
         return {"message": f"Status atualizado para '{status}'."}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -99,6 +118,8 @@ def delete_maintenance(maintenance_id: str):
             raise HTTPException(status_code=404, detail="Chamado não encontrado.")
 
         ref.delete()
+        versions.bump("maintenance")
+        events.publish("maintenance", {"id": maintenance_id, "action": "deleted"})
         return {"message": "Chamado de manutenção removido com sucesso."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
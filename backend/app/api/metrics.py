@@ -0,0 +1,19 @@
+# app/api/metrics.py
+from fastapi import APIRouter
+
+from app.core.singleflight import flights
+
+router = APIRouter()
+
+
+# ===========================
+# 🔹 COALESCÊNCIA DE REQUISIÇÕES
+# ===========================
+@router.get("/metrics/coalescing")
+def get_coalescing_metrics():
+    """
+    Contadores por rota: requisições recebidas, cálculos executados,
+    requisições que aguardaram um cálculo em andamento (coalesced) e
+    respostas servidas pelo cache curto.
+    """
+    return flights.stats()
@@ -0,0 +1,52 @@
+# app/api/migrations.py
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services import migrations
+
+router = APIRouter()
+
+
+# ===========================
+# 🔹 MIGRAÇÕES DE DADOS
+# ===========================
+@router.get("/migrations")
+def list_migrations():
+    """Migrações registradas com o checkpoint atual de cada uma."""
+    try:
+        return [migrations.status(m.name) for m in migrations.registered()]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/migrations/{name}")
+def get_migration(name: str):
+    """Progresso por partição (cursor, lidos, alterados), status e amostra das mudanças."""
+    try:
+        return migrations.status(name)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/migrations/{name}/run")
+def run_migration(
+    name: str,
+    dry_run: bool = Query(False, alias="dryRun"),
+    partitions: int = Query(4, ge=1, le=32),
+    rate: float | None = Query(None, gt=0, description="Gravações por segundo (total)"),
+    restart: bool = Query(False, description="Ignora o checkpoint e recomeça do zero"),
+):
+    """
+    Inicia (ou retoma do último checkpoint) a migração em segundo plano.
+    409 se outra instância detém o lease. Acompanhe (inclusive falhas) em
+    GET /migrations/{name}.
+    """
+    try:
+        started = migrations.start(name, partitions=partitions, dry_run=dry_run, rate=rate, restart=restart)
+        return {"name": name, "started": started, "dryRun": dry_run,
+                "message": "Migração iniciada." if started else "Migração já está em execução neste servidor."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
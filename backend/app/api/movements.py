@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Query, HTTPException
 from datetime import datetime, timedelta
-from google.cloud import firestore
-from app.core.firebase import db
+from app.core import cache
+from app.services import reservation_model
 
 router = APIRouter()
 
@@ -34,28 +34,18 @@ def get_date_range(period: str):
 def get_movements(period: str = Query("today", description="Período: today, week, month")):
     try:
         start_date, end_date = get_date_range(period)
-        reservations_ref = db.collection("reservations").stream()
+        # O início do período (no máximo o 1º dia do mês) sempre está dentro do cache recente
+        reservations = cache.get("reservations_recent")
 
         checkins, checkouts = [], []
 
-        for res in reservations_ref:
-            data = res.to_dict()
-            try:
-                check_in = datetime.strptime(data.get("checkIn"), "%Y-%m-%d").date()
-                check_out = datetime.strptime(data.get("checkOut"), "%Y-%m-%d").date()
-            except Exception:
+        for data in reservations:
+            check_in = reservation_model.check_in_date(data)
+            check_out = reservation_model.check_out_date(data)
+            if not check_in or not check_out:
                 continue
 
-            guest_name = (
-    data.get("guestOrCompany")
-    or data.get("guestName")
-    or data.get("guest")
-    or data.get("name")
-    or data.get("companyName")
-    or data.get("company")
-    or data.get("clientName")
-    or "—"
-)
+            guest_name = reservation_model.display_name(data)
 
             room_number = data.get("room") or data.get("roomNumber") or "—"
             guests_count = data.get("guestsCount") or 1
@@ -63,7 +53,7 @@ def get_movements(period: str = Query("today", description="Período: today, wee
             # 🔹 Check-in dentro do período
             if start_date <= check_in <= end_date:
                 checkins.append({
-                    "id": res.id,
+                    "id": data["id"],
                     "guest": guest_name,
                     "room": room_number,
                     "guestsCount": guests_count,
@@ -74,7 +64,7 @@ def get_movements(period: str = Query("today", description="Período: today, wee
             # 🔹 Check-out dentro do período
             if start_date <= check_out <= end_date:
                 checkouts.append({
-                    "id": res.id,
+                    "id": data["id"],
                     "guest": guest_name,
                     "room": room_number,
                     "guestsCount": guests_count,
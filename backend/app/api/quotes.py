@@ -0,0 +1,62 @@
+# app/api/quotes.py
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services import rates
+
+router = APIRouter()
+
+MAX_BATCH_DAYS = 90
+
+
+def _parse_day(value: str, field: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{field} inválido (use yyyy-MM-dd)")
+
+
+# =====================================================
+# 🔹 COTAR ESTADIA
+# =====================================================
+@router.get("/quotes")
+def quote_stay(
+    check_in: str = Query(..., alias="checkIn", description="Entrada (yyyy-MM-dd)"),
+    check_out: str = Query(..., alias="checkOut", description="Saída (yyyy-MM-dd)"),
+    room_id: str | None = Query(None, alias="roomId", description="Id, número ou identifier do quarto"),
+    room_type: str | None = Query(None, alias="type", description="Tipo de quarto (sem roomId)"),
+    company_id: str | None = Query(None, alias="companyId", description="Aplica a tarifa negociada da empresa"),
+):
+    """
+    Preço noite a noite de uma estadia (base do tipo × dia da semana ×
+    temporada × ocupação, ou tarifa negociada da empresa), com
+    disponibilidade do quarto ou os quartos livres do tipo.
+    """
+    try:
+        start, end = _parse_day(check_in, "checkIn"), _parse_day(check_out, "checkOut")
+        return rates.quote(start, end, room_ref=room_id, room_type=room_type, company_id=company_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# =====================================================
+# 🔹 TARIFAS DE TODOS OS QUARTOS (LOTE)
+# =====================================================
+@router.get("/quotes/batch")
+def quote_batch(
+    from_day: str | None = Query(None, alias="from", description="Primeira noite (yyyy-MM-dd, padrão: hoje)"),
+    days: int = Query(30, ge=1, le=MAX_BATCH_DAYS),
+    room_type: str | None = Query(None, alias="type"),
+    company_id: str | None = Query(None, alias="companyId"),
+):
+    """Tarifa e disponibilidade de cada quarto em cada noite da janela."""
+    try:
+        start = _parse_day(from_day, "from") if from_day else date.today()
+        return rates.batch(start, days, room_type=room_type, company_id=company_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
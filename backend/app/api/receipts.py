@@ -4,9 +4,7 @@ from fastapi.responses import StreamingResponse
 from io import BytesIO
 from datetime import datetime
 from app.core.firebase import db
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
+from app.services import reservation_model
 
 router = APIRouter()
 
@@ -65,7 +63,7 @@ def generate_reservation_receipt(reservation_id: str):
     prop_phone = settings.get("phone", "")
 
     # --- dados da reserva ---
-    guest_or_company = res.get("guestName") or res.get("companyName") or "—"
+    guest_or_company = reservation_model.display_name(res)
     room_number = _resolve_room_number(res)
     check_in = res.get("checkIn", "—")
     check_out = res.get("checkOut", "—")
@@ -73,10 +71,17 @@ def generate_reservation_receipt(reservation_id: str):
     status = res.get("status") or res.get("reservationStatus") or "—"
     pay_status = res.get("paymentStatus", "pendente")
     pay_method = res.get("paymentMethod", "—")
-    total = _brl(res.get("value", 0))
+    total = _brl(reservation_model.amount(res))
+    received = _brl(reservation_model.amount_received(res))
+    balance = _brl(reservation_model.balance_due(res))
     generated_at = datetime.now().strftime("%d/%m/%Y %H:%M")
 
     # --- cria PDF ---
+    # reportlab só é carregado quando um comprovante é realmente gerado
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import mm
+
     buf = BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
     width, height = A4
@@ -123,6 +128,9 @@ def generate_reservation_receipt(reservation_id: str):
         ("Método de Pagamento:", pay_method),
         ("Valor:", total),
     ]
+    if res.get("ledger"):
+        # Saldo mantido pelo livro de pagamentos (reservations/{id}/payments)
+        lines += [("Recebido:", received), ("Saldo:", balance)]
 
     c.setFont("Helvetica", 11)
     for label, value in lines:
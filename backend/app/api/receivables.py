@@ -0,0 +1,132 @@
+# app/api/receivables.py
+from io import BytesIO
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.services import receivables
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 200
+
+
+def _check(party_type: str | None, bucket: str | None):
+    if party_type and party_type not in receivables.PARTY_TYPES:
+        raise HTTPException(status_code=400, detail=f"type deve ser um de {', '.join(receivables.PARTY_TYPES)}")
+    if bucket and bucket not in receivables.BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket deve ser um de {', '.join(receivables.BUCKETS)}")
+
+
+def _page(rows: list, page: int, page_size: int) -> dict:
+    start = (page - 1) * page_size
+    return {"page": page, "pageSize": page_size, "total": len(rows), "rows": rows[start:start + page_size]}
+
+
+# =======================================================
+# 🔹 Resumo por faixa e clientes
+# =======================================================
+@router.get("/receivables/aging")
+def receivables_aging(
+    party_type: str | None = Query(None, alias="type", description="company ou guest"),
+    bucket: str | None = Query(None, description="a_vencer, 0-30, 31-60, 61-90 ou 90+"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, alias="pageSize", ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Saldo em aberto por faixa de atraso (dias após o checkOut) e lista
+    paginada de clientes (empresas/hóspedes), do maior saldo para o menor.
+    """
+    try:
+        _check(party_type, bucket)
+        summary = receivables.index.summary(party_type)
+        parties = receivables.index.parties(party_type, bucket)
+        result = _page(parties, page, page_size)
+        result["rows"] = [p.as_dict() for p in result["rows"]]
+        return summary | {"parties": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/receivables/aging/items")
+def receivables_items(
+    party: str | None = Query(None, description="Chave do cliente (ex.: company:abc, guest:12345678901)"),
+    bucket: str | None = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, alias="pageSize", ge=1, le=MAX_PAGE_SIZE),
+):
+    """Títulos em aberto (reservas com saldo) de um cliente e/ou faixa, do vencimento mais antigo."""
+    try:
+        _check(None, bucket)
+        if party and receivables.index.party(party) is None:
+            raise HTTPException(status_code=404, detail="Cliente sem saldo em aberto")
+        today = receivables.index.day
+        result = _page(receivables.index.items(party, bucket), page, page_size)
+        result["rows"] = [item.as_dict(today) for item in result["rows"]]
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# =======================================================
+# 🔹 Exportação (.xlsx)
+# =======================================================
+@router.get("/receivables/aging/export")
+def export_receivables(party_type: str | None = Query(None, alias="type")):
+    """Planilha com o resumo por cliente e os títulos em aberto."""
+    try:
+        _check(party_type, None)
+        # openpyxl só é carregado quando uma exportação é solicitada
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        today = receivables.index.day
+        parties = receivables.index.parties(party_type)
+        party_keys = {p.key for p in parties}
+        items = [i for i in receivables.index.items() if i.partyKey in party_keys]
+
+        # write_only: linhas vão direto para o arquivo, sem manter a planilha em memória
+        wb = Workbook(write_only=True)
+
+        def header(ws, titles):
+            cells = []
+            for title in titles:
+                cell = WriteOnlyCell(ws, value=title)
+                cell.font = Font(bold=True)
+                cells.append(cell)
+            ws.append(cells)
+
+        ws = wb.create_sheet("Resumo")
+        header(ws, ["Cliente", "Tipo", "Títulos", "Vencimento mais antigo", "A vencer",
+                    "0-30", "31-60", "61-90", "90+", "Total (R$)"])
+        for p in parties:
+            ws.append([p.name, p.type, p.count, p.oldestDue] + [c / 100 for c in p.buckets] + [p.total / 100])
+
+        ws = wb.create_sheet("Títulos")
+        header(ws, ["Reserva", "Cliente", "Hóspede/Empresa", "Quarto", "Check-in", "Vencimento",
+                    "Dias em atraso", "Faixa", "Total (R$)", "Recebido (R$)", "Saldo (R$)"])
+        for item in items:
+            row = item.as_dict(today)
+            ws.append([
+                item.id, item.partyName, item.name, item.room, item.checkIn, item.dueDate,
+                row["daysPastDue"], row["bucket"],
+                item.totalCents / 100, item.receivedCents / 100, item.balanceCents / 100,
+            ])
+
+        file_stream = BytesIO()
+        wb.save(file_stream)
+        file_stream.seek(0)
+        return StreamingResponse(
+            file_stream,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="contas_a_receber_{today.isoformat()}.xlsx"'},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,8 @@
 # app/api/reservations.py
-from fastapi import APIRouter, HTTPException, Body
-from app.core.firebase import db
-from google.cloud import firestore  # para SERVER_TIMESTAMP
+from fastapi import APIRouter, HTTPException, Body, Query
+from app.core import cache, events, versions
+from app.core.firebase import db, firestore, api_exceptions  # firestore: SERVER_TIMESTAMP (import tardio)
+from app.services import availability, financial_rollups, migrations, payments, reservation_model, room_calendar, room_state
 import re
 
 router = APIRouter()
@@ -19,30 +20,118 @@ def safe_float(value):
         return 0.0
 
 
-def update_room_status(room_id: str, new_status: str):
-    room_ref = db.collection("rooms").document(room_id)
-    if not room_ref.get().exists:
-        raise HTTPException(status_code=404, detail="Quarto não encontrado")
-    room_ref.update({"status": new_status})
-
-
 def digits_only(text: str) -> str:
     """Extrai somente dígitos (para casos tipo 'RM-105' -> '105')."""
     return "".join(re.findall(r"\d+", text or ""))
 
 
 def get_room_number_from_room_id(room_id: str) -> str | None:
-    """Busca na coleção 'rooms' o campo 'number' usando o room_id."""
+    """Busca o campo 'number' do quarto (via cache de 'rooms') usando o room_id."""
     if not room_id:
         return None
-    snap = db.collection("rooms").document(room_id).get()
-    if not snap.exists:
+    data = cache.room_lookup().get(room_id)
+    if data is None:
         return None
-    data = snap.to_dict() or {}
     # tente 'number' (p.ex. "105") e, se não tiver, limpe do próprio id
     return str(data.get("number") or digits_only(room_id) or "").strip() or None
 
 
+def commit_reservation_transition(reservation_id: str, build_updates, room_transition=None,
+                                  calendar_update=None):
+    """
+    Aplica uma transição de reserva (check-in, check-out, cancelamento) com
+    uma leitura e um único commit em lote:
+    - reserva e quarto são lidos juntos num único `get_all` — o quarto vem
+      do índice de ocupação (reserva → quarto); só se o índice não conhece
+      a reserva ou aponta outro quarto é que o quarto é lido depois dela;
+    - a reserva é regravada com precondição de `last_update_time` (falha se
+      outra pessoa alterou no meio → 409);
+    - o quarto é atualizado no mesmo lote pela máquina de estados
+      (`room_state.stage`, também com precondição de `last_update_time`)
+      com os argumentos devolvidos por `room_transition(dados, quarto)`
+      (quarto inexistente → 404; transição inválida ou quarto alterado no
+      meio → 409);
+    - `calendar_update(lote, chave_do_quarto, dados)` ajusta a agenda do
+      quarto (`room_calendar`) e, no cancelamento, o livro de pagamentos
+      (`payments`) no mesmo lote;
+    - a diferença de valores (recebido / a receber) vai para os consolidados
+      mensais (`financial_rollups`) no mesmo lote.
+    Assim reserva, quarto e consolidados nunca ficam inconsistentes entre si.
+
+    Retorna (dados_da_reserva, id_do_quarto | None).
+    """
+    doc_ref = db.collection("reservations").document(reservation_id)
+    refs = [doc_ref]
+    hinted = cache.room_lookup().get(availability.index.room_of(reservation_id) or "") if room_transition else None
+    if hinted:
+        refs.append(db.collection("rooms").document(hinted["id"]))
+    snaps = {s.reference.path: s for s in db.get_all(refs)}  # get_all não garante a ordem
+    snap = snaps[doc_ref.path]
+    if not snap.exists:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada")
+
+    data = snap.to_dict() or {}
+    room = cache.room_lookup().get(str(data.get("roomId") or "").strip())
+    room_id = room["id"] if room else None
+    room_snap = None
+    if room and room_transition:
+        room_snap = snaps.get(db.collection("rooms").document(room_id).path)
+        if room_snap is None:
+            room_snap = room_state.read(room_id)  # índice desatualizado: segunda leitura
+        elif not room_snap.exists:
+            raise HTTPException(status_code=404, detail="Quarto não encontrado")
+    if room_snap is not None:
+        room = (room_snap.to_dict() or {}) | {"id": room_id}
+
+    updates = reservation_model.normalize_updates(data, build_updates(data, room))
+    batch = db.batch()
+    batch.update(doc_ref, updates, option=db.write_option(last_update_time=snap.update_time))
+    financial_rollups.stage_change(batch, "reservations", data, data | updates)
+
+    room_updates = None
+    transition = room_transition(data, room) if room and room_transition else None
+    if transition:
+        room_updates = room_state.stage(batch, room_snap, **transition)
+
+    if calendar_update:
+        calendar_update(batch, room_calendar.key_for(data.get("roomId") or data.get("roomNumber")), data)
+
+    try:
+        batch.commit()
+    except api_exceptions.FailedPrecondition:
+        raise HTTPException(
+            status_code=409,
+            detail="A reserva ou o quarto foi alterado por outro usuário. Atualize e tente novamente.",
+        )
+    except api_exceptions.NotFound:
+        raise HTTPException(status_code=404, detail="Quarto não encontrado")
+
+    versions.bump("reservations")
+    if room_updates:
+        room_state.announce((room_id, room_updates["status"]))
+    return data, room_id
+
+
+def _release_room(reservation_id: str):
+    """Libera o quarto somente se esta reserva for a estadia ativa nele."""
+    def build(data, room):
+        active_id = room.get("activeReservationId")
+        if active_id and active_id != reservation_id:
+            return None  # outra estadia ocupa o quarto: não mexe nele
+        return {"new_status": room_state.DISPONIVEL}
+    return build
+
+
+def _with_room_number(updates: dict, data: dict, room: dict | None) -> dict:
+    """Garante roomNumber na reserva (se ainda não existir)."""
+    if not data.get("roomNumber"):
+        room_id = str(data.get("roomId") or "")
+        room_number = str((room or {}).get("number") or digits_only(room_id) or "").strip()
+        if room_number:
+            updates["roomNumber"] = room_number
+    return updates
+
+
 def resolve_room_number(reservation: dict) -> str:
     """
     Resolve o número do quarto de forma robusta:
@@ -85,7 +174,7 @@ def list_reservations():
 
             reservations.append({
                 "id": doc.id,
-                "guestOrCompany": data.get("guestName") or data.get("companyName") or "—",
+                "guestOrCompany": reservation_model.display_name(data),
                 # 👇 agora devolve sempre o número do quarto (ex.: "105")
                 "room": resolve_room_number(data),
                 "guestsCount": data.get("guests", 0),
@@ -96,7 +185,7 @@ def list_reservations():
                 "checkOutStatus": data.get("checkOutStatus", "pendente"),
                 "paymentStatus": data.get("paymentStatus", "pendente"),
                 "paymentMethod": data.get("paymentMethod", "—"),
-                "total": data.get("value", 0),
+                "total": reservation_model.amount(data),
             })
         return reservations
     except Exception as e:
@@ -109,30 +198,20 @@ def list_reservations():
 @router.put("/reservations/{reservation_id}/checkin")
 def confirm_checkin(reservation_id: str):
     try:
-        doc_ref = db.collection("reservations").document(reservation_id)
-        snap = doc_ref.get()
-        if not snap.exists:
-            raise HTTPException(status_code=404, detail="Reserva não encontrada")
-
-        data = snap.to_dict() or {}
-        room_id = data.get("roomId")
-
-        # Garante roomNumber ao confirmar check-in (se ainda não existir)
-        room_number = data.get("roomNumber") or get_room_number_from_room_id(room_id)
-        updates = {
-            "checkInStatus": "concluido",
-            "status": "confirmado"   # 🔹 força status a permanecer confirmado
-        }
-        if room_number and not data.get("roomNumber"):
-            updates["roomNumber"] = room_number
-
-        doc_ref.update(updates)
-
-        # Atualiza apenas o QUARTO → ocupado
-        if room_id:
-            update_room_status(room_id, "ocupado")
+        # Reserva → check-in concluído; QUARTO → ocupado (mesmo commit)
+        _, room_id = commit_reservation_transition(
+            reservation_id,
+            lambda data, room: _with_room_number({
+                "checkInStatus": "concluido",
+                "status": "confirmado",   # 🔹 força status a permanecer confirmado
+            }, data, room),
+            lambda data, room: {"new_status": room_state.OCUPADO, "reservation_id": reservation_id},
+        )
+        events.publish("reservation", {"id": reservation_id, "action": "checkin", "roomId": room_id})
 
         return {"message": "Check-in concluído, reserva confirmada e quarto marcado como ocupado."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -146,31 +225,25 @@ def confirm_checkout(reservation_id: str):
     registra a data/hora real de saída (actualCheckOut).
     """
     try:
-        doc_ref = db.collection("reservations").document(reservation_id)
-        snap = doc_ref.get()
-        if not snap.exists:
-            raise HTTPException(status_code=404, detail="Reserva não encontrada")
-
-        data = snap.to_dict() or {}
-        room_id = data.get("roomId")
-
-        # Garante roomNumber também aqui (caso foi direto pro checkout)
-        room_number = data.get("roomNumber") or get_room_number_from_room_id(room_id)
-        updates = {
-            "checkOutStatus": "concluido",
-            "actualCheckOut": firestore.SERVER_TIMESTAMP
-        }
-        if room_number and not data.get("roomNumber"):
-            updates["roomNumber"] = room_number
-
-        doc_ref.update(updates)
-
-        # Atualiza o quarto → volta a DISPONÍVEL
-        if room_id:
-            update_room_status(room_id, "disponível")
+        # Reserva → check-out concluído; QUARTO → volta a DISPONÍVEL (mesmo commit)
+        # roomNumber também é garantido aqui (caso foi direto pro checkout)
+        _, room_id = commit_reservation_transition(
+            reservation_id,
+            lambda data, room: _with_room_number({
+                "checkOutStatus": "concluido",
+                "actualCheckOut": firestore.SERVER_TIMESTAMP,
+            }, data, room),
+            _release_room(reservation_id),
+            lambda batch, room_key, data: room_calendar.stage_checkout(
+                batch, room_key, reservation_id, data.get("checkIn"), data.get("checkOut")
+            ),
+        )
+        events.publish("reservation", {"id": reservation_id, "action": "checkout", "roomId": room_id})
 
         return {"message": "Check-out concluído, quarto liberado e data real registrada."}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -180,23 +253,64 @@ def confirm_checkout(reservation_id: str):
 # ------------------------------------------------------------
 @router.put("/reservations/{reservation_id}/payment")
 def register_payment(reservation_id: str, payload: dict = Body(...)):
+    """
+    Lança um pagamento no livro `reservations/{id}/payments` e atualiza
+    amountReceived/balanceDue da reserva na mesma transação. Pagamentos
+    parciais deixam a reserva com paymentStatus "parcial" até quitar.
+    `total` (opcional) define o valor da reserva junto com o pagamento.
+    """
     try:
         method = payload.get("method")
         amount = payload.get("amount")
 
         if not method or amount is None:
             raise HTTPException(status_code=400, detail="Método e valor são obrigatórios")
+        amount_cents = reservation_model.to_cents(amount)
+        if amount_cents <= 0:
+            raise HTTPException(status_code=400, detail="Valor do pagamento deve ser positivo")
+        total = payload.get("total")
+
+        # Lançamento, saldo da reserva e consolidado mensal no mesmo commit
+        updates = payments.record_payment(
+            reservation_id, amount_cents, method,
+            total_cents=reservation_model.to_cents(total) if total is not None else None,
+            note=payload.get("note"),
+        )
+        versions.bump("reservations")
+        events.publish("reservation", {"id": reservation_id, "action": "payment", "paymentMethod": method})
+
+        message = f"Pagamento confirmado: {method} - R$ {amount_cents / 100:.2f}"
+        if updates["balanceDueCents"]:
+            message = f"Pagamento parcial registrado: {method} - R$ {amount_cents / 100:.2f}"
+        return {
+            "message": message,
+            "amountReceived": updates["amountReceived"],
+            "balanceDue": updates["balanceDue"],
+            "paymentStatus": updates["paymentStatus"],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        doc_ref = db.collection("reservations").document(reservation_id)
-        if not doc_ref.get().exists:
-            raise HTTPException(status_code=404, detail="Reserva não encontrada")
 
-        doc_ref.update({
-            "paymentStatus": "confirmado",
-            "paymentMethod": method,
-            "value": amount
-        })
-        return {"message": f"Pagamento confirmado: {method} - R$ {amount:.2f}"}
+@router.get("/reservations/{reservation_id}/payments")
+def list_reservation_payments(reservation_id: str):
+    """Lançamentos do livro de pagamentos da reserva (mais antigos primeiro)."""
+    try:
+        snap = db.collection("reservations").document(reservation_id).get()
+        if not snap.exists:
+            raise HTTPException(status_code=404, detail="Reserva não encontrada")
+        data = snap.to_dict() or {}
+        return {
+            "reservationId": reservation_id,
+            "total": reservation_model.amount(data),
+            "amountReceived": reservation_model.amount_received(data),
+            "balanceDue": reservation_model.balance_due(data),
+            "entries": payments.list_entries(reservation_id),
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -204,32 +318,37 @@ def register_payment(reservation_id: str, payload: dict = Body(...)):
 # ------------------------------------------------------------
 # ✅ CANCELAR RESERVA
 # ------------------------------------------------------------
+def _cancel_writes(reservation_id: str):
+    """Libera a agenda do quarto e estorna no livro o que já foi recebido."""
+    def stage(batch, room_key, data):
+        room_calendar.stage_release(batch, room_key, reservation_id)
+        payments.stage_refund(batch, reservation_id, data)
+    return stage
+
+
 @router.put("/reservations/{reservation_id}/cancel")
 def cancel_reservation(reservation_id: str):
     try:
-        doc_ref = db.collection("reservations").document(reservation_id)
-        snap = doc_ref.get()
-        if not snap.exists:
-            raise HTTPException(status_code=404, detail="Reserva não encontrada")
-
-        data = snap.to_dict() or {}
-        room_id = data.get("roomId")
-
-        doc_ref.update({
-            "status": "cancelado",
-            "checkInStatus": "cancelado",
-            "checkOutStatus": "cancelado",
-            "paymentStatus": "cancelado",
-            "paymentMethod": None,
-            "value": 0,
-            "canceledAt": firestore.SERVER_TIMESTAMP,
-        })
-
-        # Atualiza quarto → volta a DISPONÍVEL
-        if room_id:
-            update_room_status(room_id, "disponível")
+        # Reserva → cancelada; quarto → volta a DISPONÍVEL (mesmo commit)
+        _, room_id = commit_reservation_transition(
+            reservation_id,
+            lambda data, room: {
+                "status": "cancelado",
+                "checkInStatus": "cancelado",
+                "checkOutStatus": "cancelado",
+                "paymentStatus": "cancelado",
+                "paymentMethod": None,
+                "value": 0,
+                "canceledAt": firestore.SERVER_TIMESTAMP,
+            } | payments.refund_updates(data),
+            _release_room(reservation_id),
+            _cancel_writes(reservation_id),
+        )
+        events.publish("reservation", {"id": reservation_id, "action": "cancel", "roomId": room_id})
 
         return {"message": "Reserva cancelada e quarto liberado."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -237,30 +356,33 @@ def cancel_reservation(reservation_id: str):
 # ------------------------------------------------------------
 # 🔧 OPCIONAL: Backfill para popular roomNumber nas reservas antigas
 # ------------------------------------------------------------
+@migrations.migration("backfill_room_number", version=1, collection="reservations",
+                      after=lambda: versions.bump("reservations"))
+def _backfill_room_number(data: dict, doc_id: str) -> dict | None:
+    """Preenche 'roomNumber' a partir de 'rooms.number' ou limpando o 'roomId'."""
+    if data.get("roomNumber"):
+        return None
+    room_id = data.get("roomId") or ""
+    room_number = get_room_number_from_room_id(room_id) or digits_only(room_id)
+    return {"roomNumber": room_number} if room_number else None
+
+
 @router.post("/reservations/backfill-room-number")
-def backfill_room_number():
+def backfill_room_number(dry_run: bool = Query(False, alias="dryRun")):
     """
     Percorre todas as reservas que não têm 'roomNumber', e tenta preencher
     a partir do 'rooms.number' ou limpando o 'roomId'.
-    Rode uma vez para normalizar.
+    Roda em segundo plano pela migração `backfill_room_number` (retomável);
+    acompanhe em GET /migrations/backfill_room_number.
     """
     try:
-        batch = db.batch()
-        count = 0
-        for doc in db.collection("reservations").stream():
-            data = doc.to_dict() or {}
-            if data.get("roomNumber"):
-                continue
-            room_id = data.get("roomId") or ""
-            room_number = get_room_number_from_room_id(room_id) or digits_only(room_id)
-            if room_number:
-                batch.update(doc.reference, {"roomNumber": room_number})
-                count += 1
-                # Commit em lotes de 400–450 para evitar limite do Firestore
-                if count % 400 == 0:
-                    batch.commit()
-                    batch = db.batch()
-        batch.commit()
-        return {"updated": count, "message": "Backfill concluído."}
+        started = migrations.start("backfill_room_number", dry_run=dry_run)
+        return {
+            "started": started,
+            "message": "Backfill iniciado." if started else "Backfill já está em execução.",
+            "status": "/api/migrations/backfill_room_number",
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,44 +1,45 @@
-from fastapi import APIRouter, HTTPException, Body
-from app.core.firebase import db
-from google.cloud import firestore 
-
-# função para mudar status de um quarto
-def update_room_status(room_id: str, new_status: str):
-    """Atualiza o status do quarto no Firestore"""
-    try:
-        room_ref = db.collection("rooms").document(room_id)
-        doc = room_ref.get()
-        if not doc.exists:
-            raise HTTPException(status_code=404, detail="Quarto não encontrado")
-        room_ref.update({"status": new_status})
-        return {"message": f"Status do quarto {room_id} alterado para {new_status}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
+from fastapi import APIRouter, HTTPException, Body, Request, Response
+from app.core import cache, events, versions
+from app.core.firebase import db, firestore, api_exceptions
+from app.api.calendar import parse_date
+from app.services import financial_rollups, reservation_model, room_calendar, room_state
 
 router = APIRouter()
 
 @router.get("/rooms")
-def get_rooms():
+def get_rooms(request: Request, response: Response):
+    not_modified = versions.conditional(request, response, "rooms")
+    if not_modified:
+        return not_modified
     try:
-        rooms_ref = db.collection("rooms").stream()
-        rooms = []
-        for doc in rooms_ref:
-            room = doc.to_dict()
-            room["id"] = doc.id
-            rooms.append(room)
-        return rooms
+        return cache.get("rooms")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/rooms/{room_id}")
 def update_room(room_id: str, room_data: dict):
     try:
-        room_ref = db.collection("rooms").document(room_id)
-        if not room_ref.get().exists:
+        # Mudança de status passa pela máquina de estados do quarto
+        # (validada contra o documento lido agora, gravação condicionada a ele)
+        new_status = room_data.get("status")
+        if new_status:
+            room_state.set_status(
+                room_id, new_status,
+                extra=room_data,
+                guest=room_data.get("guest"),
+                notes=room_data.get("guestNotes"),
+            )
+            return {"message": f"Room {room_id} updated successfully"}
+
+        try:
+            db.collection("rooms").document(room_id).update(room_data)
+        except api_exceptions.NotFound:
             raise HTTPException(status_code=404, detail="Room not found")
-        room_ref.update(room_data)
+
+        versions.bump("rooms")
         return {"message": f"Room {room_id} updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -47,6 +48,7 @@ def create_room(room: dict):
     try:
         doc_ref = db.collection("rooms").document(room.get("id"))
         doc_ref.set(room)
+        versions.bump("rooms")
         return {"message": f"Room {room.get('id')} created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -59,11 +61,49 @@ def change_room_status(room_id: str, payload: dict):
         new_status = payload.get("status")
         if not new_status:
             raise HTTPException(status_code=400, detail="Campo 'status' é obrigatório")
-        return update_room_status(room_id, new_status)
+        updates = room_state.set_status(room_id, new_status)
+        return {"message": f"Status do quarto {room_id} alterado para {updates['status']}"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rooms/status-batch")
+def change_rooms_status(payload: dict = Body(...)):
+    """
+    Muda vários quartos para o mesmo status de uma vez.
+    Body: {"roomIds": ["RM-101", "RM-102"], "status": "manutenção"}
+    """
+    try:
+        room_ids = payload.get("roomIds") or []
+        new_status = payload.get("status")
+        if not new_status or not isinstance(room_ids, list) or not room_ids:
+            raise HTTPException(status_code=400, detail="Campos obrigatórios: roomIds (lista) e status")
+        updated = room_state.set_many(room_ids, new_status)
+        return {"message": f"{len(updated)} quarto(s) atualizado(s).", "roomIds": updated}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _checkin_new_reservation(transaction, room_id, room_key, res_ref, reservation_data, d_in, d_out):
+    room_snap = room_state.read(room_id, transaction=transaction)
+    room_data = room_snap.to_dict() or {}
+    reservation_data["roomNumber"] = room_data.get("number") or room_data.get("identifier") or room_id
+
+    room_calendar.reserve(transaction, room_key, res_ref.id, d_in, d_out)
+    reservation_data = reservation_model.normalize(reservation_data)
+    transaction.set(res_ref, reservation_data)
+    financial_rollups.stage_change(transaction, "reservations", None, reservation_data)
+    room_state.stage(
+        transaction, room_snap, room_state.OCUPADO,
+        guest=reservation_data.get("guestName") or reservation_data.get("companyName") or "",
+        reservation_id=res_ref.id,
+    )
+
+
 @router.post("/rooms/{room_id}/checkin")
 def checkin_room(room_id: str, payload: dict = Body(...)):
     """
@@ -73,16 +113,7 @@ def checkin_room(room_id: str, payload: dict = Body(...)):
     """
 
     try:
-        # 1) Garante que o quarto existe
-        room_ref = db.collection("rooms").document(room_id)
-        room_snap = room_ref.get()
-        if not room_snap.exists:
-            raise HTTPException(status_code=404, detail="Quarto não encontrado")
-
-        room_data = room_snap.to_dict() or {}
-        room_number = room_data.get("number") or room_data.get("identifier") or room_id
-
-        # 2) Extrai dados básicos enviados pelo front
+        # 1) Extrai dados básicos enviados pelo front
         guest_name = payload.get("guestName")      # ou nome digitado
         guest_cpf = payload.get("guestCPF")
         notes = payload.get("notes", "")
@@ -97,11 +128,14 @@ def checkin_room(room_id: str, payload: dict = Body(...)):
         company_name = payload.get("companyName")
         company_id = payload.get("companyId")  # se estiver usando id de empresa
 
-        # 3) Monta documento da reserva
+        d_in, d_out = parse_date(check_in), parse_date(check_out)
+        if d_out <= d_in:
+            raise HTTPException(status_code=400, detail="checkOutDate deve ser posterior ao checkInDate")
+
+        # 2) Monta documento da reserva
         reservation_data = {
             "createdAt": firestore.SERVER_TIMESTAMP,
             "roomId": room_id,
-            "roomNumber": room_number,
 
             "guestName": guest_name,
             "guestCPF": guest_cpf,
@@ -124,12 +158,18 @@ def checkin_room(room_id: str, payload: dict = Body(...)):
             "value": 0,
         }
 
-        # 4) Cria a reserva
+        # 3) Verifica sobreposição, cria a reserva e marca o quarto como
+        #    ocupado na mesma transação (409 se o período já estiver reservado)
+        # a chave da agenda sai do índice fora da transação (pode reconstruí-lo)
+        room_key = room_calendar.key_for(room_id) or room_id
         res_ref = db.collection("reservations").document()
-        res_ref.set(reservation_data)
+        firestore.transactional(_checkin_new_reservation)(
+            db.transaction(), room_id, room_key, res_ref, reservation_data, d_in, d_out
+        )
 
-        # 5) Atualiza status do quarto -> ocupado
-        update_room_status(room_id, "ocupado")
+        versions.bump("reservations")
+        room_state.announce((room_id, room_state.OCUPADO))
+        events.publish("reservation", {"id": res_ref.id, "action": "checkin", "roomId": room_id})
 
         return {
             "message": "Check-in realizado com sucesso.",
@@ -142,56 +182,118 @@ def checkin_room(room_id: str, payload: dict = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _checkout_active_reservation(transaction, room_ref, room_key):
+    """
+    Lê o quarto e a reserva apontada por activeReservationId e finaliza a
+    estadia (a agenda do quarto é encurtada em caso de saída antecipada).
+    """
+    room_snap = room_ref.get(transaction=transaction)
+    if not room_snap.exists:
+        raise HTTPException(status_code=404, detail="Quarto não encontrado")
+
+    room_data = room_snap.to_dict() or {}
+    reservation_id = room_data.get("activeReservationId")
+    if not reservation_id:
+        raise HTTPException(
+            status_code=404,
+            detail="Nenhuma reserva ativa registrada para este quarto."
+        )
+
+    res_ref = db.collection("reservations").document(reservation_id)
+    res_snap = res_ref.get(transaction=transaction)
+    if not res_snap.exists:
+        raise HTTPException(status_code=404, detail="Reserva ativa não encontrada.")
+    res_data = res_snap.to_dict() or {}
+
+    room_calendar.stage_checkout(
+        transaction, room_key, reservation_id,
+        res_data.get("checkIn"), res_data.get("checkOut"),
+    )
+    updates = reservation_model.normalize_updates(res_data, {
+        "checkOutStatus": "concluido",
+        "status": "finalizada",
+        "actualCheckOut": firestore.SERVER_TIMESTAMP,
+    })
+    transaction.update(res_ref, updates)
+    financial_rollups.stage_change(transaction, "reservations", res_data, res_data | updates)
+    room_state.stage(transaction, room_snap, room_state.DISPONIVEL)
+    return reservation_id
+
+
 @router.post("/rooms/{room_id}/checkout")
 def checkout_room(room_id: str):
     """
     Finaliza a reserva ativa do quarto e libera o quarto.
+    A reserva ativa vem do ponteiro `activeReservationId` gravado no check-in:
+    uma leitura direta do quarto + uma transação, sem consulta em 'reservations'.
     """
     try:
         room_ref = db.collection("rooms").document(room_id)
-        room_snap = room_ref.get()
-
-        if not room_snap.exists():
-            raise HTTPException(status_code=404, detail="Quarto não encontrado")
-
-        # 1. Buscar reserva ativa (pendente de checkout)
-        reservations_ref = (
-            db.collection("reservations")
-            .where("roomId", "==", room_id)
-            .where("checkOutStatus", "==", "pendente")
-            .stream()
-        )
-
-        reservation = None
-        for r in reservations_ref:
-            reservation = r
-            break
-
-        if not reservation:
-            raise HTTPException(
-                status_code=404,
-                detail="Nenhuma reserva pendente de check-out encontrada."
+        room_key = room_calendar.key_for(room_id)
+        try:
+            reservation_id = firestore.transactional(_checkout_active_reservation)(
+                db.transaction(), room_ref, room_key
             )
+        except api_exceptions.NotFound:
+            raise HTTPException(status_code=404, detail="Reserva ativa não encontrada.")
 
-        res_ref = db.collection("reservations").document(reservation.id)
-
-        # 2. Atualizar reserva
-        res_ref.update({
-            "checkOutStatus": "concluido",
-            "status": "finalizada"
-        })
-
-        # 3. Liberar quarto
-        room_ref.update({
-            "status": "disponível",
-            "guest": "",
-            "guestNotes": ""
-        })
+        versions.bump("reservations")
+        room_state.announce((room_id, room_state.DISPONIVEL))
+        events.publish("reservation", {"id": reservation_id, "action": "checkout", "roomId": room_id})
 
         return {
             "message": "Check-out concluído com sucesso.",
-            "reservationId": reservation.id
+            "reservationId": reservation_id
         }
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rooms/repair-active-reservations")
+def repair_active_reservations():
+    """
+    Reconstrói o ponteiro `activeReservationId` de todos os quartos a partir
+    das reservas com check-in concluído e check-out pendente (a mais recente
+    por quarto). Quartos sem estadia ativa ficam com o ponteiro vazio.
+    """
+    try:
+        cache.refresh("rooms")  # compara com o estado atual, não com o cache
+        lookup = cache.room_lookup()
+        active = {}  # room_id -> (checkIn, reservation_id)
+
+        query = (
+            db.collection("reservations")
+            .where("checkInStatus", "==", "concluido")
+            .where("checkOutStatus", "==", "pendente")
+        )
+        for doc in query.stream():
+            data = doc.to_dict() or {}
+            if data.get("status") in ("cancelado", "finalizada"):
+                continue
+            room = lookup.get(str(data.get("roomId") or "").strip())
+            if not room:
+                continue
+            candidate = (str(data.get("checkIn") or ""), doc.id)
+            if candidate > active.get(room["id"], ("", "")):
+                active[room["id"]] = candidate
+
+        batch = db.batch()
+        updated = 0
+        for room in cache.get("rooms"):
+            pointer = active.get(room["id"], (None, None))[1]
+            if room.get("activeReservationId") == pointer:
+                continue
+            batch.update(db.collection("rooms").document(room["id"]), {"activeReservationId": pointer})
+            updated += 1
+            if updated % 400 == 0:
+                batch.commit()
+                batch = db.batch()
+        batch.commit()
+
+        versions.bump("rooms")
+        return {"updated": updated, "activeRooms": len(active)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
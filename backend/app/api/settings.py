@@ -1,7 +1,7 @@
 # app/api/settings.py
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request, Response
+from app.core import cache, versions
 from app.core.firebase import db
-from google.cloud import firestore
 
 router = APIRouter()
 
@@ -9,10 +9,13 @@ router = APIRouter()
 # 🔹 BUSCAR CONFIGURAÇÕES
 # ===========================
 @router.get("/settings")
-def get_settings():
+def get_settings(request: Request, response: Response):
+    not_modified = versions.conditional(request, response, "settings")
+    if not_modified:
+        return not_modified
     try:
-        doc = db.collection("settings").document("main").get()
-        if not doc.exists:
+        settings = cache.get("settings")
+        if settings is None:
             # Retorna um modelo padrão se ainda não existe
             return {
                 "propertyName": "",
@@ -26,7 +29,7 @@ def get_settings():
                 "notes": "",
                 "cnpj": ""  # 👈 adicionado aqui
             }
-        return doc.to_dict()
+        return settings
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -38,6 +41,7 @@ def get_settings():
 def save_settings(payload: dict = Body(...)):
     try:
         db.collection("settings").document("main").set(payload, merge=True)
+        versions.bump("settings")
         return {"message": "Configurações salvas com sucesso!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,7 @@
 # app/api/settings_users.py
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request, Response
 from pydantic import BaseModel
+from app.core import versions
 from app.core.firebase import db
 
 router = APIRouter()
@@ -19,7 +20,10 @@ class User(BaseModel):
 # 🔹 LISTAR TODOS OS USUÁRIOS
 # ===========================
 @router.get("/settings/users")
-def get_users():
+def get_users(request: Request, response: Response):
+    not_modified = versions.conditional(request, response, "users")
+    if not_modified:
+        return not_modified
     try:
         users = []
         docs = db.collection("users").stream()
@@ -40,6 +44,7 @@ def create_user(user: User = Body(...)):
     try:
         ref = db.collection("users").document()
         ref.set(user.dict())
+        versions.bump("users")
         return {**user.dict(), "id": ref.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -56,6 +61,7 @@ def delete_user(user_id: str):
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Usuário não encontrado.")
         ref.delete()
+        versions.bump("users")
         return {"message": f"Usuário {user_id} excluído com sucesso!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,131 @@
+# app/core/bulk.py
+"""
+Gravação em massa no Firestore com lotes e concorrência limitada.
+
+`BulkWriter` acumula operações em lotes de até `BATCH_LIMIT` e envia cada
+lote cheio para um pool de threads com no máximo `max_in_flight` commits
+simultâneos; quem enfileira espera quando o limite é atingido, então a
+memória fica limitada a alguns lotes. Um lote que falha é registrado em
+`errors` (com as chaves dos documentos) e não interrompe os demais.
+
+`max_ops_per_second` aplica um limite de vazão (ex.: migrações rodando
+com a pousada em operação).
+
+    with BulkWriter(max_in_flight=4) as writer:
+        for row in rows:
+            writer.set(db.collection("guests").document(), row)
+    print(writer.stats())
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.firebase import db
+
+BATCH_LIMIT = 400
+
+
+class BulkWriter:
+    def __init__(self, max_in_flight: int = 4, batch_size: int = BATCH_LIMIT,
+                 max_ops_per_second: float | None = None, dry_run: bool = False):
+        self.batch_size = min(batch_size, 500)
+        self.max_ops_per_second = max_ops_per_second
+        self.dry_run = dry_run
+        self._max_in_flight = max_in_flight
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="bulk-writer")
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._ops: list[tuple[str, object, dict | None, dict]] = []
+        self._started = time.monotonic()
+        self._next_slot = self._started
+        self.written = 0
+        self.batches = 0
+        self.errors: list[dict] = []
+
+    # ---------------- operações ----------------
+    def set(self, ref, data: dict, merge: bool = False):
+        self._add("set", ref, data, {"merge": merge})
+
+    def update(self, ref, data: dict):
+        self._add("update", ref, data, {})
+
+    def create(self, ref, data: dict):
+        self._add("create", ref, data, {})
+
+    def delete(self, ref):
+        self._add("delete", ref, None, {})
+
+    def _add(self, op: str, ref, data, kwargs: dict):
+        self._ops.append((op, ref, data, kwargs))
+        if len(self._ops) >= self.batch_size:
+            self._dispatch()
+
+    # ---------------- envio ----------------
+    def _throttle(self, count: int):
+        if not self.max_ops_per_second:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next_slot, now)
+            self._next_slot = start + count / self.max_ops_per_second
+        if start > now:
+            time.sleep(start - now)
+
+    def _dispatch(self):
+        ops, self._ops = self._ops, []
+        if not ops:
+            return
+        self._throttle(len(ops))
+        self._slots.acquire()  # bloqueia quem enfileira enquanto há commits demais em andamento
+        self._pool.submit(self._commit, ops)
+
+    def _commit(self, ops):
+        try:
+            if not self.dry_run:
+                batch = db.batch()
+                for op, ref, data, kwargs in ops:
+                    if op == "delete":
+                        batch.delete(ref)
+                    else:
+                        getattr(batch, op)(ref, data, **kwargs)
+                batch.commit()
+            with self._lock:
+                self.written += len(ops)
+                self.batches += 1
+        except Exception as e:
+            with self._lock:
+                self.errors.append({"error": str(e), "documents": [ref.path for _, ref, _, _ in ops]})
+        finally:
+            self._slots.release()
+
+    def flush(self):
+        """Envia o lote parcial e espera todos os commits em andamento."""
+        self._dispatch()
+        for _ in range(self._max_in_flight):
+            self._slots.acquire()
+        for _ in range(self._max_in_flight):
+            self._slots.release()
+
+    def close(self):
+        self.flush()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- métricas ----------------
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        with self._lock:
+            return {
+                "written": self.written,
+                "batches": self.batches,
+                "failedBatches": len(self.errors),
+                "pending": len(self._ops),
+                "elapsedSeconds": round(elapsed, 3),
+                "writesPerSecond": round(self.written / elapsed, 1),
+                "dryRun": self.dry_run,
+            }
@@ -0,0 +1,278 @@
+# app/core/cache.py
+"""
+Cache em memória dos dados mais lidos (quartos, configurações e reservas
+recentes) com snapshot comprimido em disco.
+
+- Cada entrada tem um loader registrado com `@cached(nome)`; `get(nome)`
+  devolve o valor em memória ou carrega do Firestore.
+- As rotas de escrita chamam `invalidate(nome)` para a próxima leitura
+  buscar dados novos.
+- Com `CACHE_WARMUP=1`, o startup hidrata o cache a partir do snapshot
+  (`CACHE_SNAPSHOT_PATH`) e depois reconcilia com o Firestore em segundo
+  plano. Enquanto o processo roda, o snapshot é regravado a cada
+  `CACHE_SNAPSHOT_INTERVAL` segundos (somente se algo mudou).
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from app.core.firebase import db
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+RECENT_RESERVATION_DAYS = int(os.getenv("CACHE_RECENT_RESERVATION_DAYS", "90"))
+
+WARMUP_ENABLED = os.getenv("CACHE_WARMUP", "0").lower() in ("1", "true", "yes")
+SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", os.path.join(".cache", "warm-snapshot.json.gz"))
+SNAPSHOT_INTERVAL = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_VERSION = 1
+
+_lock = threading.RLock()
+_loaders = {}
+_entries = {}  # nome -> (carregado_em, valor)
+_invalidations = {}  # nome -> contador de invalidações (descarta cargas iniciadas antes delas)
+_generation = 0  # incrementa a cada mudança; evita regravar snapshot igual
+_stop = threading.Event()
+
+
+# =======================================================
+# 🔹 API do cache
+# =======================================================
+def cached(name: str):
+    """Registra a função decorada como loader da entrada `name`."""
+    def decorator(fn):
+        _loaders[name] = fn
+        return fn
+    return decorator
+
+
+def get(name: str):
+    """Valor em cache (ou recém-carregado). Não altere o objeto devolvido."""
+    with _lock:
+        entry = _entries.get(name)
+    if entry and time.monotonic() - entry[0] < CACHE_TTL_SECONDS:
+        return entry[1]
+    return refresh(name)
+
+
+def refresh(name: str):
+    """
+    Carrega do Firestore e guarda. Se a entrada for invalidada durante a
+    carga, o valor (possivelmente anterior à escrita) é devolvido a quem
+    pediu mas não fica em cache.
+    """
+    with _lock:
+        token = _invalidations.get(name, 0)
+    value = _loaders[name]()
+    _store(name, value, token=token)
+    return value
+
+
+def invalidate(*names: str):
+    global _generation
+    with _lock:
+        for name in names:
+            _entries.pop(name, None)
+            _invalidations[name] = _invalidations.get(name, 0) + 1
+        _generation += 1
+
+
+def _store(name: str, value, loaded_at: float | None = None, token: int | None = None) -> bool:
+    """Guarda a entrada; com `token`, só se não houve invalidação desde o início da carga."""
+    global _generation
+    with _lock:
+        if token is not None and _invalidations.get(name, 0) != token:
+            return False
+        _entries[name] = (time.monotonic() if loaded_at is None else loaded_at, value)
+        _generation += 1
+        return True
+
+
+_room_lookup = (None, {})
+
+
+def room_lookup() -> dict:
+    """
+    Índice {id | number | identifier: quarto} da coleção 'rooms'.
+    Reservas antigas guardam em 'roomId' ora o id do documento, ora o número.
+    """
+    global _room_lookup
+    rooms = get("rooms")
+    source, lookup = _room_lookup
+    if source is rooms:
+        return lookup
+
+    lookup = {}
+    for room in rooms:
+        for key in (room.get("identifier"), room.get("number")):
+            if key not in (None, ""):
+                lookup.setdefault(str(key).strip(), room)
+    for room in rooms:
+        lookup[room["id"]] = room  # o id do documento tem prioridade
+    _room_lookup = (rooms, lookup)
+    return lookup
+
+
+def recent_cutoff() -> date:
+    """Reservas com checkOut a partir desta data ficam no cache 'reservations_recent'."""
+    return date.today() - timedelta(days=RECENT_RESERVATION_DAYS)
+
+
+# =======================================================
+# 🔹 Loaders
+# =======================================================
+@cached("rooms")
+def _load_rooms():
+    rooms = []
+    for doc in db.collection("rooms").stream():
+        room = doc.to_dict() or {}
+        room["id"] = doc.id
+        rooms.append(room)
+    return rooms
+
+
+@cached("companies")
+def _load_companies():
+    companies = []
+    for doc in db.collection("companies").stream():
+        company = doc.to_dict() or {}
+        company["id"] = doc.id
+        companies.append(company)
+    return companies
+
+
+@cached("company_rooms")
+def _load_company_rooms():
+    rooms = []
+    for company in db.collection("companies").stream():
+        for doc in db.collection(f"companies/{company.id}/rooms").stream():
+            room = doc.to_dict() or {}
+            room["id"] = doc.id
+            room["companyId"] = company.id
+            rooms.append(room)
+    return rooms
+
+
+@cached("settings")
+def _load_settings():
+    doc = db.collection("settings").document("main").get()
+    return doc.to_dict() if doc.exists else None
+
+
+@cached("reservations_recent")
+def _load_recent_reservations():
+    cutoff = recent_cutoff().isoformat()
+    reservations = []
+    # checkIn/checkOut são strings "yyyy-MM-dd": a comparação lexical equivale à de datas
+    for doc in db.collection("reservations").where("checkOut", ">=", cutoff).stream():
+        data = doc.to_dict() or {}
+        data["id"] = doc.id
+        reservations.append(data)
+    return reservations
+
+
+# =======================================================
+# 🔹 Snapshot em disco
+# =======================================================
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def write_snapshot(path: str = SNAPSHOT_PATH) -> bool:
+    """Grava o snapshot comprimido de forma atômica. Retorna False se o cache estiver vazio."""
+    with _lock:
+        entries = {name: value for name, (_, value) in _entries.items()}
+    if not entries:
+        return False
+
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "writtenAt": datetime.now().isoformat(),
+        "recentCutoff": recent_cutoff().isoformat(),
+        "entries": entries,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        json.dump(payload, fh, default=_json_default, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return True
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> list[str]:
+    """Hidrata o cache com o snapshot. Retorna os nomes das entradas carregadas."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            payload = json.load(fh)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"⚠️ Snapshot de cache ignorado ({path}): {e}")
+        return []
+
+    if payload.get("version") != SNAPSHOT_VERSION:
+        return []
+
+    loaded = []
+    # Entradas hidratadas valem até a reconciliação (ou até o TTL, o que vier antes)
+    now = time.monotonic()
+    for name, value in (payload.get("entries") or {}).items():
+        if name in _loaders:
+            _store(name, value, loaded_at=now)
+            loaded.append(name)
+    return loaded
+
+
+def reconcile():
+    """
+    Recarrega do Firestore todas as entradas registradas (via `refresh`:
+    uma carga atravessada por uma invalidação não substitui a entrada).
+    """
+    for name in list(_loaders):
+        if _stop.is_set():
+            return
+        try:
+            refresh(name)
+        except Exception as e:
+            print(f"⚠️ Falha ao reconciliar cache '{name}': {e}")
+
+
+def _snapshot_loop():
+    last_written = None
+    while not _stop.wait(SNAPSHOT_INTERVAL):
+        with _lock:
+            generation = _generation
+        if generation == last_written:
+            continue
+        try:
+            if write_snapshot():
+                last_written = generation
+        except Exception as e:
+            print(f"⚠️ Falha ao gravar snapshot de cache: {e}")
+
+
+# =======================================================
+# 🔹 Ciclo de vida (chamado pelo app/main.py)
+# =======================================================
+def start():
+    if not WARMUP_ENABLED:
+        return
+    loaded = load_snapshot()
+    if loaded:
+        print(f"✅ Cache hidratado do snapshot: {', '.join(loaded)}")
+    threading.Thread(target=reconcile, name="cache-reconcile", daemon=True).start()
+    threading.Thread(target=_snapshot_loop, name="cache-snapshot", daemon=True).start()
+
+
+def stop():
+    if not WARMUP_ENABLED:
+        return
+    _stop.set()
+    try:
+        write_snapshot()
+    except Exception as e:
+        print(f"⚠️ Falha ao gravar snapshot de cache: {e}")
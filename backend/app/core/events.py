@@ -0,0 +1,112 @@
+# app/core/events.py
+"""
+Barramento de eventos de mudança (quartos, reservas, manutenção).
+
+As rotas de escrita chamam `publish(tipo, dados)`; o endpoint `/events`
+(SSE) repassa os eventos aos clientes conectados. Os últimos
+`EVENTS_BUFFER_SIZE` eventos ficam num buffer circular para que um
+cliente que reconecta com `Last-Event-ID` receba o que perdeu.
+
+IDs têm o formato "<boot>-<seq>": após um restart (ou se o cliente ficou
+fora tempo demais), `replay()` devolve None e o cliente deve recarregar
+o estado completo.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+
+EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "1000"))
+
+
+@dataclass(frozen=True)
+class Event:
+    seq: int
+    type: str
+    data: dict
+    ts: float = field(default_factory=time.time)
+
+    @property
+    def id(self) -> str:
+        return f"{_boot_id}-{self.seq}"
+
+
+_boot_id = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_buffer: deque[Event] = deque(maxlen=EVENTS_BUFFER_SIZE)
+_seq = 0
+_subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+_listeners = []
+
+
+def publish(event_type: str, data: dict) -> Event:
+    """Registra um evento. Pode ser chamado de qualquer thread (rotas síncronas)."""
+    global _seq
+    with _lock:
+        _seq += 1
+        event = Event(_seq, event_type, data)
+        _buffer.append(event)
+        subscribers = list(_subscribers)
+        listeners = list(_listeners)
+
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            # loop já encerrado: o assinante será removido ao desconectar
+            pass
+
+    for listener in listeners:
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"⚠️ Erro no listener de eventos ({event_type}): {e}")
+    return event
+
+
+def add_listener(callback):
+    """Registra um callback síncrono chamado a cada evento publicado."""
+    with _lock:
+        _listeners.append(callback)
+
+
+def subscribe() -> asyncio.Queue:
+    """Cria uma fila para o loop atual (usar dentro de uma corrotina)."""
+    queue: asyncio.Queue = asyncio.Queue()
+    with _lock:
+        _subscribers.add((asyncio.get_running_loop(), queue))
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue):
+    with _lock:
+        for item in [s for s in _subscribers if s[1] is queue]:
+            _subscribers.discard(item)
+
+
+def replay(last_event_id: str | None) -> list[Event] | None:
+    """
+    Eventos posteriores a `last_event_id`.
+    Retorna None quando não é possível garantir continuidade.
+    """
+    if not last_event_id:
+        return []
+
+    boot, _, seq = last_event_id.partition("-")
+    try:
+        last_seq = int(seq)
+    except ValueError:
+        return None
+
+    with _lock:
+        if boot != _boot_id or last_seq > _seq:
+            return None
+        events = [e for e in _buffer if e.seq > last_seq]
+        oldest = _buffer[0].seq if _buffer else _seq + 1
+
+    if last_seq + 1 < oldest:
+        return None
+    return events
@@ -1,10 +1,22 @@
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
+import importlib
+import threading
+
+# =======================================================
+# 🔹 Cliente Firestore compartilhado (inicialização tardia)
+# =======================================================
+# O SDK Admin e o cliente gRPC do Firestore só são importados/criados
+# na primeira consulta, e não no import dos routers. Assim o cold start
+# do servidor não paga pela conexão antes da primeira requisição.
+
+_lock = threading.Lock()
+_client = None
+
+
+def _load_credentials():
+    from firebase_admin import credentials
 
-# Evita erro de reinit
-if not firebase_admin._apps:
     firebase_key_str = os.getenv("FIREBASE_KEY")
 
     if firebase_key_str:
@@ -12,17 +24,65 @@ if not firebase_admin._apps:
             firebase_key = json.loads(firebase_key_str)
             cred = credentials.Certificate(firebase_key)
             print("✅ Firebase conectado via variável FIREBASE_KEY")
+            return cred
         except Exception as e:
             print("❌ Erro ao carregar FIREBASE_KEY:", e)
             raise
-    else:
-        cred_path = os.path.join(os.path.dirname(__file__), "firebase-key.json")
-        if os.path.exists(cred_path):
-            cred = credentials.Certificate(cred_path)
-            print("✅ Firebase conectado via arquivo local")
-        else:
-            raise FileNotFoundError("Nenhuma credencial Firebase encontrada!")
 
-    firebase_admin.initialize_app(cred)
+    cred_path = os.path.join(os.path.dirname(__file__), "firebase-key.json")
+    if os.path.exists(cred_path):
+        print("✅ Firebase conectado via arquivo local")
+        return credentials.Certificate(cred_path)
+
+    raise FileNotFoundError("Nenhuma credencial Firebase encontrada!")
+
+
+def get_db():
+    """Retorna o cliente Firestore único da aplicação, criando-o no primeiro uso."""
+    global _client
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is None:
+            import firebase_admin
+            from firebase_admin import firestore as admin_firestore
+
+            # Evita erro de reinit
+            if not firebase_admin._apps:
+                firebase_admin.initialize_app(_load_credentials())
+
+            _client = admin_firestore.client()
+    return _client
+
+
+class _LazyClient:
+    """Proxy para o cliente Firestore: resolve `get_db()` no primeiro atributo acessado."""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __repr__(self):
+        state = "inicializado" if _client is not None else "não inicializado"
+        return f"<Firestore client ({state})>"
+
+
+class _LazyModule:
+    """Importa o módulo apenas quando algum atributo dele é usado."""
+
+    def __init__(self, module_name: str):
+        self._module_name = module_name
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, name)
+
+
+db = _LazyClient()
 
-db = firestore.client()
+# Use `from app.core.firebase import firestore` para SERVER_TIMESTAMP,
+# Query.DESCENDING, transactional etc. sem importar o SDK no startup.
+firestore = _LazyModule("google.cloud.firestore")
+api_exceptions = _LazyModule("google.api_core.exceptions")
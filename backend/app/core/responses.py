@@ -0,0 +1,148 @@
+# app/core/responses.py
+"""
+Resposta padrão da API com negociação de formato e compressão.
+
+- `Accept: application/msgpack` → corpo em MessagePack;
+  caso contrário JSON via `orjson` (ou `json` da stdlib se não instalado).
+- Corpos a partir de `RESPONSE_COMPRESS_MIN_BYTES` são comprimidos com
+  brotli (se o pacote `brotli` estiver instalado) ou gzip, conforme o
+  `Accept-Encoding` do cliente.
+
+Os cabeçalhos da requisição chegam à classe de resposta por um
+`ContextVar` preenchido pelo `NegotiationMiddleware`.
+"""
+import gzip
+import json
+import os
+from contextvars import ContextVar
+
+import msgpack
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback para ambientes sem orjson
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# (accept, accept-encoding) da requisição atual
+_request_headers: ContextVar[tuple[str, str]] = ContextVar("request_headers", default=("", ""))
+
+
+# =======================================================
+# 🔹 Codificadores (também usados por benchmarks/serialization.py)
+# =======================================================
+def encode_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_msgpack(content) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+# =======================================================
+# 🔹 Negociação
+# =======================================================
+def _qvalues(header: str) -> dict[str, float]:
+    """'a/b;q=0.5, c/d' -> {'a/b': 0.5, 'c/d': 1.0}"""
+    values = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[token] = q
+    return values
+
+
+def wants_msgpack(accept: str) -> bool:
+    if "msgpack" not in accept:
+        return False
+    q = _qvalues(accept)
+    msgpack_q = max(q.get(m, 0.0) for m in MSGPACK_MEDIA_TYPES)
+    json_q = max(q.get("application/json", 0.0), q.get("*/*", 0.0))
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def pick_encoding(accept_encoding: str) -> str | None:
+    if not accept_encoding:
+        return None
+    q = _qvalues(accept_encoding)
+    if brotli is not None and q.get("br", 0.0) > 0:
+        return "br"
+    if q.get("gzip", q.get("*", 0.0)) > 0:
+        return "gzip"
+    return None
+
+
+class CompactResponse(JSONResponse):
+    """Resposta padrão do app (ver `default_response_class` em app/main.py)."""
+
+    def __init__(self, content=None, status_code=200, headers=None, media_type=None, background=None):
+        accept, accept_encoding = _request_headers.get()
+        self._msgpack = media_type is None and wants_msgpack(accept)
+        if self._msgpack:
+            media_type = MSGPACK_MEDIA_TYPES[0]
+        super().__init__(content, status_code, headers, media_type, background)
+
+        self.headers["vary"] = "Accept, Accept-Encoding"
+        encoding = pick_encoding(accept_encoding)
+        if encoding and len(self.body) >= COMPRESS_MIN_BYTES:
+            self.body = compress(self.body, encoding)
+            self.headers["content-encoding"] = encoding
+            self.headers["content-length"] = str(len(self.body))
+
+    def render(self, content) -> bytes:
+        if self._msgpack:
+            return encode_msgpack(content)
+        return encode_json(content)
+
+
+class NegotiationMiddleware:
+    """Middleware ASGI que expõe Accept/Accept-Encoding para o `CompactResponse`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = accept_encoding = ""
+        for key, value in scope.get("headers") or []:
+            if key == b"accept":
+                accept = value.decode("latin-1").lower()
+            elif key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1").lower()
+
+        token = _request_headers.set((accept, accept_encoding))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_headers.reset(token)
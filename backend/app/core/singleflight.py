@@ -0,0 +1,129 @@
+# app/core/singleflight.py
+"""
+Coalescência de requisições (single-flight) + cache curto de resultado.
+
+Quando várias requisições idênticas chegam ao mesmo tempo (ex.: toda a
+recepção abrindo o sistema na troca de turno), só a primeira executa o
+cálculo; as demais esperam e recebem o mesmo resultado. O resultado fica
+em cache por alguns segundos (`ttl`, ajustável por rota via
+`COALESCE_TTL_<NOME>`).
+
+Com `collections`, a chave inclui os contadores de `versions` dessas
+coleções: depois de qualquer escrita (`versions.bump`) a próxima requisição
+recalcula, inclusive para quem acabou de gravar.
+
+Uso:
+    @router.get("/dashboard")
+    @coalesce("dashboard", ttl=5, collections=("reservations", "rooms"))
+    def get_dashboard(): ...
+"""
+import functools
+import os
+import re
+import threading
+import time
+
+from app.core import versions
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}    # chave -> _Call em andamento
+        self._results = {}  # chave -> (expira_em, resultado)
+        self._stats = {}    # rota -> contadores
+
+    def _count(self, route: str, field: str):
+        stats = self._stats.setdefault(
+            route, {"requests": 0, "computed": 0, "coalesced": 0, "cacheHits": 0, "errors": 0}
+        )
+        stats[field] += 1
+
+    def do(self, route: str, key, fn, ttl: float):
+        with self._lock:
+            self._count(route, "requests")
+
+            cached = self._results.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._count(route, "cacheHits")
+                return cached[1]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._count(route, "computed")
+            else:
+                self._count(route, "coalesced")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._count(route, "errors")
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                if call.error is None and ttl > 0:
+                    now = time.monotonic()
+                    # resultados de versões antigas nunca mais são pedidos: descarta os vencidos
+                    for old in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                        del self._results[old]
+                    self._results[key] = (now + ttl, call.result)
+            call.done.set()
+        return call.result
+
+    def invalidate(self, route: str | None = None):
+        """Descarta resultados em cache (de uma rota ou de todas)."""
+        with self._lock:
+            if route is None:
+                self._results.clear()
+            else:
+                for key in [k for k in self._results if k[0] == route]:
+                    del self._results[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {route: dict(values) for route, values in self._stats.items()}
+
+
+flights = SingleFlight()
+
+
+def route_ttl(name: str, default: float) -> float:
+    env_name = "COALESCE_TTL_" + re.sub(r"[^A-Za-z0-9]+", "_", name).upper()
+    return float(os.getenv(env_name, default))
+
+
+def coalesce(name: str, ttl: float = 3.0, collections: tuple[str, ...] = ()):
+    """
+    Decora um endpoint síncrono; a chave é o nome da rota + argumentos da
+    chamada + versões das `collections` lidas pela rota.
+    """
+    effective_ttl = route_ttl(name, ttl)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())),
+                   tuple(sorted(versions.current(*collections).items())))
+            return flights.do(name, key, lambda: fn(*args, **kwargs), effective_ttl)
+        return wrapper
+    return decorator
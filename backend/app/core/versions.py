@@ -0,0 +1,85 @@
+# app/core/versions.py
+"""
+Contadores de versão por coleção e suporte a GET condicional (ETag).
+
+Toda rota que grava numa coleção chama `bump("<coleção>")`. O ETag das
+respostas é derivado desses contadores, então um `If-None-Match` igual ao
+ETag atual é respondido com 304 sem consultar o Firestore nem serializar
+o corpo.
+
+Os contadores vivem no processo (a API roda em instância única). Como o
+frontend ainda grava algumas coleções direto no Firestore, o ETag também
+muda a cada `ETAG_MAX_AGE` segundos para que essas escritas apareçam.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+from fastapi import Request, Response
+
+from app.core import cache
+
+ETAG_MAX_AGE = float(os.getenv("ETAG_MAX_AGE", "300"))
+
+# Entradas do app/core/cache.py que dependem de cada coleção
+CACHE_ENTRIES = {
+    "rooms": ("rooms",),
+    "companies": ("companies", "company_rooms"),
+    "settings": ("settings",),
+    "reservations": ("reservations_recent",),
+}
+
+_boot_id = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_counters: dict[str, int] = {}
+
+
+def bump(*collections: str):
+    """Marca as coleções como alteradas e invalida os caches que dependem delas."""
+    with _lock:
+        for name in collections:
+            _counters[name] = _counters.get(name, 0) + 1
+    for name in collections:
+        entries = CACHE_ENTRIES.get(name)
+        if entries:
+            cache.invalidate(*entries)
+
+
+def current(*collections: str) -> dict[str, int]:
+    with _lock:
+        return {name: _counters.get(name, 0) for name in collections}
+
+
+def etag(*collections: str) -> str:
+    epoch = int(time.time() // ETAG_MAX_AGE) if ETAG_MAX_AGE > 0 else 0
+    parts = [_boot_id, str(epoch)] + [f"{n}={v}" for n, v in sorted(current(*collections).items())]
+    digest = hashlib.sha1(":".join(parts).encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    bare = tag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == bare:
+            return True
+    return False
+
+
+def conditional(request: Request, response: Response, *collections: str) -> Response | None:
+    """
+    Retorna uma resposta 304 se o cliente já tem a versão atual; caso
+    contrário, coloca o ETag na resposta e retorna None.
+    """
+    tag = etag(*collections)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, tag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -2,15 +2,41 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import auth, companies, guests, rooms, reservations, calendar, movements, dashboard
+from app.core import cache
+from app.services import cash_close as cash_close_job
 from app.core.firebase import db
+from app.core.responses import CompactResponse, NegotiationMiddleware
 
 # ✅ importar o router de manutenção
 from app.api import maintenance, incomes, expenses, settings, receipts, login
 
-from app.api import financial_dashboard, ai_consultant, settings_users
+from app.api import financial_dashboard, ai_consultant, settings_users, metrics, events, availability, imports, migrations, receivables, cash_close, analytics, quotes
 
 
-app = FastAPI(title="Gestão de Pousadas API")
+app = FastAPI(title="Gestão de Pousadas API", default_response_class=CompactResponse)
+
+
+# 🔹 Aquecimento opcional do cache (CACHE_WARMUP=1) a partir do snapshot em disco
+@app.on_event("startup")
+def warm_up_cache():
+    cache.start()
+
+
+# 🔹 Fechamento de caixa diário automático (CASH_CLOSE_AUTO=1)
+@app.on_event("startup")
+def start_cash_close_job():
+    cash_close_job.start()
+
+
+@app.on_event("shutdown")
+def save_cache_snapshot():
+    cache.stop()
+
+
+@app.on_event("shutdown")
+def stop_cash_close_job():
+    cash_close_job.stop()
+
 
 # 🔹 Permitir requisições do frontend (React Vite)
 app.add_middleware(
@@ -25,6 +51,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 🔹 JSON rápido / MessagePack (Accept) e compressão gzip/brotli (Accept-Encoding)
+app.add_middleware(NegotiationMiddleware)
+
 # --- Rotas ---
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(companies.router, prefix="/api", tags=["companies"])
@@ -43,6 +72,15 @@ app.include_router(receipts.router, prefix="/api", tags=["reports"])
 app.include_router(login.router, prefix="/api", tags=["Login"])
 app.include_router(ai_consultant.router, prefix="/api", tags=["ai_consultant"])
 app.include_router(settings_users.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
+app.include_router(events.router, prefix="/api", tags=["events"])
+app.include_router(availability.router, prefix="/api", tags=["availability"])
+app.include_router(imports.router, prefix="/api", tags=["import"])
+app.include_router(migrations.router, prefix="/api", tags=["migrations"])
+app.include_router(receivables.router, prefix="/api", tags=["financial"])
+app.include_router(cash_close.router, prefix="/api", tags=["financial"])
+app.include_router(analytics.router, prefix="/api", tags=["analytics"])
+app.include_router(quotes.router, prefix="/api", tags=["quotes"])
 
 @app.get("/")
 def root():
@@ -0,0 +1,326 @@
+# app/services/analytics.py
+"""
+Snapshot colunar das reservas em memória (NumPy), para análises.
+
+Em vez de listas de dicts com datas e valores em texto, cada campo usado
+pelas análises vira uma coluna de tamanho fixo:
+
+    checkIn / checkOut / createdOn   int32   date.toordinal() (0 = sem data)
+    amount / received                int64   centavos
+    status / payment                 int8    índice em STATUS_CODES / PAYMENT_CODES
+    method / room / company          int32   códigos de dicionário (0 = nenhum)
+
+São ~40 bytes por reserva (≈ 40 MB para 1 milhão), contra alguns KB por
+documento como dict. Somas e agrupamentos viram operações vetorizadas
+(`np.bincount`, máscaras booleanas, somas cumulativas).
+
+Atualização, no mesmo esquema do índice de ocupação:
+- reconstrução completa na primeira consulta, por `invalidate()` ou a cada
+  `ANALYTICS_REBUILD_SECONDS` (lendo só os campos necessários);
+- entre reconstruções, os eventos `reservation` marcam reservas como
+  sujas; só elas são relidas e a linha é regravada no lugar (excluídas
+  viram lápide e as colunas são compactadas quando passam de 25%).
+
+O NumPy só é importado quando o snapshot é usado pela primeira vez.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+
+from app.core import events
+from app.core.firebase import db
+from app.services import availability, reservation_model
+
+REBUILD_SECONDS = float(os.getenv("ANALYTICS_REBUILD_SECONDS", "1800"))
+
+STATUS_CODES = reservation_model.STATUSES
+PAYMENT_CODES = (reservation_model.PAYMENT_PENDING, reservation_model.PAYMENT_PAID, reservation_model.PAYMENT_CANCELED)
+CANCELED = STATUS_CODES.index(reservation_model.STATUS_CANCELED)
+PAID = PAYMENT_CODES.index(reservation_model.PAYMENT_PAID)
+
+_EPOCH_ORD = date(1970, 1, 1).toordinal()
+
+_COLUMNS = {
+    "checkIn": "int32",
+    "checkOut": "int32",
+    "createdOn": "int32",
+    "amount": "int64",
+    "received": "int64",
+    "status": "int8",
+    "payment": "int8",
+    "method": "int32",
+    "room": "int32",
+    "company": "int32",
+}
+
+# Campos lidos do Firestore na reconstrução (select)
+_SOURCE_FIELDS = [
+    "checkIn", "checkOut", "checkInOrd", "checkOutOrd", "createdAt", "importedAt",
+    "value", "totalAmount", "amountCents", "amountReceived", "amountReceivedCents",
+    "status", "statusCode", "checkInStatus", "checkOutStatus", "paymentStatus", "paymentCode",
+    "paymentMethod", "companyId", "companyName", "roomId", "roomNumber",
+]
+
+
+class Codes:
+    """Dicionário valor ↔ código inteiro (0 = nenhum)."""
+
+    def __init__(self):
+        self.values: list[str] = [""]
+        self._codes: dict[str, int] = {"": 0}
+
+    def code(self, value) -> int:
+        value = str(value or "").strip()
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get(self, value) -> int | None:
+        return self._codes.get(str(value or "").strip())
+
+
+@dataclass
+class Frame:
+    """Colunas vivas (sem lápides) de um instante do snapshot."""
+    ids: list[str]
+    columns: dict
+    rooms: list[str]
+    methods: list[str]
+    companies: list[str]
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def active(self):
+        """Máscara das reservas não canceladas com datas válidas."""
+        c = self.columns
+        return (c["status"] != CANCELED) & (c["checkIn"] > 0) & (c["checkOut"] > c["checkIn"])
+
+    def nights_between(self, first: date, last: date):
+        """Noites de cada reserva dentro de [first, last) (0 fora do período)."""
+        import numpy as np
+
+        c = self.columns
+        start = np.maximum(c["checkIn"], first.toordinal())
+        end = np.minimum(c["checkOut"], last.toordinal())
+        return np.clip(end - start, 0, None)
+
+    def occupancy(self, first: date, days: int, mask=None, weights=None):
+        """
+        Reservas ocupando cada noite de [first, first + days) (diferenças +
+        soma cumulativa). Com `weights`, soma o peso de cada reserva por noite.
+        """
+        import numpy as np
+
+        c = self.columns
+        mask = self.active() if mask is None else mask & self.active()
+        base = first.toordinal()
+        start = np.clip(c["checkIn"][mask] - base, 0, days)
+        end = np.clip(c["checkOut"][mask] - base, 0, days)
+        w = None if weights is None else weights[mask]
+        diff = np.bincount(start, weights=w, minlength=days + 1) - np.bincount(end, weights=w, minlength=days + 1)
+        return np.cumsum(diff[:days])
+
+    def nightly_rate(self):
+        """Valor por noite de cada reserva, em centavos (float)."""
+        import numpy as np
+
+        c = self.columns
+        return c["amount"] / np.clip(c["checkOut"] - c["checkIn"], 1, None)
+
+    @staticmethod
+    def month_index(ordinals):
+        """Ordinais -> meses desde 1970-01 (para agrupar com bincount)."""
+        import numpy as np
+
+        days = (ordinals.astype("int64") - _EPOCH_ORD).astype("datetime64[D]")
+        return days.astype("datetime64[M]").astype("int64")
+
+    def sum_by_month(self, ordinals, weights=None) -> dict[str, int]:
+        """{'YYYY-MM': contagem (ou soma de `weights`)} pelo mês de cada data (0 = ignorada)."""
+        import numpy as np
+
+        valid = ordinals > 0
+        if not valid.any():
+            return {}
+        months = self.month_index(ordinals[valid])
+        low = int(months.min())
+        sums = np.bincount(months - low, weights=None if weights is None else weights[valid])
+        return {self.month_label(low + i): int(v) for i, v in enumerate(sums) if v}
+
+    @staticmethod
+    def month_label(index: int) -> str:
+        return f"{1970 + index // 12:04d}-{index % 12 + 1:02d}"
+
+    @staticmethod
+    def weekday(ordinals):
+        """0 = segunda ... 6 = domingo (date.fromordinal(1) é uma segunda)."""
+        return (ordinals - 1) % 7
+
+
+class ReservationColumns:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._arrays: dict = {}
+        self._size = 0
+        self._ids: list[str | None] = []
+        self._rows: dict[str, int] = {}
+        self._dead = 0
+        self.rooms = Codes()
+        self.methods = Codes()
+        self.companies = Codes()
+        self._dirty: set[str] = set()
+        self._built_at = 0.0
+        self._stale = True
+        self.generation = 0
+        events.add_listener(self._on_event)
+
+    # ---------------- ciclo de vida ----------------
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+    def _on_event(self, event):
+        if event.type == "import" and event.data.get("kind") == "reservations":
+            self.invalidate()
+            return
+        doc_id = event.data.get("id")
+        if event.type == "reservation" and doc_id:
+            with self._lock:
+                self._dirty.add(doc_id)
+
+    def ensure_fresh(self):
+        with self._lock:
+            if self._stale or time.monotonic() - self._built_at > REBUILD_SECONDS:
+                self._rebuild()
+            elif self._dirty:
+                self._apply_dirty()
+
+    # ---------------- armazenamento ----------------
+    def _reserve(self, capacity: int):
+        import numpy as np
+
+        current = len(self._arrays.get("checkIn", ()))
+        if capacity <= current:
+            return
+        capacity = max(capacity, current * 2, 1024)
+        for name, dtype in _COLUMNS.items():
+            grown = np.zeros(capacity, dtype=dtype)
+            if name in self._arrays:
+                grown[:self._size] = self._arrays[name][:self._size]
+            self._arrays[name] = grown
+
+    def _encode(self, data: dict) -> dict:
+        d_in, d_out = reservation_model.check_in_date(data), reservation_model.check_out_date(data)
+        created = availability.parse_day(data.get("createdAt") or data.get("importedAt"))
+        room_key = availability.index.resolve_room(data.get("roomId") or data.get("roomNumber"))
+        company = data.get("companyId")
+        if not company and room_key and "/" in room_key:
+            company = room_key.split("/", 1)[0]
+        return {
+            "checkIn": d_in.toordinal() if d_in else 0,
+            "checkOut": d_out.toordinal() if d_out else 0,
+            "createdOn": created.toordinal() if created else 0,
+            "amount": int(round(reservation_model.amount(data) * 100)),
+            "received": int(round(reservation_model.amount_received(data) * 100)),
+            "status": STATUS_CODES.index(reservation_model.stay_status(data)),
+            "payment": PAYMENT_CODES.index(reservation_model.payment_status(data)),
+            "method": self.methods.code(data.get("paymentMethod")),
+            "room": self.rooms.code(room_key),
+            "company": self.companies.code(company or data.get("companyName")),
+        }
+
+    def _put(self, res_id: str, data: dict | None):
+        row = self._rows.get(res_id)
+        if data is None:
+            if row is not None:
+                del self._rows[res_id]
+                self._ids[row] = None
+                self._arrays["status"][row] = CANCELED
+                self._arrays["checkIn"][row] = 0
+                self._dead += 1
+            return
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._ids.append(res_id)
+            self._rows[res_id] = row
+        for name, value in self._encode(data).items():
+            self._arrays[name][row] = value
+
+    def _compact(self):
+        keep = [i for i, res_id in enumerate(self._ids) if res_id is not None]
+        for name in _COLUMNS:
+            column = self._arrays[name]
+            column[:len(keep)] = column[keep]
+        self._ids = [self._ids[i] for i in keep]
+        self._rows = {res_id: i for i, res_id in enumerate(self._ids)}
+        self._size = len(keep)
+        self._dead = 0
+
+    def _rebuild(self):
+        availability.index.ensure_fresh()
+        self._arrays, self._size, self._ids, self._rows, self._dead = {}, 0, [], {}, 0
+        self.rooms, self.methods, self.companies = Codes(), Codes(), Codes()
+        self._dirty.clear()
+        self._reserve(1024)
+        for doc in db.collection("reservations").select(_SOURCE_FIELDS).stream():
+            self._put(doc.id, doc.to_dict() or {})
+        self._built_at = time.monotonic()
+        self._stale = False
+        self.generation += 1
+
+    def _apply_dirty(self):
+        availability.index.ensure_fresh()
+        ids, self._dirty = self._dirty, set()
+        refs = [db.collection("reservations").document(i) for i in ids]
+        for snap in db.get_all(refs):
+            self._put(snap.id, snap.to_dict() if snap.exists else None)
+        if self._dead > self._size // 4:
+            self._compact()
+        self.generation += 1
+
+    # ---------------- leitura ----------------
+    def frame(self) -> Frame:
+        """Cópia consistente das colunas vivas (seguro contra gravações concorrentes)."""
+        self.ensure_fresh()
+        with self._lock:
+            n = self._size
+            if self._dead:
+                alive = [i for i, res_id in enumerate(self._ids) if res_id is not None]
+                columns = {name: self._arrays[name][alive] for name in _COLUMNS}
+                ids = [self._ids[i] for i in alive]
+            else:
+                columns = {name: self._arrays[name][:n].copy() for name in _COLUMNS}
+                ids = list(self._ids)
+            return Frame(ids, columns, list(self.rooms.values), list(self.methods.values),
+                         list(self.companies.values))
+
+    def stats(self) -> dict:
+        self.ensure_fresh()
+        with self._lock:
+            return {
+                "rows": self._size - self._dead,
+                "tombstones": self._dead,
+                "capacity": len(self._arrays.get("checkIn", ())),
+                "bytes": sum(a.nbytes for a in self._arrays.values()),
+                "rooms": len(self.rooms.values) - 1,
+                "companies": len(self.companies.values) - 1,
+                "generation": self.generation,
+            }
+
+
+snapshot = ReservationColumns()
+
+
+def invalidate():
+    """Força reconstrução completa na próxima consulta (ex.: após importações em massa)."""
+    snapshot.invalidate()
@@ -0,0 +1,468 @@
+# app/services/availability.py
+"""
+Índice de ocupação por quarto e por dia.
+
+Cada quarto (coleção 'rooms' e subcoleções 'companies/{id}/rooms') tem
+dois bitmaps — inteiros Python em que o bit i representa a noite
+`ORIGIN + i`: um para as reservas e outro para bloqueios de manutenção.
+Uma pergunta "o quarto está livre de A a B?" vira um AND com a máscara do
+intervalo, então a busca em todos os quartos para um ano à frente custa
+microssegundos.
+
+O índice também guarda, por quarto, a lista ordenada de estadias
+(início, fim, id, status) usada pela detecção de conflitos e pela grade
+do calendário.
+
+Atualização:
+- reconstrução completa na primeira consulta, quando quartos são criados
+  ou removidos, por `invalidate()` ou a cada `AVAILABILITY_REBUILD_SECONDS`;
+- mudanças de tipo/status dos quartos vêm do cache de quartos e são
+  aplicadas sem reler reservas (quarto em 'manutenção' fica bloqueado a
+  partir de hoje);
+- entre reconstruções, os eventos `reservation`/`maintenance` do
+  barramento marcam documentos como sujos e só eles são relidos.
+"""
+import bisect
+import os
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from app.core import cache, events
+from app.core.firebase import db
+
+ORIGIN = date(2000, 1, 1)
+_ORIGIN_ORD = ORIGIN.toordinal()
+
+LOOKBACK_DAYS = int(os.getenv("AVAILABILITY_LOOKBACK_DAYS", "400"))
+HORIZON_DAYS = int(os.getenv("AVAILABILITY_HORIZON_DAYS", "730"))
+REBUILD_SECONDS = float(os.getenv("AVAILABILITY_REBUILD_SECONDS", "600"))
+
+# Capacidade padrão por tipo (sobrescrita por settings.roomCapacities ou pelo campo 'capacity')
+DEFAULT_CAPACITIES = {
+    "quarto casal": 2,
+    "quarto familia": 3,
+}
+
+STAY_RESERVED = "reservado"
+STAY_IN_HOUSE = "ocupado"
+STAY_DONE = "concluido"
+
+_STATUS_BLOCK = "__status__"  # bloqueio vindo do status 'manutenção' do próprio quarto
+
+
+def day_index(d: date) -> int:
+    return d.toordinal() - _ORIGIN_ORD
+
+
+def index_date(i: int) -> date:
+    return date.fromordinal(i + _ORIGIN_ORD)
+
+
+def parse_day(value) -> date | None:
+    """'2025-03-10', '2025-03-10T14:00:00', datetime ou date -> date (None se inválido)."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def range_mask(start: int, end: int) -> int:
+    """Bits das noites [start, end)."""
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def _fold(text) -> str:
+    folded = unicodedata.normalize("NFKD", str(text or "").strip().lower())
+    return "".join(c for c in folded if not unicodedata.combining(c))
+
+
+def is_canceled(data: dict) -> bool:
+    return "cancel" in str(data.get("status") or "").lower()
+
+
+def stay_status(data: dict) -> str:
+    if str(data.get("checkOutStatus") or "").lower() == "concluido":
+        return STAY_DONE
+    if str(data.get("checkInStatus") or "").lower() == "concluido":
+        return STAY_IN_HOUSE
+    return STAY_RESERVED
+
+
+def stay_range(data: dict) -> tuple[date, date] | None:
+    """Noites ocupadas [entrada, saída) da reserva; None se cancelada ou sem datas válidas."""
+    if is_canceled(data):
+        return None
+    d_in, d_out = parse_day(data.get("checkIn")), parse_day(data.get("checkOut"))
+    if not d_in or not d_out or d_out <= d_in:
+        return None
+    if stay_status(data) == STAY_DONE:
+        # saída antecipada libera as noites restantes
+        actual = parse_day(data.get("actualCheckOut"))
+        if actual and d_in < actual < d_out:
+            d_out = actual
+    return d_in, d_out
+
+
+@dataclass
+class RoomInfo:
+    key: str
+    id: str
+    number: str
+    type: str | None
+    capacity: int | None
+    companyId: str | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "number": self.number,
+            "type": self.type,
+            "capacity": self.capacity,
+            "companyId": self.companyId,
+        }
+
+
+@dataclass
+class Stay:
+    start: int   # índice da noite de entrada
+    end: int     # índice do dia de saída (exclusivo)
+    id: str
+    status: str
+
+
+@dataclass
+class _RoomState:
+    info: RoomInfo
+    booked: int = 0
+    blocked: int = 0
+    stays: list[Stay] = field(default_factory=list)
+    blocks: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+
+class OccupancyIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rooms: dict[str, _RoomState] = {}
+        self._aliases: dict[str, str] = {}
+        self._reservation_room: dict[str, str] = {}   # reserva -> chave do quarto
+        self._maintenance_room: dict[str, str] = {}   # chamado -> chave do quarto
+        self._dirty_reservations: set[str] = set()
+        self._dirty_maintenance: set[str] = set()
+        self._built_at = 0.0
+        self._room_sources = (None, None, None)
+        self._stale = True
+        self.generation = 0  # muda a cada alteração do índice (chave de cache p/ consumidores)
+        events.add_listener(self._on_event)
+
+    # ---------------- ciclo de vida ----------------
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+    def _on_event(self, event):
+        if event.type == "import" and event.data.get("kind") == "reservations":
+            # depois de uma carga grande, reconstruir sai mais barato que reaplicar cada id
+            self.invalidate()
+            return
+        doc_id = event.data.get("id")
+        if not doc_id:
+            return
+        with self._lock:
+            if event.type == "reservation":
+                self._dirty_reservations.add(doc_id)
+            elif event.type == "maintenance":
+                self._dirty_maintenance.add(doc_id)
+
+    def ensure_fresh(self):
+        sources = (cache.get("rooms"), cache.get("company_rooms"), cache.get("settings"))
+        with self._lock:
+            if self._stale or time.monotonic() - self._built_at > REBUILD_SECONDS:
+                self._rebuild(sources)
+                return
+            if any(a is not b for a, b in zip(sources, self._room_sources)):
+                if not self._sync_rooms(sources):
+                    self._rebuild(sources)
+                    return
+            if self._dirty_reservations or self._dirty_maintenance:
+                self._apply_dirty()
+
+    # ---------------- construção ----------------
+    def _room_infos(self, sources) -> tuple[dict[str, tuple[RoomInfo, str | None]], dict[str, str]]:
+        rooms, company_rooms, settings = sources
+        capacities = {_fold(k): v for k, v in ((settings or {}).get("roomCapacities") or {}).items()}
+        infos: dict[str, tuple[RoomInfo, str | None]] = {}
+        aliases: dict[str, str] = {}
+
+        def add_room(data: dict, company_id: str | None):
+            key = f"{company_id}/{data['id']}" if company_id else data["id"]
+            room_type = data.get("type") or data.get("roomType")
+            capacity = data.get("capacity")
+            if capacity is None:
+                capacity = capacities.get(_fold(room_type), DEFAULT_CAPACITIES.get(_fold(room_type)))
+            info = RoomInfo(
+                key=key,
+                id=data["id"],
+                number=str(data.get("number") or data.get("identifier") or data["id"]),
+                type=room_type,
+                capacity=int(capacity) if capacity is not None else None,
+                companyId=company_id,
+            )
+            infos[key] = (info, data.get("status"))
+            # Quartos principais têm prioridade nos apelidos (id > número > identifier)
+            for alias in (data.get("identifier"), data.get("number"), data["id"]):
+                if alias not in (None, ""):
+                    alias = str(alias).strip()
+                    if company_id is None or alias not in aliases:
+                        aliases[alias] = key
+            aliases[key] = key
+
+        for data in company_rooms:
+            add_room(data, data.get("companyId"))
+        for data in rooms:
+            add_room(data, None)
+        return infos, aliases
+
+    def _set_room_status(self, state: "_RoomState", status: str | None):
+        state.blocks.pop(_STATUS_BLOCK, None)
+        if _fold(status) == "manutencao":
+            today = date.today()
+            state.blocks[_STATUS_BLOCK] = (day_index(today), day_index(today + timedelta(days=HORIZON_DAYS)))
+        state.blocked = 0
+        for start, end in state.blocks.values():
+            state.blocked |= range_mask(start, end)
+
+    def _sync_rooms(self, sources) -> bool:
+        """Atualiza tipo/capacidade/status sem reler reservas. False se o conjunto de quartos mudou."""
+        infos, aliases = self._room_infos(sources)
+        if infos.keys() != self._rooms.keys() or aliases != self._aliases:
+            return False
+        for key, (info, status) in infos.items():
+            state = self._rooms[key]
+            state.info = info
+            self._set_room_status(state, status)
+        self._room_sources = sources
+        self.generation += 1
+        return True
+
+    def _rebuild(self, sources):
+        infos, aliases = self._room_infos(sources)
+        self._rooms = {key: _RoomState(info) for key, (info, _) in infos.items()}
+        self._aliases = aliases
+        self._reservation_room = {}
+        self._maintenance_room = {}
+        self._dirty_reservations.clear()
+        self._dirty_maintenance.clear()
+
+        cutoff = (date.today() - timedelta(days=LOOKBACK_DAYS)).isoformat()
+        query = db.collection("reservations").where("checkOut", ">=", cutoff)
+        for doc in query.stream():
+            self._put_reservation(doc.id, doc.to_dict() or {})
+        for doc in db.collection("maintenance").stream():
+            self._put_maintenance(doc.id, doc.to_dict() or {})
+        for key, (_, status) in infos.items():
+            self._set_room_status(self._rooms[key], status)
+
+        self._built_at = time.monotonic()
+        self._room_sources = sources
+        self._stale = False
+        self.generation += 1
+
+    def _apply_dirty(self):
+        res_ids, self._dirty_reservations = self._dirty_reservations, set()
+        mnt_ids, self._dirty_maintenance = self._dirty_maintenance, set()
+
+        refs = [db.collection("reservations").document(i) for i in res_ids]
+        refs += [db.collection("maintenance").document(i) for i in mnt_ids]
+        for snap in db.get_all(refs):
+            data = snap.to_dict() if snap.exists else None
+            if snap.reference.parent.id == "reservations":
+                self._put_reservation(snap.id, data)
+            else:
+                self._put_maintenance(snap.id, data)
+        self.generation += 1
+
+    def _put_reservation(self, res_id: str, data: dict | None):
+        old_key = self._reservation_room.pop(res_id, None)
+        if old_key in self._rooms:
+            state = self._rooms[old_key]
+            state.stays = [s for s in state.stays if s.id != res_id]
+            state.booked = self._bitmap(state.stays)
+
+        if not data or is_canceled(data):
+            return
+        key = self.resolve_room(data.get("roomId") or data.get("roomNumber"))
+        nights = stay_range(data)
+        if key is None or nights is None:
+            return
+
+        d_in, d_out = nights
+        state = self._rooms[key]
+        stay = Stay(day_index(d_in), day_index(d_out), res_id, stay_status(data))
+        bisect.insort(state.stays, stay, key=lambda s: (s.start, s.end))
+        state.booked |= range_mask(stay.start, stay.end)
+        self._reservation_room[res_id] = key
+
+    def _put_maintenance(self, mnt_id: str, data: dict | None):
+        old_key = self._maintenance_room.pop(mnt_id, None)
+        if old_key in self._rooms:
+            state = self._rooms[old_key]
+            state.blocks.pop(mnt_id, None)
+            state.blocked = 0
+            for start, end in state.blocks.values():
+                state.blocked |= range_mask(start, end)
+
+        if not data:
+            return
+        key = self.resolve_room(data.get("roomId") or data.get("roomIdentifier"))
+        opened = parse_day(data.get("openedAt"))
+        if key is None or not opened:
+            return
+
+        if _fold(data.get("status")) == "concluida":
+            completed = parse_day(data.get("completedOn"))
+            if not completed:
+                return
+            end = day_index(completed)
+        else:
+            # chamado aberto bloqueia o quarto até o horizonte do índice
+            end = day_index(date.today() + timedelta(days=HORIZON_DAYS))
+
+        start = day_index(opened)
+        if end <= start:
+            return
+        state = self._rooms[key]
+        state.blocks[mnt_id] = (start, end)
+        state.blocked |= range_mask(start, end)
+        self._maintenance_room[mnt_id] = key
+
+    @staticmethod
+    def _bitmap(stays: list[Stay]) -> int:
+        bits = 0
+        for s in stays:
+            bits |= range_mask(s.start, s.end)
+        return bits
+
+    # ---------------- consultas ----------------
+    def resolve_room(self, room_ref) -> str | None:
+        """Chave do quarto a partir de id de documento, número ou identifier."""
+        if room_ref in (None, ""):
+            return None
+        return self._aliases.get(str(room_ref).strip())
+
+    def room(self, key: str) -> RoomInfo | None:
+        state = self._rooms.get(key)
+        return state.info if state else None
+
+    def free_rooms(self, start: date, end: date, room_type: str | None = None,
+                   min_capacity: int | None = None) -> list[RoomInfo]:
+        """Quartos sem reserva nem manutenção em nenhuma noite de [start, end)."""
+        self.ensure_fresh()
+        mask = range_mask(day_index(start), day_index(end))
+        wanted_type = _fold(room_type) if room_type else None
+
+        with self._lock:
+            result = []
+            for state in self._rooms.values():
+                info = state.info
+                if wanted_type and _fold(info.type) != wanted_type:
+                    continue
+                if min_capacity and (info.capacity is None or info.capacity < min_capacity):
+                    continue
+                if (state.booked | state.blocked) & mask:
+                    continue
+                result.append(info)
+        return result
+
+    def is_free(self, key: str, start: date, end: date, ignore: str | None = None) -> bool:
+        return not self.conflicts(key, start, end, ignore=ignore) and not self.blocked(key, start, end)
+
+    def blocked(self, key: str, start: date, end: date) -> bool:
+        self.ensure_fresh()
+        with self._lock:
+            state = self._rooms.get(key)
+            return bool(state and state.blocked & range_mask(day_index(start), day_index(end)))
+
+    def conflicts(self, key: str, start: date, end: date, ignore: str | None = None) -> list[str]:
+        """Ids das reservas do quarto que se sobrepõem a [start, end)."""
+        self.ensure_fresh()
+        s, e = day_index(start), day_index(end)
+        with self._lock:
+            state = self._rooms.get(key)
+            if not state or not state.booked & range_mask(s, e):
+                return []
+            # estadias ordenadas por início: só as que começam antes de `e` podem colidir
+            hi = bisect.bisect_left(state.stays, e, key=lambda st: st.start)
+            return [st.id for st in state.stays[:hi] if st.end > s and st.id != ignore]
+
+    def room_of(self, res_id: str) -> str | None:
+        """Chave do quarto da reserva no índice (None se cancelada ou fora da janela)."""
+        self.ensure_fresh()
+        with self._lock:
+            return self._reservation_room.get(res_id)
+
+    def room_stays(self, key: str) -> list[Stay]:
+        self.ensure_fresh()
+        with self._lock:
+            state = self._rooms.get(key)
+            return list(state.stays) if state else []
+
+    def stays_in(self, start: date, end: date) -> dict[str, list[Stay]]:
+        """Estadias de cada quarto que tocam a janela [start, end)."""
+        self.ensure_fresh()
+        s, e = day_index(start), day_index(end)
+        window = range_mask(s, e)
+        with self._lock:
+            result = {}
+            for key, state in self._rooms.items():
+                if not state.booked & window:
+                    result[key] = []
+                    continue
+                hi = bisect.bisect_left(state.stays, e, key=lambda st: st.start)
+                result[key] = [st for st in state.stays[:hi] if st.end > s]
+            return result
+
+    def timeline(self, start: date, end: date) -> list[tuple[RoomInfo, list[Stay], list[tuple[int, int]]]]:
+        """(quarto, estadias, bloqueios) que tocam [start, end), para todos os quartos."""
+        self.ensure_fresh()
+        s, e = day_index(start), day_index(end)
+        with self._lock:
+            result = []
+            for state in self._rooms.values():
+                hi = bisect.bisect_left(state.stays, e, key=lambda st: st.start)
+                stays = [st for st in state.stays[:hi] if st.end > s]
+                blocks = [(bs, be) for bs, be in state.blocks.values() if bs < e and be > s]
+                result.append((state.info, stays, blocks))
+            return result
+
+    def window_bits(self, start: date, end: date) -> list[tuple[RoomInfo, int, int]]:
+        """(quarto, reservas, bloqueios) com os bitmaps recortados para [start, end) (bit 0 = start)."""
+        self.ensure_fresh()
+        s, e = day_index(start), day_index(end)
+        window = range_mask(0, e - s)
+        with self._lock:
+            return [(state.info, (state.booked >> s) & window, (state.blocked >> s) & window)
+                    for state in self._rooms.values()]
+
+    def rooms(self) -> list[RoomInfo]:
+        self.ensure_fresh()
+        with self._lock:
+            return [state.info for state in self._rooms.values()]
+
+
+index = OccupancyIndex()
+
+
+def invalidate():
+    """Força reconstrução completa na próxima consulta (ex.: após importações em massa)."""
+    index.invalidate()
@@ -0,0 +1,485 @@
+# app/services/bulk_import.py
+"""
+Importação em massa de hóspedes, empresas e reservas a partir de CSV/XLSX.
+
+O arquivo é lido linha a linha (CSV com `csv.reader`, XLSX com o
+openpyxl em modo read_only), então 100 mil linhas não são carregadas em
+memória. Cada linha é validada pelos modelos já usados na API (`Guest`,
+`Company`) e gravada por um `BulkWriter` (lotes + concorrência limitada).
+
+- Hóspedes e empresas são deduplicados por CPF/CNPJ (somente dígitos),
+  tanto dentro do arquivo quanto contra o que já existe no Firestore;
+  `on_duplicate="update"` atualiza o cadastro existente em vez de pular.
+- Reservas recebem id determinístico (quarto + datas + nome), então
+  reimportar o mesmo arquivo não duplica nada; sobreposição com reservas
+  existentes ou com outras linhas do arquivo é erro da linha. As reservas
+  são gravadas em transações por quarto que leem a agenda
+  (`room_calendar`), rejeitam as linhas que passaram a conflitar e gravam,
+  junto com cada reserva aceita, a estadia na agenda, a contribuição nos
+  consolidados mensais (`financial_rollups`) e o recebimento antigo no
+  índice de receitas (`income_index`) — os mesmos helpers das rotas de
+  reserva.
+
+Linhas importadas não publicam eventos `reservation` (100 mil eventos
+esvaziariam o buffer de replay do SSE); ao final sai um único evento
+`import` (`action: "finished"`), que os índices em memória assinam para
+se reconstruir por inteiro.
+
+`run_import()` é um gerador de eventos (`error`, `progress`, `summary`)
+usado pelo endpoint NDJSON e pela linha de comando:
+
+    python -m app.services.bulk_import guests hospedes.csv --dry-run
+"""
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import time
+import unicodedata
+from datetime import date, datetime
+
+from pydantic import BaseModel, ValidationError, model_validator
+
+from app.api.companies import Company
+from app.api.guests import Guest
+from app.core import events, versions
+from app.core.bulk import BulkWriter
+from app.core.firebase import db, firestore
+from app.services import availability, financial_rollups, income_index, reservation_model, room_calendar
+
+KINDS = ("guests", "companies", "reservations")
+FORMATS = ("csv", "xlsx")
+PROGRESS_EVERY = 1000
+
+
+class ReservationImport(BaseModel):
+    roomNumber: str
+    checkIn: date
+    checkOut: date
+    guestName: str | None = None
+    guestCPF: str | None = None
+    companyName: str | None = None
+    value: float = 0
+    paymentMethod: str | None = None
+    paymentStatus: str = "pendente"
+    notes: str | None = None
+
+    @model_validator(mode="after")
+    def _check(self):
+        if self.checkOut <= self.checkIn:
+            raise ValueError("checkOut deve ser posterior ao checkIn")
+        if not (self.guestName or self.companyName):
+            raise ValueError("Informe guestName ou companyName")
+        return self
+
+
+# Cabeçalhos aceitos (sem acento, minúsculos, sem espaços/_/-) -> campo do modelo
+HEADER_ALIASES = {
+    "guests": {
+        "fullname": "fullName", "nome": "fullName", "nomecompleto": "fullName", "hospede": "fullName",
+        "cpf": "cpf",
+        "phone": "phone", "telefone": "phone", "celular": "phone",
+        "email": "email",
+    },
+    "companies": {
+        "name": "name", "nome": "name", "empresa": "name", "razaosocial": "name",
+        "responsible": "responsible", "responsavel": "responsible", "contato": "responsible",
+        "cnpj": "cnpj",
+        "phone": "phone", "telefone": "phone",
+        "email": "email",
+    },
+    "reservations": {
+        "roomnumber": "roomNumber", "room": "roomNumber", "quarto": "roomNumber", "roomid": "roomNumber",
+        "checkin": "checkIn", "entrada": "checkIn",
+        "checkout": "checkOut", "saida": "checkOut",
+        "guestname": "guestName", "hospede": "guestName", "nome": "guestName",
+        "guestcpf": "guestCPF", "cpf": "guestCPF",
+        "companyname": "companyName", "empresa": "companyName",
+        "value": "value", "valor": "value",
+        "paymentmethod": "paymentMethod", "formapagamento": "paymentMethod",
+        "paymentstatus": "paymentStatus", "statuspagamento": "paymentStatus",
+        "notes": "notes", "observacoes": "notes",
+    },
+}
+
+
+def _fold_header(text) -> str:
+    folded = unicodedata.normalize("NFKD", str(text or "").strip().lower())
+    return "".join(c for c in folded if c.isalnum() and not unicodedata.combining(c))
+
+
+def _cell(value) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def document_digits(value, size: int) -> str:
+    """CPF (11) / CNPJ (14) só com dígitos; repõe zeros à esquerda perdidos na planilha."""
+    digits = "".join(c for c in str(value or "") if c.isdigit())
+    if size - 3 <= len(digits) < size:
+        digits = digits.zfill(size)
+    return digits
+
+
+# =======================================================
+# 🔹 Leitura linha a linha
+# =======================================================
+def iter_rows(path: str, fmt: str, kind: str):
+    """Gera (número_da_linha, {campo: valor}) sem carregar o arquivo inteiro."""
+    aliases = HEADER_ALIASES[kind]
+
+    def mapped(header, values):
+        row = {}
+        for name, value in zip(header, values):
+            field = aliases.get(_fold_header(name))
+            if field and row.get(field) is None:
+                row[field] = _cell(value)
+        return row
+
+    if fmt == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            for number, values in enumerate(rows, start=2):
+                if values and any(v not in (None, "") for v in values):
+                    yield number, mapped(header, values)
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        sample = fh.read(8192)
+        fh.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(fh, dialect)
+        header = next(reader, None) or []
+        for values in reader:
+            if any(v.strip() for v in values):
+                yield reader.line_num, mapped(header, values)
+
+
+def _validation_errors(exc: ValidationError) -> list[dict]:
+    return [
+        {"field": ".".join(str(p) for p in err["loc"]) or None, "message": err["msg"]}
+        for err in exc.errors()
+    ]
+
+
+# =======================================================
+# 🔹 Preparação por tipo
+# =======================================================
+def _existing_documents(collection: str, field: str, size: int) -> dict[str, str]:
+    """{dígitos do CPF/CNPJ: id do documento} com leitura só do campo necessário."""
+    existing = {}
+    for doc in db.collection(collection).select([field]).stream():
+        digits = document_digits((doc.to_dict() or {}).get(field), size)
+        if digits:
+            existing.setdefault(digits, doc.id)
+    return existing
+
+
+class _GuestImporter:
+    collection = "guests"
+    key_field, key_size, label = "cpf", 11, "CPF"
+    model = Guest
+    written = 0  # gravações fora do BulkWriter (só reservas usam)
+
+    def __init__(self, on_duplicate: str):
+        self.on_duplicate = on_duplicate
+        self.existing = _existing_documents(self.collection, self.key_field, self.key_size)
+        self.seen: set[str] = set()
+
+    def document(self, item) -> dict:
+        return {
+            "fullName": item.fullName.strip(),
+            "cpf": item.cpf.strip(),
+            "phone": item.phone or "",
+            "email": item.email or "",
+        }
+
+    def prepare(self, row: dict):
+        """(ref, dados, merge) para gravar, None para pular; ValueError = erro da linha."""
+        item = self.model(**row)
+        key = document_digits(getattr(item, self.key_field), self.key_size)
+        if len(key) != self.key_size:
+            raise ValueError(f"{self.label} inválido: {getattr(item, self.key_field)}")
+        if key in self.seen:
+            raise ValueError(f"{self.label} repetido no arquivo: {key}")
+        self.seen.add(key)
+
+        data = self.document(item)
+        existing_id = self.existing.get(key)
+        if existing_id:
+            if self.on_duplicate != "update":
+                return None
+            return db.collection(self.collection).document(existing_id), data, True
+        data["createdAt"] = date.today().isoformat()
+        return db.collection(self.collection).document(), data, False
+
+    def write(self, writer: BulkWriter, number: int, prepared) -> list[dict]:
+        """Enfileira a linha preparada; devolve eventos `error` de linhas rejeitadas."""
+        ref, data, merge = prepared
+        writer.set(ref, data, merge=merge)
+        return []
+
+    def flush(self, writer: BulkWriter) -> list[dict]:
+        return []
+
+    def finish(self, dry_run: bool, written: int):
+        if not dry_run:
+            versions.bump(self.collection)
+            _publish_finished(self.collection, written)
+
+
+class _CompanyImporter(_GuestImporter):
+    collection = "companies"
+    key_field, key_size, label = "cnpj", 14, "CNPJ"
+    model = Company
+
+    def document(self, item) -> dict:
+        return {
+            "name": item.name,
+            "responsible": item.responsible,
+            "cnpj": item.cnpj,
+            "email": item.email or "",
+            "phone": item.phone or "",
+        }
+
+
+class _ReservationImporter:
+    collection = "reservations"
+    # linhas por transação de quarto: cada uma grava reserva, até 2 meses de
+    # consolidado e o índice de receitas (limite de 500 gravações por commit)
+    ROOM_BATCH = 50
+
+    def __init__(self, on_duplicate: str):
+        availability.index.ensure_fresh()
+        self.index = availability.index
+        self.today = date.today()
+        self.in_file: dict[str, list[tuple[date, date, str]]] = {}
+        self.pending: dict[str, list[tuple[int, object, dict]]] = {}
+        self.written = 0
+
+    def prepare(self, row: dict):
+        item = ReservationImport(**row)
+        room_key = self.index.resolve_room(item.roomNumber)
+        if room_key is None:
+            raise ValueError(f"Quarto não encontrado: {item.roomNumber}")
+
+        name = item.guestName or item.companyName
+        fingerprint = f"{room_key}|{item.checkIn}|{item.checkOut}|{_fold_header(name)}"
+        doc_id = "imp-" + hashlib.sha1(fingerprint.encode()).hexdigest()[:20]
+
+        conflicts = self.index.conflicts(room_key, item.checkIn, item.checkOut, ignore=doc_id)
+        conflicts += [
+            other for start, end, other in self.in_file.get(room_key, ())
+            if start < item.checkOut and end > item.checkIn and other != doc_id
+        ]
+        if conflicts:
+            raise ValueError(f"Quarto já reservado no período: {', '.join(sorted(set(conflicts)))}")
+        self.in_file.setdefault(room_key, []).append((item.checkIn, item.checkOut, doc_id))
+
+        room = self.index.room(room_key)
+        finished = item.checkOut <= self.today
+        data = {
+            "roomId": room.id,
+            "roomNumber": room.number,
+            "companyId": room.companyId,
+            "guestName": item.guestName,
+            "guestCPF": item.guestCPF,
+            "companyName": item.companyName,
+            "checkIn": item.checkIn.isoformat(),
+            "checkOut": item.checkOut.isoformat(),
+            "notes": item.notes or "",
+            "value": item.value,
+            "paymentMethod": item.paymentMethod,
+            "paymentStatus": item.paymentStatus,
+            # estadias já encerradas entram como histórico
+            "status": "finalizada" if finished else "confirmado",
+            "checkInStatus": "concluido" if finished else "pendente",
+            "checkOutStatus": "concluido" if finished else "pendente",
+            "createdAt": self.today.isoformat(),
+            "importedAt": datetime.now().isoformat(timespec="seconds"),
+        }
+        return db.collection(self.collection).document(doc_id), reservation_model.normalize(data), False
+
+    def write(self, writer: BulkWriter, number: int, prepared) -> list[dict]:
+        # a simulação já conferiu índice e arquivo em prepare(); nada é gravado
+        if writer.dry_run:
+            return []
+        ref, data, _ = prepared
+        room_key = self.index.resolve_room(data["roomId"])
+        rows = self.pending.setdefault(room_key, [])
+        rows.append((number, ref, data))
+        if len(rows) < self.ROOM_BATCH:
+            return []
+        return self._commit_room(room_key, self.pending.pop(room_key))
+
+    def flush(self, writer: BulkWriter) -> list[dict]:
+        errors = []
+        for room_key in list(self.pending):
+            errors += self._commit_room(room_key, self.pending.pop(room_key))
+        return errors
+
+    def _commit_room(self, room_key: str, rows: list) -> list[dict]:
+        try:
+            accepted, rejected = firestore.transactional(_reserve_rows)(db.transaction(), room_key, rows)
+        except Exception as e:
+            return [{"type": "error", "row": number, "errors": [{"field": None, "message": str(e)}]}
+                    for number, _, _ in rows]
+        if accepted:
+            self.written += len(accepted)
+            versions.bump(self.collection, "incomes")
+        return [
+            {"type": "error", "row": number, "errors": [{
+                "field": None,
+                "message": f"Quarto já reservado no período: {', '.join(conflicts)}",
+            }]}
+            for number, conflicts in rejected
+        ]
+
+    def finish(self, dry_run: bool, written: int):
+        if not dry_run:
+            _publish_finished(self.collection, written)
+
+
+def _reserve_rows(transaction, room_key: str, rows: list) -> tuple[list, list[tuple[int, list[str]]]]:
+    """
+    Grava as reservas de um quarto com a agenda, os consolidados e o índice
+    de receitas, na mesma transação. Linhas que conflitam com a agenda
+    atual (ex.: reserva feita pela recepção durante a importação) ficam de
+    fora. Retorna ([(ref, dados)], [(linha, conflitos)]).
+    """
+    calendar = room_calendar.read(transaction, room_key)
+    # reimportação: a contribuição antiga da reserva sai dos consolidados
+    existing = {snap.id: snap.to_dict() for snap in db.get_all([ref for _, ref, _ in rows], transaction=transaction)
+                if snap.exists}
+    accepted, rejected = [], []
+    for number, ref, data in rows:
+        check_in, check_out = reservation_model.check_in_date(data), reservation_model.check_out_date(data)
+        conflicts = calendar.conflicts(check_in, check_out, ignore=ref.id)
+        if conflicts:
+            rejected.append((number, conflicts))
+            continue
+        calendar.add(ref.id, check_in, check_out)
+        accepted.append((ref, data))
+
+    for ref, data in accepted:
+        before = existing.get(ref.id)
+        transaction.set(ref, data)
+        financial_rollups.stage_change(transaction, "reservations", before, data)
+        legacy = income_index.legacy_entry(ref.id, data)
+        if legacy:
+            income_index.stage(transaction, *legacy)
+        elif before and income_index.legacy_entry(ref.id, before):
+            transaction.delete(income_index.index_ref(income_index.legacy_fingerprint(ref.id)))
+    calendar.stage(transaction)
+    return accepted, rejected
+
+
+def _publish_finished(kind: str, written: int):
+    events.publish("import", {"kind": kind, "action": "finished", "written": written})
+
+
+_IMPORTERS = {
+    "guests": _GuestImporter,
+    "companies": _CompanyImporter,
+    "reservations": _ReservationImporter,
+}
+
+
+# =======================================================
+# 🔹 Execução
+# =======================================================
+def run_import(kind: str, path: str, fmt: str, *, on_duplicate: str = "skip", dry_run: bool = False,
+               max_in_flight: int = 4, progress_every: int = PROGRESS_EVERY):
+    """Importa o arquivo e gera eventos `error` (por linha), `progress` e `summary`."""
+    if kind not in _IMPORTERS:
+        raise ValueError(f"Tipo inválido: {kind}. Use: {', '.join(KINDS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt}. Use: {', '.join(FORMATS)}")
+
+    started = time.monotonic()
+    importer = _IMPORTERS[kind](on_duplicate)
+    counts = {"rows": 0, "queued": 0, "skipped": 0, "invalid": 0, "rejected": 0}
+
+    def progress(event_type: str) -> dict:
+        elapsed = max(time.monotonic() - started, 1e-9)
+        return {
+            "type": event_type,
+            **counts,
+            "writer": writer.stats(),
+            "rowsPerSecond": round(counts["rows"] / elapsed, 1),
+        }
+
+    with BulkWriter(max_in_flight=max_in_flight, dry_run=dry_run) as writer:
+        for number, row in iter_rows(path, fmt, kind):
+            counts["rows"] += 1
+            try:
+                prepared = importer.prepare(row)
+            except ValidationError as e:
+                counts["invalid"] += 1
+                yield {"type": "error", "row": number, "errors": _validation_errors(e)}
+                prepared = False
+            except ValueError as e:
+                counts["invalid"] += 1
+                yield {"type": "error", "row": number, "errors": [{"field": None, "message": str(e)}]}
+                prepared = False
+
+            if prepared:
+                counts["queued"] += 1
+                for event in importer.write(writer, number, prepared):
+                    counts["rejected"] += 1
+                    yield event
+            elif prepared is None:
+                counts["skipped"] += 1
+
+            if counts["rows"] % progress_every == 0:
+                yield progress("progress")
+
+        for event in importer.flush(writer):
+            counts["rejected"] += 1
+            yield event
+
+    for failure in writer.errors:
+        yield {"type": "error", "row": None, "errors": [{"field": None, "message": failure["error"]}],
+               "documents": len(failure["documents"])}
+    if writer.written or importer.written:
+        importer.finish(dry_run, writer.written + importer.written)
+    yield progress("summary")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa hóspedes, empresas ou reservas de CSV/XLSX.")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="padrão: pela extensão do arquivo")
+    parser.add_argument("--on-duplicate", choices=("skip", "update"), default="skip")
+    parser.add_argument("--dry-run", action="store_true", help="valida sem gravar")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("xlsx" if args.path.lower().endswith((".xlsx", ".xlsm")) else "csv")
+    for event in run_import(args.kind, args.path, fmt, on_duplicate=args.on_duplicate,
+                            dry_run=args.dry_run, max_in_flight=args.concurrency):
+        stream = sys.stdout if event["type"] == "error" else sys.stderr
+        print(json.dumps(event, ensure_ascii=False), file=stream, flush=True)
+
+
+if __name__ == "__main__":
+    main()
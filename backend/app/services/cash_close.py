@@ -0,0 +1,311 @@
+# app/services/cash_close.py
+"""
+Fechamento de caixa diário imutável em `cash_close/{yyyy-MM-dd}`.
+
+O fechamento de um dia reúne tudo o que entrou e saiu naquela data:
+- lançamentos do livro de pagamentos (`reservations/{id}/payments`, por
+  `paidOn`), incluindo estornos;
+- reservas pagas antes do livro (sem `ledger`, por `paidOn`);
+- receitas manuais (`incomes`, por `date`);
+- despesas (`expenses`, por `date`).
+
+O documento é gravado com `create()` — se já existe, o fechamento falha
+com 409 e nunca é sobrescrito. Relatórios históricos (e o dashboard
+financeiro por período, via `period_totals`) leem um documento por dia em
+vez de varrer as coleções; `reconcile()` recalcula o dia a partir
+dos documentos atuais e mostra a diferença (edições feitas depois do
+fechamento).
+
+Com `CASH_CLOSE_AUTO=1` uma thread fecha, a cada
+`CASH_CLOSE_INTERVAL_SECONDS`, os dias anteriores ainda abertos (até
+`CASH_CLOSE_BACKFILL_DAYS` para trás).
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+
+from app.core.firebase import db, firestore, api_exceptions
+from app.services import financial_rollups, reservation_model
+
+COLLECTION = "cash_close"
+SCHEMA_VERSION = 1
+
+AUTO_ENABLED = os.getenv("CASH_CLOSE_AUTO", "0").lower() in ("1", "true", "yes")
+INTERVAL_SECONDS = float(os.getenv("CASH_CLOSE_INTERVAL_SECONDS", "3600"))
+BACKFILL_DAYS = int(os.getenv("CASH_CLOSE_BACKFILL_DAYS", "31"))
+
+_stop = threading.Event()
+
+# Campos comparados pela reconciliação
+_TOTAL_FIELDS = ("revenueCents", "expensesCents", "netCents", "entriesCount", "expensesCount")
+
+
+def close_ref(day: date):
+    return db.collection(COLLECTION).document(day.isoformat())
+
+
+def parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Data inválida (use yyyy-MM-dd)")
+
+
+# =======================================================
+# 🔹 Cálculo do dia
+# =======================================================
+def _on_days(query, field: str, first: str, last: str):
+    """Igualdade para um dia só; intervalo [first, last] para vários."""
+    if first == last:
+        return query.where(field, "==", first)
+    return query.where(field, ">=", first).where(field, "<=", last)
+
+
+def _entry_rows(first: str, last: str):
+    """(dia, lançamento) de [first, last]."""
+    for doc in _on_days(db.collection_group("payments"), "paidOn", first, last).stream():
+        data = doc.to_dict() or {}
+        yield data.get("paidOn"), {
+            "source": "payment",
+            "id": doc.id,
+            "reservationId": data.get("reservationId") or doc.reference.parent.parent.id,
+            "kind": data.get("kind"),
+            "method": data.get("method") or financial_rollups.DEFAULT_METHOD,
+            "amountCents": int(data.get("amountCents") or 0),
+        }
+
+    for doc in _on_days(db.collection("reservations"), "paidOn", first, last).stream():
+        data = doc.to_dict() or {}
+        if data.get("ledger") or reservation_model.payment_status(data) != reservation_model.PAYMENT_PAID:
+            continue
+        yield data.get("paidOn"), {
+            "source": "reservation",
+            "id": doc.id,
+            "reservationId": doc.id,
+            "kind": "pagamento",
+            "method": data.get("paymentMethod") or financial_rollups.DEFAULT_METHOD,
+            "amountCents": reservation_model.legacy_received_cents(data),
+        }
+
+    for doc in _on_days(db.collection("incomes"), "date", first, last).stream():
+        data = doc.to_dict() or {}
+        if data.get("duplicateOf"):
+            continue  # já contada pelo pagamento da reserva
+        yield data.get("date"), {
+            "source": "income",
+            "id": doc.id,
+            "description": data.get("description") or "",
+            "method": data.get("method") or financial_rollups.DEFAULT_METHOD,
+            "amountCents": reservation_model.to_cents(data.get("amount")),
+        }
+
+
+def _expense_rows(first: str, last: str):
+    """(dia, despesa) de [first, last]."""
+    for doc in _on_days(db.collection("expenses"), "date", first, last).stream():
+        data = doc.to_dict() or {}
+        yield data.get("date"), {
+            "id": doc.id,
+            "description": data.get("description") or "",
+            "category": data.get("category") or financial_rollups.DEFAULT_CATEGORY,
+            "amountCents": reservation_model.to_cents(data.get("amount")),
+        }
+
+
+def _entries(day: str) -> list[dict]:
+    return sorted((e for _, e in _entry_rows(day, day)), key=lambda e: (e["source"], e["id"]))
+
+
+def _expenses(day: str) -> list[dict]:
+    return sorted((e for _, e in _expense_rows(day, day)), key=lambda e: e["id"])
+
+
+def _digest(entries: list[dict], expenses: list[dict]) -> str:
+    payload = json.dumps({"entries": entries, "expenses": expenses}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def compute(day: date) -> dict:
+    """Totais do dia calculados a partir dos documentos atuais."""
+    iso = day.isoformat()
+    entries, expenses = _entries(iso), _expenses(iso)
+    by_method, by_category = defaultdict(int), defaultdict(int)
+    for entry in entries:
+        by_method[entry["method"]] += entry["amountCents"]
+    for expense in expenses:
+        by_category[expense["category"]] += expense["amountCents"]
+    revenue = sum(by_method.values())
+    spent = sum(by_category.values())
+    return {
+        "date": iso,
+        "revenueCents": revenue,
+        "revenueByMethod": dict(by_method),
+        "expensesCents": spent,
+        "expensesByCategory": dict(by_category),
+        "netCents": revenue - spent,
+        "entriesCount": len(entries),
+        "expensesCount": len(expenses),
+        "entries": entries,
+        "expenses": expenses,
+        "digest": _digest(entries, expenses),
+    }
+
+
+# =======================================================
+# 🔹 Fechamento, leitura e reconciliação
+# =======================================================
+def close(day: date, closed_by: str | None = None) -> dict:
+    """Grava o fechamento imutável do dia (409 se o dia já foi fechado)."""
+    if day >= date.today():
+        raise HTTPException(status_code=400, detail="Só é possível fechar dias anteriores a hoje")
+    snapshot = compute(day) | {"closedBy": closed_by or "sistema", "schemaVersion": SCHEMA_VERSION}
+    try:
+        close_ref(day).create(snapshot | {"closedAt": firestore.SERVER_TIMESTAMP})
+    except api_exceptions.AlreadyExists:
+        raise HTTPException(status_code=409, detail=f"Caixa de {day.isoformat()} já foi fechado")
+    return snapshot
+
+
+def get(day: date) -> dict | None:
+    snap = close_ref(day).get()
+    return snap.to_dict() if snap.exists else None
+
+
+def read_range(first: date, last: date, with_entries: bool = False) -> dict:
+    """Fechamentos de [first, last] (uma leitura por dia) e a soma do período."""
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    closes, missing = [], []
+    totals = {"revenueCents": 0, "expensesCents": 0, "netCents": 0}
+    by_method: dict[str, int] = defaultdict(int)
+    by_category: dict[str, int] = defaultdict(int)
+    # get_all não garante a ordem: indexa pelo id do documento
+    snaps = {snap.id: snap for snap in db.get_all([close_ref(d) for d in days])}
+    for day in days:
+        snap = snaps.get(day.isoformat())
+        if snap is None or not snap.exists:
+            missing.append(day.isoformat())
+            continue
+        doc = snap.to_dict() or {}
+        for key in totals:
+            totals[key] += int(doc.get(key) or 0)
+        for method, cents in (doc.get("revenueByMethod") or {}).items():
+            by_method[method] += cents
+        for category, cents in (doc.get("expensesByCategory") or {}).items():
+            by_category[category] += cents
+        if not with_entries:
+            doc = {k: v for k, v in doc.items() if k not in ("entries", "expenses")}
+        closes.append(doc)
+    return {"from": first.isoformat(), "to": last.isoformat(), "closes": closes,
+            "openDays": missing,
+            "totals": totals | {"revenueByMethod": dict(by_method), "expensesByCategory": dict(by_category)}}
+
+
+def period_totals(first: date, last: date) -> dict:
+    """
+    Totais de [first, last]: dias fechados vêm dos documentos imutáveis
+    (`read_range`); só os dias ainda abertos são calculados a partir das
+    coleções, com uma consulta por coleção no intervalo desses dias.
+    """
+    closed = read_range(first, last)
+    totals = closed["totals"]
+    by_method = defaultdict(int, totals["revenueByMethod"])
+    by_category = defaultdict(int, totals["expensesByCategory"])
+    revenue, spent = totals["revenueCents"], totals["expensesCents"]
+
+    open_days = set(closed["openDays"])
+    if open_days:
+        lo, hi = min(open_days), max(open_days)
+        for day, entry in _entry_rows(lo, hi):
+            if day in open_days:
+                by_method[entry["method"]] += entry["amountCents"]
+                revenue += entry["amountCents"]
+        for day, expense in _expense_rows(lo, hi):
+            if day in open_days:
+                by_category[expense["category"]] += expense["amountCents"]
+                spent += expense["amountCents"]
+
+    return {
+        "closedDays": [c["date"] for c in closed["closes"]],
+        "openDays": closed["openDays"],
+        "totals": {
+            "revenueCents": revenue,
+            "revenueByMethod": dict(by_method),
+            "expensesCents": spent,
+            "expensesByCategory": dict(by_category),
+            "netCents": revenue - spent,
+        },
+    }
+
+
+def reconcile(day: date) -> dict:
+    """Compara o fechamento gravado com os documentos atuais do dia."""
+    closed = get(day)
+    if closed is None:
+        raise HTTPException(status_code=404, detail=f"Caixa de {day.isoformat()} não foi fechado")
+    current = compute(day)
+    if current["digest"] == closed.get("digest"):
+        return {"date": day.isoformat(), "inSync": True, "drift": {}, "added": [], "removed": [], "changed": []}
+
+    def keyed(rows, prefix):
+        return {(prefix, r.get("source", ""), r["id"]): r for r in rows}
+
+    before = keyed(closed.get("entries") or [], "entry") | keyed(closed.get("expenses") or [], "expense")
+    after = keyed(current["entries"], "entry") | keyed(current["expenses"], "expense")
+    drift = {f: current[f] - int(closed.get(f) or 0) for f in _TOTAL_FIELDS}
+    return {
+        "date": day.isoformat(),
+        "inSync": False,
+        "drift": {f: v for f, v in drift.items() if v},
+        "added": [after[k] for k in after.keys() - before.keys()],
+        "removed": [before[k] for k in before.keys() - after.keys()],
+        "changed": [{"before": before[k], "after": after[k]}
+                    for k in before.keys() & after.keys() if before[k] != after[k]],
+    }
+
+
+def close_pending(until: date | None = None) -> list[str]:
+    """Fecha os dias ainda abertos entre `until - BACKFILL_DAYS` e `until` (padrão: ontem)."""
+    until = until or date.today() - timedelta(days=1)
+    days = [until - timedelta(days=i) for i in range(BACKFILL_DAYS)]
+    existing = {snap.id for snap in db.get_all([close_ref(d) for d in days]) if snap.exists}
+    closed = []
+    for day in sorted(days):
+        if day.isoformat() in existing:
+            continue
+        try:
+            close(day)
+            closed.append(day.isoformat())
+        except HTTPException as e:
+            if e.status_code != 409:
+                raise
+    return closed
+
+
+# =======================================================
+# 🔹 Job automático (chamado pelo app/main.py)
+# =======================================================
+def _loop():
+    while True:
+        try:
+            closed = close_pending()
+            if closed:
+                print(f"✅ Caixa fechado: {', '.join(closed)}")
+        except Exception as e:
+            print(f"⚠️ Falha no fechamento de caixa: {e}")
+        if _stop.wait(INTERVAL_SECONDS):
+            return
+
+
+def start():
+    if not AUTO_ENABLED:
+        return
+    threading.Thread(target=_loop, name="cash-close", daemon=True).start()
+
+
+def stop():
+    _stop.set()
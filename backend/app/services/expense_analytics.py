@@ -0,0 +1,113 @@
+# app/services/expense_analytics.py
+"""
+Análise de despesas por categoria × mês, a partir dos consolidados
+`financial_monthly` (um documento lido por mês, qualquer que seja o
+volume de despesas).
+
+Orçamentos mensais ficam em settings.expenseBudgets:
+
+    {"Manutenção": 1500, "Limpeza": 800, "_total": 5000}
+
+(valores em reais; `_total` é o orçamento de todas as categorias). Para o
+mês corrente a projeção é linear — gasto até hoje ÷ dias decorridos ×
+dias do mês — e o estouro projetado é a diferença para o orçamento.
+"""
+import calendar
+from datetime import date
+
+from app.core import cache
+from app.services import financial_rollups, reservation_model
+
+TOTAL_BUDGET_KEY = "_total"
+
+
+def budgets_cents(settings: dict | None = None) -> dict[str, int]:
+    settings = settings if settings is not None else (cache.get("settings") or {})
+    return {
+        str(category): reservation_model.to_cents(value)
+        for category, value in (settings.get("expenseBudgets") or {}).items()
+        if reservation_model.to_cents(value) > 0
+    }
+
+
+def _previous_month(month: str) -> str:
+    year, m = int(month[:4]), int(month[5:7])
+    return f"{year - 1:04d}-12" if m == 1 else f"{year:04d}-{m - 1:02d}"
+
+
+def _delta(current: int, previous: int | None) -> dict | None:
+    if previous is None:
+        return None
+    return {
+        "cents": current - previous,
+        "percent": round((current - previous) / previous * 100, 1) if previous else None,
+    }
+
+
+def _series(by_month: dict[str, int], months: list[str], previous: int | None) -> list[dict]:
+    rows = []
+    for month in months:
+        cents = by_month.get(month, 0)
+        rows.append({"month": month, "cents": cents, "delta": _delta(cents, previous)})
+        previous = cents
+    return rows
+
+
+def _projection(spent: int, budget: int | None, today: date) -> dict:
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    projected = round(spent / today.day * days_in_month)
+    result = {"spentCents": spent, "projectedCents": projected, "budgetCents": budget}
+    if budget:
+        result |= {
+            "projectedOverrunCents": max(projected - budget, 0),
+            "budgetUsedPercent": round(spent / budget * 100, 1),
+            "status": "estouro" if spent > budget else "risco" if projected > budget else "ok",
+        }
+    return result
+
+
+def analyze(first: str, last: str, today: date | None = None) -> dict:
+    """Totais por categoria e mês de [first, last] ('YYYY-MM'), variação mês a mês e orçamentos."""
+    today = today or date.today()
+    months = financial_rollups.months_between(first, last)
+    previous_month = _previous_month(first)
+    docs = financial_rollups.read_months(previous_month, last)
+
+    by_category: dict[str, dict[str, int]] = {}
+    totals: dict[str, int] = {}
+    for month, doc in docs.items():
+        totals[month] = int(doc.get("expensesCents") or 0)
+        for category, cents in (doc.get("expensesByCategory") or {}).items():
+            by_category.setdefault(category, {})[month] = int(cents)
+
+    budgets = budgets_cents()
+    current = today.strftime("%Y-%m")
+    categories = []
+    for category in sorted(by_category.keys() | (budgets.keys() - {TOTAL_BUDGET_KEY})):
+        series = by_category.get(category, {})
+        row = {
+            "category": category,
+            "totalCents": sum(series.get(m, 0) for m in months),
+            "months": _series(series, months, series.get(previous_month, 0) if previous_month in docs else None),
+            "budgetCents": budgets.get(category),
+        }
+        if current in months:
+            row["currentMonth"] = _projection(series.get(current, 0), budgets.get(category), today)
+        categories.append(row)
+    categories.sort(key=lambda r: -r["totalCents"])
+
+    result = {
+        "from": first,
+        "to": last,
+        "monthsWithData": sorted(m for m in docs if m in months),
+        "totalCents": sum(totals.get(m, 0) for m in months),
+        "months": _series(totals, months, totals.get(previous_month) if previous_month in docs else None),
+        "categories": categories,
+    }
+    if current in months:
+        result["currentMonth"] = _projection(totals.get(current, 0), budgets.get(TOTAL_BUDGET_KEY), today)
+        result["currentMonth"]["overBudget"] = [
+            r["category"] for r in categories
+            if r.get("currentMonth", {}).get("status") in ("risco", "estouro")
+        ]
+    return result
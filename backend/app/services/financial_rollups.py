@@ -0,0 +1,222 @@
+# app/services/financial_rollups.py
+"""
+Consolidados financeiros mensais em `financial_monthly/{YYYY-MM}`.
+
+Cada reserva, receita manual e despesa "contribui" com valores (em
+centavos) para um ou mais meses:
+
+- reserva paga       → revenueCents / revenueByMethod / reservationRevenueCents
+                       no mês do pagamento (`paidOn`, ou checkOut nos antigos)
+- lançamento do livro de pagamentos (`reservations/{id}/payments`)
+                     → as mesmas chaves no mês do lançamento; reservas com
+                       livro (`ledger`) não contam receita pela reserva
+- saldo devedor      → receivablesCents / receivablesCount no mês do checkOut
+- receita manual     → revenueCents / revenueByMethod / manualIncomeCents
+- despesa            → expensesCents / expensesByCategory
+- profitCents        = receitas − despesas
+
+Quem grava calcula a contribuição antes e depois da mudança e aplica só a
+diferença com `Increment`, no mesmo lote/transação do documento
+(`stage_change`). Assim cancelar uma reserva paga estorna a receita, e
+registrar o pagamento move o valor de "a receber" para "receita".
+`rebuild()` recalcula tudo do zero (ex.: após alterações feitas fora da
+API).
+"""
+from collections import defaultdict
+from datetime import date
+
+from app.core.bulk import BulkWriter
+from app.core.firebase import db, firestore
+from app.services import reservation_model
+
+COLLECTION = "financial_monthly"
+
+DEFAULT_METHOD = "Outros"
+DEFAULT_CATEGORY = "Outros"
+
+# Caminhos (tuplas) somados com Increment; mapas aninhados viram campos "a.b"
+Contribution = dict[tuple[str, tuple[str, ...]], int]
+
+
+def month_key(value) -> str | None:
+    """'2025-03-10', date ou datetime -> '2025-03'."""
+    if isinstance(value, date):
+        return value.strftime("%Y-%m")
+    text = str(value or "")
+    if len(text) >= 7 and text[4] == "-" and text[:4].isdigit() and text[5:7].isdigit():
+        return text[:7]
+    return None
+
+
+def months_between(first: str, last: str) -> list[str]:
+    year, month = int(first[:4]), int(first[5:7])
+    end = (int(last[:4]), int(last[5:7]))
+    months = []
+    while (year, month) <= end:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def rollup_ref(month: str):
+    return db.collection(COLLECTION).document(month)
+
+
+# =======================================================
+# 🔹 Contribuições
+# =======================================================
+def reservation_contribution(data: dict | None) -> Contribution:
+    result: Contribution = defaultdict(int)
+    if not data or reservation_model.stay_status(data) == reservation_model.STATUS_CANCELED:
+        return result
+
+    payment = reservation_model.payment_status(data)
+    if payment == reservation_model.PAYMENT_PAID and not data.get("ledger"):
+        month = month_key(data.get("paidOn")) or month_key(data.get("checkOut"))
+        cents = int(round((reservation_model.amount_received(data) or reservation_model.amount(data)) * 100))
+        if month and cents:
+            method = data.get("paymentMethod") or DEFAULT_METHOD
+            result[(month, ("revenueCents",))] += cents
+            result[(month, ("reservationRevenueCents",))] += cents
+            result[(month, ("revenueByMethod", method))] += cents
+            result[(month, ("profitCents",))] += cents
+    month = month_key(data.get("checkOut"))
+    cents = int(round(reservation_model.balance_due(data) * 100))
+    if month and cents:
+        result[(month, ("receivablesCents",))] += cents
+        result[(month, ("receivablesCount",))] += 1
+    return result
+
+
+def payment_contribution(data: dict | None) -> Contribution:
+    """Lançamento do livro de pagamentos (estornos entram negativos)."""
+    result: Contribution = defaultdict(int)
+    month = month_key((data or {}).get("paidOn"))
+    cents = int((data or {}).get("amountCents") or 0)
+    if month and cents:
+        method = data.get("method") or DEFAULT_METHOD
+        result[(month, ("revenueCents",))] += cents
+        result[(month, ("reservationRevenueCents",))] += cents
+        result[(month, ("revenueByMethod", method))] += cents
+        result[(month, ("profitCents",))] += cents
+    return result
+
+
+def income_contribution(data: dict | None) -> Contribution:
+    result: Contribution = defaultdict(int)
+    if data and data.get("duplicateOf"):
+        # receita manual que registra um pagamento já lançado (ver income_index)
+        return result
+    month = month_key((data or {}).get("date"))
+    cents = reservation_model.to_cents((data or {}).get("amount"))
+    if month and cents:
+        method = data.get("method") or DEFAULT_METHOD
+        result[(month, ("revenueCents",))] += cents
+        result[(month, ("manualIncomeCents",))] += cents
+        result[(month, ("revenueByMethod", method))] += cents
+        result[(month, ("profitCents",))] += cents
+    return result
+
+
+def expense_contribution(data: dict | None) -> Contribution:
+    result: Contribution = defaultdict(int)
+    month = month_key((data or {}).get("date"))
+    cents = reservation_model.to_cents((data or {}).get("amount"))
+    if month and cents:
+        category = data.get("category") or DEFAULT_CATEGORY
+        result[(month, ("expensesCents",))] += cents
+        result[(month, ("expensesByCategory", category))] += cents
+        result[(month, ("profitCents",))] -= cents
+    return result
+
+
+CONTRIBUTIONS = {
+    "reservations": reservation_contribution,
+    "payments": payment_contribution,
+    "incomes": income_contribution,
+    "expenses": expense_contribution,
+}
+
+
+def _nest(items, leaf) -> dict[str, dict]:
+    """{(mês, caminho): valor} -> {mês: {campo: {subcampo: leaf(valor)}}}."""
+    by_month: dict[str, dict] = {}
+    for (month, path), value in items:
+        node = by_month.setdefault(month, {})
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = leaf(value)
+    return by_month
+
+
+def stage_change(writer, kind: str, before: dict | None, after: dict | None) -> list[str]:
+    """
+    Aplica no lote/transação a diferença de contribuição de um documento
+    (before=None para criação, after=None para exclusão). Retorna os meses afetados.
+    """
+    contribute = CONTRIBUTIONS[kind]
+    delta: Contribution = defaultdict(int)
+    for key, value in contribute(after).items():
+        delta[key] += value
+    for key, value in contribute(before).items():
+        delta[key] -= value
+
+    changed = [(key, value) for key, value in delta.items() if value]
+    for month, fields in _nest(changed, firestore.Increment).items():
+        writer.set(rollup_ref(month), fields | {"month": month, "updatedAt": firestore.SERVER_TIMESTAMP}, merge=True)
+    return sorted({month for (month, _), _ in changed})
+
+
+# =======================================================
+# 🔹 Leitura e reconstrução
+# =======================================================
+def _merge(total: dict, doc: dict):
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            _merge(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+
+
+def read_months(first: str, last: str) -> dict[str, dict]:
+    """Consolidados dos meses [first, last] ('YYYY-MM') que existem, por mês."""
+    months = months_between(first, last)
+    found = {}
+    for snap in db.get_all([rollup_ref(m) for m in months]):
+        if snap.exists:
+            doc = snap.to_dict() or {}
+            found[snap.id] = {k: v for k, v in doc.items() if k not in ("month", "updatedAt")}
+    return found
+
+
+def read_period(first: str, last: str) -> dict:
+    """Soma dos consolidados dos meses [first, last] ('YYYY-MM'), lendo só esses documentos."""
+    total: dict = {}
+    found = read_months(first, last)
+    for doc in found.values():
+        _merge(total, doc)
+    return {"months": months_between(first, last), "monthsWithData": sorted(found), "totals": total}
+
+
+def rebuild() -> dict:
+    """Recalcula todos os meses a partir de reservas, pagamentos, receitas e despesas."""
+    totals: Contribution = defaultdict(int)
+    scanned = {}
+    for kind, contribute in CONTRIBUTIONS.items():
+        count = 0
+        # Pagamentos ficam em subcoleções (reservations/{id}/payments)
+        source = db.collection_group(kind) if kind == "payments" else db.collection(kind)
+        for doc in source.stream():
+            for key, value in contribute(doc.to_dict() or {}).items():
+                totals[key] += value
+            count += 1
+        scanned[kind] = count
+
+    months = _nest(totals.items(), lambda v: v)
+    stale = [doc.id for doc in db.collection(COLLECTION).select([]).stream() if doc.id not in months]
+    with BulkWriter() as writer:
+        for month, fields in months.items():
+            writer.set(rollup_ref(month), fields | {"month": month, "updatedAt": firestore.SERVER_TIMESTAMP})
+        for month in stale:
+            writer.delete(rollup_ref(month))
+    return {"months": len(months), "removed": len(stale), "scanned": scanned, "writer": writer.stats()}
@@ -0,0 +1,279 @@
+# app/services/forecast.py
+"""
+Previsão diária de ocupação e receita para os próximos `HORIZON_DAYS` dias.
+
+Séries e modelo, todos calculados sobre o snapshot colunar (`analytics`):
+
+- histórico: quartos ocupados e receita (valor da reserva rateado por
+  noite) de cada dia dos últimos `FORECAST_HISTORY_DAYS`;
+- sazonalidade: fatores multiplicativos por dia da semana e por mês
+  (média do dia ÷ média geral, o mês já sem o efeito do dia da semana) e
+  nível recente (média dessazonalizada dos últimos `LEVEL_DAYS`);
+- ritmo (pace): carteira já reservada para cada dia futuro (on the books)
+  mais a captação média que, no histórico, entrou a menos de `k` dias da
+  data — um histograma de antecedência por noite — ajustada pela
+  sazonalidade do dia.
+
+Atualização sem reajustar a cada consulta:
+- o ajuste completo (histórico inteiro e curva de captação) é feito na
+  primeira consulta, por `invalidate()` e, depois, em segundo plano a cada
+  `FORECAST_REFIT_SECONDS`;
+- quando o snapshot muda ou o dia vira, só a cauda recente do histórico
+  (`RECENT_DAYS`) e a carteira futura são recalculadas; os fatores saem
+  das séries já guardadas (poucos centos de números).
+
+Reservas criadas depois do check-in (importações, lançamentos retroativos)
+não têm antecedência conhecida e ficam fora da curva de captação.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from app.core import events
+from app.services import analytics, availability
+
+HORIZON_DAYS = 90
+LEVEL_DAYS = 90
+RECENT_DAYS = 90
+PACE_DAYS = 365
+HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "730"))
+REFIT_SECONDS = float(os.getenv("FORECAST_REFIT_SECONDS", "21600"))
+
+
+@dataclass
+class Seasonality:
+    weekday: object  # 7 fatores (segunda ... domingo)
+    month: object    # 12 fatores (janeiro ... dezembro)
+    level: float
+
+    def factor(self, ordinals):
+        return self.weekday[analytics.Frame.weekday(ordinals)] * self.month[analytics.Frame.month_index(ordinals) % 12]
+
+    def to_dict(self, digits: int = 2) -> dict:
+        return {
+            "level": round(self.level, digits),
+            "weekday": [round(float(v), 3) for v in self.weekday],
+            "month": [round(float(v), 3) for v in self.month],
+        }
+
+
+def _mean_by(keys, values, size: int):
+    """Média de `values` por chave; 1 onde não há dados (fator neutro)."""
+    import numpy as np
+
+    counts = np.bincount(keys, minlength=size)
+    sums = np.bincount(keys, weights=values, minlength=size)
+    return np.divide(sums, counts, out=np.ones(size), where=counts > 0)
+
+
+def fit_seasonality(series, ordinals) -> Seasonality:
+    """Fatores de dia da semana e mês e nível recente de uma série diária."""
+    import numpy as np
+
+    mean = float(series.mean()) if len(series) else 0.0
+    if mean <= 0:
+        return Seasonality(np.ones(7), np.ones(12), 0.0)
+
+    weekdays = analytics.Frame.weekday(ordinals)
+    weekday = _mean_by(weekdays, series, 7) / mean
+    deseason = np.divide(series, weekday[weekdays], out=np.zeros(len(series)), where=weekday[weekdays] > 0)
+
+    months = analytics.Frame.month_index(ordinals) % 12
+    month_mean = float(deseason.mean())
+    month = _mean_by(months, deseason, 12) / month_mean if month_mean > 0 else np.ones(12)
+    # meses sem histórico ficam neutros
+    month[np.bincount(months, minlength=12) == 0] = 1.0
+
+    factor = weekday[weekdays] * month[months]
+    level_part = np.divide(series, factor, out=np.zeros(len(series)), where=factor > 0)[-LEVEL_DAYS:]
+    return Seasonality(weekday, month, float(level_part.mean()))
+
+
+def pickup_curve(frame, first: date, last: date, weights=None):
+    """
+    Captação média por dia de [first, last) em função da antecedência:
+    curve[k] = noites (ou soma de `weights`) reservadas a menos de k dias
+    da data, por dia do período.
+    """
+    import numpy as np
+
+    c = frame.columns
+    check_in, created = c["checkIn"], c["createdOn"]
+    known = frame.active() & (created > 0) & (created <= check_in)
+    start = np.maximum(check_in, first.toordinal())
+    end = np.minimum(c["checkOut"], last.toordinal())
+    in_window = end > start
+
+    def histogram(mask):
+        lead_start = np.clip(start[mask] - created[mask], 0, HORIZON_DAYS + 1)
+        lead_end = np.clip(end[mask] - created[mask], 0, HORIZON_DAYS + 1)
+        w = None if weights is None else weights[mask]
+        diff = (np.bincount(lead_start, weights=w, minlength=HORIZON_DAYS + 2)
+                - np.bincount(lead_end, weights=w, minlength=HORIZON_DAYS + 2))
+        return np.cumsum(diff)[:HORIZON_DAYS + 1]  # noites por antecedência exata
+
+    by_lead = histogram(known & in_window)
+    # reescala pelas noites sem antecedência conhecida
+    nights = np.clip(end - start, 0, None) * (1 if weights is None else weights)
+    total = float(nights[frame.active() & in_window].sum())
+    known_total = float(nights[known & in_window].sum())
+    scale = total / known_total if known_total > 0 else 0.0
+
+    days = max((last - first).days, 1)
+    curve = np.concatenate(([0.0], np.cumsum(by_lead)[:HORIZON_DAYS]))
+    return curve * scale / days
+
+
+class Forecaster:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._fitting = False
+        self._fitted_at = 0.0
+        self._stale = True
+        self._origin: date | None = None   # primeiro dia do histórico
+        self._today: date | None = None
+        self._generation = -1
+        self._rooms = 0
+        self._history: dict = {}           # "occupied" / "revenue" -> série diária até ontem
+        self._pickup: dict = {}            # captação por antecedência
+        self._result: dict | None = None
+        events.add_listener(self._on_event)
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+    def _on_event(self, event):
+        if event.type == "import" and event.data.get("kind") == "reservations":
+            self.invalidate()
+
+    # ---------------- ajuste ----------------
+    def _series(self, frame, first: date, days: int) -> dict:
+        return {
+            "occupied": frame.occupancy(first, days).astype("float64"),
+            "revenue": frame.occupancy(first, days, weights=frame.nightly_rate()),
+        }
+
+    def _fit(self, frame, today: date) -> dict:
+        """Histórico completo e curvas de captação (não altera o estado)."""
+        pace_first = today - timedelta(days=min(PACE_DAYS, HISTORY_DAYS))
+        return {
+            "_origin": today - timedelta(days=HISTORY_DAYS),
+            "_today": today,
+            "_history": self._series(frame, today - timedelta(days=HISTORY_DAYS), HISTORY_DAYS),
+            "_pickup": {
+                "occupied": pickup_curve(frame, pace_first, today),
+                "revenue": pickup_curve(frame, pace_first, today, weights=frame.nightly_rate()),
+            },
+        }
+
+    def _apply_fit(self, fit: dict):
+        for name, value in fit.items():
+            setattr(self, name, value)
+        self._fitted_at = time.monotonic()
+        self._stale = False
+        self._generation = -1  # força novo resultado na próxima consulta
+
+    def _refresh_recent(self, frame, today: date):
+        """Desliza o histórico até ontem e recalcula a cauda recente e a carteira."""
+        import numpy as np
+
+        shift = (today - self._today).days
+        if shift:
+            for name, series in self._history.items():
+                self._history[name] = np.concatenate((series[shift:], np.zeros(shift)))[-HISTORY_DAYS:]
+            self._origin, self._today = today - timedelta(days=HISTORY_DAYS), today
+        recent = self._series(frame, today - timedelta(days=RECENT_DAYS), RECENT_DAYS)
+        for name, series in recent.items():
+            self._history[name][-RECENT_DAYS:] = series
+
+    def _forecast(self, frame, today: date, rooms: int) -> dict:
+        import numpy as np
+
+        books = self._series(frame, today, HORIZON_DAYS)
+        ordinals = np.arange(today.toordinal(), today.toordinal() + HORIZON_DAYS)
+        history_ordinals = np.arange(self._origin.toordinal(), today.toordinal())
+        seasonality = {name: fit_seasonality(series, history_ordinals) for name, series in self._history.items()}
+
+        forecast = {}
+        for name, season in seasonality.items():
+            factor = season.factor(ordinals)
+            expected = books[name] + self._pickup[name][:HORIZON_DAYS] * factor
+            if name == "occupied":
+                expected = np.clip(expected, books[name], max(rooms, 0) or None)
+            forecast[name] = (expected, season.level * factor)
+
+        days = []
+        for i in range(HORIZON_DAYS):
+            occupied, baseline = forecast["occupied"][0][i], forecast["occupied"][1][i]
+            days.append({
+                "date": (today + timedelta(days=i)).isoformat(),
+                "onTheBooks": int(books["occupied"][i]),
+                "occupied": round(float(occupied), 1),
+                "occupancy": round(float(occupied) / rooms, 4) if rooms else None,
+                "seasonalOccupied": round(float(baseline), 1),
+                "onTheBooksRevenueCents": int(round(books["revenue"][i])),
+                "revenueCents": int(round(forecast["revenue"][0][i])),
+                "seasonalRevenueCents": int(round(forecast["revenue"][1][i])),
+            })
+        return {
+            "from": today.isoformat(),
+            "rooms": rooms,
+            "days": days,
+            "model": {
+                "historyFrom": self._origin.isoformat(),
+                "historyDays": HISTORY_DAYS,
+                "occupied": seasonality["occupied"].to_dict(),
+                "revenueCents": seasonality["revenue"].to_dict(0),
+                "pickupAtHorizon": {
+                    "occupied": round(float(self._pickup["occupied"][HORIZON_DAYS - 1]), 2),
+                    "revenueCents": int(round(self._pickup["revenue"][HORIZON_DAYS - 1])),
+                },
+                "snapshotGeneration": self._generation,
+            },
+        }
+
+    def _refit_background(self):
+        try:
+            fit = self._fit(analytics.snapshot.frame(), date.today())
+            with self._lock:
+                self._apply_fit(fit)
+        except Exception as e:
+            print(f"⚠️ Falha ao reajustar a previsão: {e}")
+        finally:
+            self._fitting = False
+
+    # ---------------- leitura ----------------
+    def current(self) -> dict:
+        """Previsão atual; recalcula só a parte recente quando o snapshot ou o dia mudam."""
+        analytics.snapshot.ensure_fresh()
+        availability.index.ensure_fresh()
+        today = date.today()
+        generation = analytics.snapshot.generation
+        rooms = len(availability.index.rooms())
+        with self._lock:
+            if self._result is not None and not self._stale and (self._generation, self._today, self._rooms) == (generation, today, rooms):
+                result = self._result
+            else:
+                frame = analytics.snapshot.frame()
+                if self._stale or self._today is None or (today - self._today).days > RECENT_DAYS:
+                    self._apply_fit(self._fit(frame, today))
+                else:
+                    self._refresh_recent(frame, today)
+                self._generation, self._rooms = generation, rooms
+                result = self._result = self._forecast(frame, today, rooms)
+
+            if time.monotonic() - self._fitted_at > REFIT_SECONDS and not self._fitting:
+                self._fitting = True
+                threading.Thread(target=self._refit_background, name="forecast-refit", daemon=True).start()
+        return result
+
+
+model = Forecaster()
+
+
+def invalidate():
+    """Força o ajuste completo na próxima consulta (importações em massa chegam pelo evento `import`)."""
+    model.invalidate()
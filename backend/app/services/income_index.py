@@ -0,0 +1,213 @@
+# app/services/income_index.py
+"""
+Índice de receitas `income_index/{fingerprint}`: receitas manuais e
+pagamentos de reservas numa única coleção, ordenável por data.
+
+Cada documento representa um recebimento e tem como id a sua impressão
+digital (fingerprint):
+- lançamento do livro de pagamentos   payment:{reservaId}:{lançamentoId}
+- pagamento antigo (sem livro) e o
+  lançamento de saldo inicial que o substitui   payment:{reservaId}:legacy
+- receita manual                      manual:{receitaId}
+
+Uma receita manual que registra um pagamento já lançado (informando
+`reservationId` e, opcionalmente, `paymentId`) recebe a fingerprint do
+pagamento: o índice guarda um documento só, com as duas origens em
+`refs`, e a receita fica marcada com `duplicateOf` — os consolidados e o
+fechamento de caixa não a contam de novo.
+
+O índice é gravado no mesmo lote/transação de quem cria o recebimento;
+`rebuild()` recria tudo a partir de receitas, livros e reservas antigas.
+"""
+import unicodedata
+from datetime import date
+
+from app.core.bulk import BulkWriter
+from app.core.firebase import db, firestore
+from app.services import financial_rollups, reservation_model
+
+COLLECTION = "income_index"
+
+SOURCE_MANUAL = "manual"
+SOURCE_RESERVATION = "reservation"
+
+ORIGINS = {SOURCE_MANUAL: "Manual", SOURCE_RESERVATION: "Automática"}
+
+
+def index_ref(fingerprint: str):
+    return db.collection(COLLECTION).document(fingerprint)
+
+
+def _fold(text) -> str:
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().split())
+
+
+# =======================================================
+# 🔹 Fingerprints
+# =======================================================
+def payment_fingerprint(reservation_id: str, entry_id: str, kind: str | None = None) -> str:
+    # saldo inicial substitui o pagamento antigo: mesma fingerprint, sem duplicar
+    if kind == "saldo_inicial":
+        entry_id = "legacy"
+    return f"payment:{reservation_id}:{entry_id}"
+
+
+def legacy_fingerprint(reservation_id: str) -> str:
+    return payment_fingerprint(reservation_id, "legacy")
+
+
+def manual_fingerprint(income_id: str) -> str:
+    return f"manual:{income_id}"
+
+
+def match_payment(reservation_id: str, paid_on: str, amount_cents: int, payment_id: str | None = None) -> str | None:
+    """Fingerprint do pagamento da reserva que uma receita manual registra (ou None)."""
+    res_ref = db.collection("reservations").document(reservation_id)
+    if payment_id:
+        snap = res_ref.collection("payments").document(payment_id).get()
+        return payment_fingerprint(reservation_id, payment_id, (snap.to_dict() or {}).get("kind")) if snap.exists else None
+
+    for snap in res_ref.collection("payments").where("paidOn", "==", paid_on).stream():
+        entry = snap.to_dict() or {}
+        if int(entry.get("amountCents") or 0) == amount_cents:
+            return payment_fingerprint(reservation_id, snap.id, entry.get("kind"))
+
+    snap = res_ref.get()
+    data = snap.to_dict() if snap.exists else None
+    if (data and not data.get("ledger")
+            and reservation_model.payment_status(data) == reservation_model.PAYMENT_PAID
+            and data.get("paidOn") == paid_on
+            and reservation_model.legacy_received_cents(data) == amount_cents):
+        return legacy_fingerprint(reservation_id)
+    return None
+
+
+# =======================================================
+# 🔹 Documentos do índice
+# =======================================================
+def _doc(source: str, day: str, cents: int, method: str | None, description: str,
+         ref_key: str, ref_path: str, reservation_id: str | None = None) -> dict:
+    return {
+        "source": source,
+        "date": day,
+        "amountCents": cents,
+        "amount": cents / 100,
+        "method": method or financial_rollups.DEFAULT_METHOD,
+        "description": description,
+        "reservationId": reservation_id,
+        "refs": {ref_key: ref_path},
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+
+
+def payment_entry(reservation_id: str, entry_id: str, entry: dict, name: str | None = None) -> tuple[str, dict]:
+    kind = entry.get("kind")
+    label = "Estorno" if (entry.get("amountCents") or 0) < 0 else "Reserva"
+    doc = _doc(
+        SOURCE_RESERVATION, entry.get("paidOn"), int(entry.get("amountCents") or 0), entry.get("method"),
+        f"{label} - {name}" if name else label,
+        f"payment_{reservation_id}_{entry_id}", f"reservations/{reservation_id}/payments/{entry_id}",
+        reservation_id,
+    )
+    return payment_fingerprint(reservation_id, entry_id, kind), doc
+
+
+def legacy_entry(reservation_id: str, data: dict) -> tuple[str, dict] | None:
+    """Pagamento de reserva antiga (paga sem livro), datado por paidOn ou checkOut."""
+    if data.get("ledger") or reservation_model.payment_status(data) != reservation_model.PAYMENT_PAID:
+        return None
+    day = data.get("paidOn") or data.get("checkOut")
+    cents = reservation_model.legacy_received_cents(data)
+    if not day or not cents:
+        return None
+    doc = _doc(
+        SOURCE_RESERVATION, str(day)[:10], cents, data.get("paymentMethod"),
+        f"Reserva - {reservation_model.display_name(data)}",
+        f"reservation_{reservation_id}", f"reservations/{reservation_id}", reservation_id,
+    )
+    return legacy_fingerprint(reservation_id), doc
+
+
+def manual_entry(income_id: str, income: dict) -> tuple[str, dict]:
+    doc = _doc(
+        SOURCE_MANUAL, income.get("date"), reservation_model.to_cents(income.get("amount")), income.get("method"),
+        income.get("description") or "Receita manual",
+        f"income_{income_id}", f"incomes/{income_id}", income.get("reservationId"),
+    )
+    if income.get("duplicateOf"):
+        # já indexado pelo pagamento: só acrescenta a origem manual
+        return income["duplicateOf"], {"refs": doc["refs"], "updatedAt": firestore.SERVER_TIMESTAMP}
+    return manual_fingerprint(income_id), doc
+
+
+def stage(writer, fingerprint: str, doc: dict):
+    """Grava/mescla o documento do índice no lote/transação de quem criou o recebimento."""
+    writer.set(index_ref(fingerprint), doc, merge=True)
+
+
+# =======================================================
+# 🔹 Consulta e reconstrução
+# =======================================================
+def page(first: date | None, last: date | None, page_size: int | None, cursor: str | None) -> tuple[list[dict], str | None]:
+    """Recebimentos do período, mais recentes primeiro. Retorna (itens, próximo_cursor)."""
+    query = db.collection(COLLECTION)
+    if first:
+        query = query.where("date", ">=", first.isoformat())
+    if last:
+        query = query.where("date", "<=", last.isoformat())
+    query = query.order_by("date", direction=firestore.Query.DESCENDING).order_by(
+        "__name__", direction=firestore.Query.DESCENDING
+    )
+    if cursor:
+        snap = index_ref(cursor).get()
+        if snap.exists:
+            query = query.start_after(snap)
+    if page_size:
+        query = query.limit(page_size + 1)
+
+    docs = list(query.stream())
+    next_cursor = None
+    if page_size and len(docs) > page_size:
+        docs = docs[:page_size]
+        next_cursor = docs[-1].id
+    return [(doc.to_dict() or {}) | {"fingerprint": doc.id} for doc in docs], next_cursor
+
+
+def rebuild() -> dict:
+    """Recria o índice a partir de receitas manuais, livros de pagamento e reservas antigas."""
+    entries: dict[str, dict] = {}
+
+    def put(fingerprint: str, doc: dict):
+        if fingerprint in entries:
+            entries[fingerprint]["refs"] |= doc["refs"]
+            for key, value in doc.items():
+                entries[fingerprint].setdefault(key, value)
+        else:
+            entries[fingerprint] = doc
+
+    names = {}
+    for doc in db.collection("reservations").stream():
+        data = doc.to_dict() or {}
+        names[doc.id] = reservation_model.display_name(data)
+        legacy = legacy_entry(doc.id, data)
+        if legacy:
+            put(*legacy)
+    for doc in db.collection_group("payments").stream():
+        entry = doc.to_dict() or {}
+        res_id = entry.get("reservationId") or doc.reference.parent.parent.id
+        if entry.get("paidOn"):
+            put(*payment_entry(res_id, doc.id, entry, names.get(res_id)))
+    for doc in db.collection("incomes").stream():
+        income = doc.to_dict() or {}
+        if income.get("date"):
+            put(*manual_entry(doc.id, income))
+
+    stale = [d.id for d in db.collection(COLLECTION).select([]).stream() if d.id not in entries]
+    with BulkWriter() as writer:
+        for fingerprint, doc in entries.items():
+            if "date" in doc:
+                writer.set(index_ref(fingerprint), doc)
+        for fingerprint in stale:
+            writer.delete(index_ref(fingerprint))
+    return {"entries": len(entries), "removed": len(stale), "writer": writer.stats()}
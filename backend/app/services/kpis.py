@@ -0,0 +1,187 @@
+# app/services/kpis.py
+"""
+Indicadores hoteleiros de um período, calculados sobre o snapshot colunar
+(`analytics`) e a lista de quartos do índice de ocupação (inclui
+`companies/{id}/rooms`):
+
+- occupancy      noites vendidas ÷ noites disponíveis (quartos × dias)
+- adrCents       diária média: receita de hospedagem ÷ noites vendidas
+- revparCents    receita por quarto disponível: receita ÷ noites disponíveis
+- averageLengthOfStay   noites por reserva (chegadas no período)
+- averageLeadTimeDays   dias entre a criação da reserva e o check-in
+- cancellationRate      canceladas ÷ reservas com chegada no período
+
+A receita de cada reserva é rateada pelas noites que caem no período.
+Tudo é agregado com `np.bincount` — o imóvel inteiro, cada quarto e cada
+empresa numa passada — e o resultado fica em cache por período e geração
+do snapshot/índice.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from app.core import cache, versions
+from app.services import analytics, availability, financial_rollups
+
+CACHE_SIZE = 64
+
+_cache: OrderedDict = OrderedDict()  # (início, fim, tendência, gerações) -> resultado
+_cache_lock = threading.Lock()
+
+
+def _ratio(numerator, denominator, digits: int = 4):
+    return round(float(numerator) / float(denominator), digits) if denominator else None
+
+
+def _metrics(agg: dict, i: int | None, available: int) -> dict:
+    """Indicadores da chave `i` das somas de `_aggregate` (None = sem reservas)."""
+    def value(name):
+        return agg[name][i] if i is not None else 0
+
+    sold, revenue = int(value("sold")), int(round(value("revenue")))
+    arrivals, canceled = int(value("arrivals")), int(value("canceled"))
+    return {
+        "availableNights": available,
+        "soldNights": sold,
+        "revenueCents": revenue,
+        "occupancy": _ratio(sold, available),
+        "adrCents": int(round(revenue / sold)) if sold else None,
+        "revparCents": int(round(revenue / available)) if available else None,
+        "arrivals": arrivals,
+        "averageLengthOfStay": _ratio(value("stay"), arrivals, 2),
+        "averageLeadTimeDays": _ratio(value("lead"), value("leadCount"), 1),
+        "cancellationRate": _ratio(canceled, arrivals + canceled),
+    }
+
+
+def _aggregate(frame: analytics.Frame, first: date, last: date, keys, size: int) -> dict:
+    """Somas por chave (bincount) das noites, receita, chegadas, cancelamentos e antecedência."""
+    import numpy as np
+
+    end = last + timedelta(days=1)
+    active = frame.active()
+    nights = frame.nights_between(first, end) * active
+    length = np.clip(frame["checkOut"] - frame["checkIn"], 1, None)
+    revenue = frame["amount"] * nights / length
+
+    check_in = frame["checkIn"]
+    arriving = (check_in >= first.toordinal()) & (check_in < end.toordinal())
+    arrivals = arriving & active
+    canceled = arriving & (frame["status"] == analytics.CANCELED)
+    lead_ok = arrivals & (frame["createdOn"] > 0) & (frame["createdOn"] <= check_in)
+    lead = np.where(lead_ok, check_in - frame["createdOn"], 0)
+
+    def total(weights):
+        return np.bincount(keys, weights=weights, minlength=size)
+
+    return {
+        "sold": total(nights),
+        "revenue": total(revenue),
+        "arrivals": total(arrivals),
+        "canceled": total(canceled),
+        "stay": total(np.where(arrivals, length, 0)),
+        "lead": total(lead),
+        "leadCount": total(lead_ok),
+    }
+
+
+def _company_ids(codes: list) -> list:
+    """
+    Id da empresa de cada código do snapshot. Reservas só com `companyName`
+    viram o id da empresa de mesmo nome (cache 'companies'), para casar com
+    os quartos de `companies/{id}/rooms`.
+    """
+    companies = cache.get("companies")
+    known = {c["id"] for c in companies}
+    by_name = {str(c["name"]).strip().casefold(): c["id"] for c in companies if c.get("name")}
+    return [code if not code or code in known else by_name.get(str(code).strip().casefold(), code)
+            for code in codes]
+
+
+def _month_ranges(first: date, last: date) -> list[tuple[str, date, date]]:
+    ranges = []
+    for month in financial_rollups.months_between(first.strftime("%Y-%m"), last.strftime("%Y-%m")):
+        start = max(date(int(month[:4]), int(month[5:7]), 1), first)
+        nxt = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        ranges.append((month, start, min(nxt - timedelta(days=1), last)))
+    return ranges
+
+
+def compute(first: date, last: date, trend: bool = False) -> dict:
+    """KPIs de [first, last] (datas inclusivas) para o imóvel, cada quarto e cada empresa."""
+    import numpy as np
+
+    frame = analytics.snapshot.frame()
+    rooms = availability.index.rooms()
+    days = (last - first).days + 1
+    n = len(frame)
+
+    # Imóvel inteiro
+    zeros = np.zeros(n, dtype="int64")
+    result = {
+        "from": first.isoformat(),
+        "to": last.isoformat(),
+        "days": days,
+        "rooms": len(rooms),
+        "property": _metrics(_aggregate(frame, first, last, zeros, 1), 0, len(rooms) * days),
+    }
+    if rooms:
+        nightly = frame.occupancy(first, days) / len(rooms)
+        result["property"]["occupancyByNight"] = [
+            {"date": (first + timedelta(days=i)).isoformat(), "occupancy": round(float(v), 4)}
+            for i, v in enumerate(nightly)
+        ]
+
+    # Por quarto (código do quarto no snapshot)
+    by_room = _aggregate(frame, first, last, frame["room"].astype("int64"), len(frame.rooms))
+    room_codes = {key: i for i, key in enumerate(frame.rooms) if key}
+    result["byRoom"] = [
+        {"roomKey": info.key, "number": info.number, "type": info.type, "companyId": info.companyId}
+        | _metrics(by_room, room_codes.get(info.key), days)
+        for info in rooms
+    ]
+
+    # Por empresa: reservas da empresa e noites disponíveis dos quartos dela
+    company_ids = _company_ids(frame.companies)
+    companies = list(dict.fromkeys(company_ids))
+    position = {company: i for i, company in enumerate(companies)}
+    remap = np.array([position[company] for company in company_ids], dtype="int64")
+    by_company = _aggregate(frame, first, last, remap[frame["company"]], len(companies))
+    company_rooms: dict[str, int] = {}
+    for info in rooms:
+        if info.companyId:
+            company_rooms[info.companyId] = company_rooms.get(info.companyId, 0) + 1
+    result["byCompany"] = [
+        {"company": company, "rooms": company_rooms.get(company, 0)}
+        | _metrics(by_company, i, company_rooms.get(company, 0) * days)
+        for i, company in enumerate(companies)
+        if company and (by_company["arrivals"][i] or by_company["sold"][i] or by_company["canceled"][i])
+    ]
+
+    if trend:
+        result["trend"] = [
+            {"month": month}
+            | _metrics(_aggregate(frame, start, end, zeros, 1), 0, len(rooms) * ((end - start).days + 1))
+            for month, start, end in _month_ranges(first, last)
+        ]
+    return result
+
+
+def cached(first: date, last: date, trend: bool = False) -> dict:
+    """`compute` com cache LRU por período, geração do snapshot e do índice de ocupação e versão das empresas."""
+    analytics.snapshot.ensure_fresh()
+    availability.index.ensure_fresh()
+    key = (first, last, trend, analytics.snapshot.generation, availability.index.generation,
+           versions.current("companies")["companies"])
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            return result
+
+    result = compute(first, last, trend)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
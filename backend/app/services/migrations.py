@@ -0,0 +1,381 @@
+# app/services/migrations.py
+"""
+Migrações de dados retomáveis e paralelas.
+
+Uma migração é uma função `transform(dados, id) -> dict | None` registrada
+com `@migration(nome, versão, coleção)`; ela devolve os campos a atualizar
+(ou None para não mexer no documento).
+
+Execução:
+- a coleção é dividida em `partitions` faixas de id de documento (os ids
+  automáticos do Firestore usam [0-9A-Za-z]) e cada faixa roda em uma
+  thread própria, paginando por `__name__`;
+- as atualizações passam por um `BulkWriter` com limite de vazão, e o
+  cursor de cada faixa só avança em `_migrations/{nome}` depois que a
+  página foi gravada — se o processo cair, a próxima execução continua do
+  último checkpoint;
+- mudar a versão da migração recomeça do zero; `dry_run` conta e amostra
+  as mudanças sem gravar (checkpoint separado em `_migrations/{nome}__dryrun`);
+- um lease (`owner`/`leaseUntil`) impede duas instâncias de rodarem a
+  mesma migração ao mesmo tempo. Uma thread renova o lease a cada
+  `LEASE_SECONDS / 3` enquanto as partições rodam (páginas lentas ou com
+  `rate` baixo não o deixam vencer), e todo checkpoint é gravado numa
+  transação que confere se esta instância ainda é a dona; se outra
+  assumiu, as partições param sem tocar no checkpoint dela.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+from app.core.bulk import BulkWriter
+from app.core.firebase import db, firestore
+
+COLLECTION = "_migrations"
+PAGE_SIZE = 300
+LEASE_SECONDS = 120
+SAMPLE_SIZE = 20
+
+# Ordem lexicográfica dos ids automáticos do Firestore
+ID_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+_owner = uuid.uuid4().hex[:8]
+
+
+class LeaseLost(RuntimeError):
+    """Outra instância assumiu a migração (lease vencido e reivindicado)."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    name: str
+    version: int
+    collection: str
+    transform: callable
+    description: str = ""
+    after: callable = None  # chamado uma vez ao concluir (ex.: invalidar caches)
+
+
+_registry: dict[str, Migration] = {}
+_running: dict[str, threading.Thread] = {}
+_running_lock = threading.Lock()
+
+
+def migration(name: str, version: int, collection: str, description: str = "", after=None):
+    """Registra a função decorada como transform da migração `name`."""
+    def decorator(fn):
+        _registry[name] = Migration(name, version, collection, fn, description or (fn.__doc__ or "").strip(), after)
+        return fn
+    return decorator
+
+
+def registered() -> list[Migration]:
+    return list(_registry.values())
+
+
+def get(name: str) -> Migration:
+    if name not in _registry:
+        raise HTTPException(status_code=404, detail=f"Migração desconhecida: {name}")
+    return _registry[name]
+
+
+# =======================================================
+# 🔹 Partições e checkpoints
+# =======================================================
+def partition_bounds(partitions: int) -> list[tuple[str | None, str | None]]:
+    """Faixas [início, fim) de id que cobrem todos os documentos (None = sem limite)."""
+    partitions = max(1, min(partitions, len(ID_ALPHABET)))
+    cuts = [ID_ALPHABET[i * len(ID_ALPHABET) // partitions] for i in range(1, partitions)]
+    lows = [None] + cuts
+    highs = cuts + [None]
+    return list(zip(lows, highs))
+
+
+def checkpoint_ref(name: str, dry_run: bool = False):
+    return db.collection(COLLECTION).document(f"{name}__dryrun" if dry_run else name)
+
+
+def status(name: str) -> dict:
+    mig = get(name)
+    result = {"name": mig.name, "version": mig.version, "collection": mig.collection,
+              "description": mig.description, "runningHere": name in _running}
+    for key, dry_run in (("checkpoint", False), ("dryRun", True)):
+        snap = checkpoint_ref(name, dry_run).get()
+        result[key] = snap.to_dict() if snap.exists else None
+    return result
+
+
+def _claim(name: str, version: int, dry_run: bool, partitions: int, restart: bool) -> dict:
+    """Reserva a execução (lease) e devolve o estado das partições a retomar."""
+    ref = checkpoint_ref(name, dry_run)
+
+    @firestore.transactional
+    def claim(transaction):
+        snap = ref.get(transaction=transaction)
+        state = snap.to_dict() if snap.exists else {}
+        now = datetime.now(timezone.utc)
+        lease = state.get("leaseUntil")
+        if state.get("status") == "running" and state.get("owner") != _owner and lease and lease > now:
+            raise HTTPException(status_code=409, detail=f"Migração {name} em execução em outra instância")
+
+        fresh = (
+            restart
+            or state.get("version") != version
+            or len(state.get("partitions") or {}) != partitions
+        )
+        if not fresh and state.get("status") == "done":
+            return state
+        if fresh:
+            state = {
+                "partitions": {
+                    f"p{i}": {"low": low, "high": high, "cursor": None, "scanned": 0, "updated": 0, "done": False}
+                    for i, (low, high) in enumerate(partition_bounds(partitions))
+                },
+                "samples": [],
+                "startedAt": now,
+            }
+        state.update({
+            "name": name,
+            "version": version,
+            "dryRun": dry_run,
+            "status": "running",
+            "owner": _owner,
+            "leaseUntil": now + timedelta(seconds=LEASE_SECONDS),
+            "error": None,
+            "updatedAt": now,
+        })
+        transaction.set(ref, state)
+        return state
+
+    return claim(db.transaction())
+
+
+def _update_owned(ref, updates: dict):
+    """Atualiza o checkpoint se esta instância ainda detém o lease; senão LeaseLost."""
+    @firestore.transactional
+    def apply(transaction):
+        snap = ref.get(transaction=transaction)
+        state = snap.to_dict() if snap.exists else {}
+        if state.get("owner") != _owner or state.get("status") != "running":
+            raise LeaseLost(f"Migração {ref.id} assumida por outra instância ({state.get('owner')})")
+        transaction.update(ref, updates)
+
+    apply(db.transaction())
+
+
+def _lease_fields() -> dict:
+    now = datetime.now(timezone.utc)
+    return {"leaseUntil": now + timedelta(seconds=LEASE_SECONDS), "updatedAt": now}
+
+
+def _keep_lease(ref, stop: threading.Event, lost: threading.Event):
+    """Renova o lease até `stop`; sinaliza `lost` se outra instância assumiu."""
+    while not stop.wait(LEASE_SECONDS / 3):
+        try:
+            _update_owned(ref, _lease_fields())
+        except LeaseLost:
+            lost.set()
+            return
+        except Exception as e:
+            # falha transitória: a próxima renovação ainda cabe no lease atual
+            print(f"⚠️ Falha ao renovar o lease de {ref.id}: {e}")
+
+
+def page_size(rate: float | None) -> int:
+    """Página que grava em no máximo ~1/3 do lease com o limite de vazão da partição."""
+    if not rate:
+        return PAGE_SIZE
+    return max(1, min(PAGE_SIZE, int(rate * LEASE_SECONDS / 3)))
+
+
+# =======================================================
+# 🔹 Execução
+# =======================================================
+def _sample(updates: dict) -> dict:
+    # sentinelas (SERVER_TIMESTAMP, DELETE_FIELD) não podem ser gravadas dentro de listas
+    return {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v) for k, v in updates.items()}
+
+
+def _run_partition(mig: Migration, ref, key: str, part: dict, dry_run: bool, rate: float | None,
+                   samples: list, samples_lock: threading.Lock, lost: threading.Event):
+    collection = db.collection(mig.collection)
+    doc_id = "__name__"
+    scanned, updated, cursor = part["scanned"], part["updated"], part["cursor"]
+    size = page_size(rate)
+
+    with BulkWriter(max_in_flight=2, max_ops_per_second=rate, dry_run=dry_run) as writer:
+        while True:
+            if lost.is_set():
+                raise LeaseLost(f"Migração {mig.name} assumida por outra instância")
+            query = collection.order_by(doc_id).limit(size)
+            if part["low"] is not None:
+                query = query.where(doc_id, ">=", collection.document(part["low"]))
+            if part["high"] is not None:
+                query = query.where(doc_id, "<", collection.document(part["high"]))
+            if cursor:
+                query = query.start_after(collection.document(cursor))
+
+            page = list(query.stream())
+            for doc in page:
+                updates = mig.transform(doc.to_dict() or {}, doc.id)
+                scanned += 1
+                if updates:
+                    writer.update(doc.reference, updates)
+                    updated += 1
+                    if len(samples) < SAMPLE_SIZE:
+                        with samples_lock:
+                            if len(samples) < SAMPLE_SIZE:
+                                samples.append({"id": doc.id, "updates": _sample(updates)})
+
+            writer.flush()
+            if writer.errors:
+                raise RuntimeError(writer.errors[0]["error"])
+
+            done = len(page) < size
+            cursor = page[-1].id if page else cursor
+            # checkpoint só depois que a página foi gravada, e só se o lease ainda é nosso
+            _update_owned(ref, {
+                f"partitions.{key}.cursor": cursor,
+                f"partitions.{key}.scanned": scanned,
+                f"partitions.{key}.updated": updated,
+                f"partitions.{key}.done": done,
+                **_lease_fields(),
+            })
+            if done:
+                return
+
+
+def run(name: str, *, partitions: int = 4, dry_run: bool = False, rate: float | None = None,
+        restart: bool = False) -> dict:
+    """
+    Executa (ou retoma) a migração e bloqueia até terminar.
+    `rate` = limite total de gravações por segundo, dividido entre as partições.
+    """
+    mig = get(name)
+    state = _claim(name, mig.version, dry_run, partitions, restart)
+    return _execute(mig, state, dry_run, rate)
+
+
+def _execute(mig: Migration, state: dict, dry_run: bool, rate: float | None) -> dict:
+    """Roda as partições pendentes de um checkpoint já reservado por `_claim`."""
+    ref = checkpoint_ref(mig.name, dry_run)
+    if state.get("status") == "done":
+        return state
+
+    pending = {k: p for k, p in state["partitions"].items() if not p.get("done")}
+    per_partition_rate = rate / max(len(pending), 1) if rate else None
+    samples = list(state.get("samples") or [])
+    samples_lock = threading.Lock()
+    stop, lost = threading.Event(), threading.Event()
+    heartbeat = threading.Thread(target=_keep_lease, args=(ref, stop, lost), name=f"migration-{mig.name}-lease",
+                                 daemon=True)
+    heartbeat.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1),
+                                thread_name_prefix=f"migration-{mig.name}") as pool:
+            futures = [
+                pool.submit(_run_partition, mig, ref, key, part, dry_run, per_partition_rate, samples, samples_lock,
+                            lost)
+                for key, part in pending.items()
+            ]
+            for future in futures:
+                future.result()
+        # `after` roda antes de marcar "done": se falhar, a próxima execução o repete
+        if mig.after and not dry_run:
+            mig.after()
+    except LeaseLost:
+        # o checkpoint agora é da outra instância: não marca falha nem libera o lease dela
+        raise
+    except Exception as e:
+        _record_failure(ref, e, samples)
+        raise
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    _update_owned(ref, {"status": "done", "samples": samples, "leaseUntil": None,
+                        "finishedAt": datetime.now(timezone.utc), "updatedAt": datetime.now(timezone.utc)})
+    return ref.get().to_dict()
+
+
+def _record_failure(ref, error: Exception, samples: list | None = None):
+    """Marca o checkpoint como "failed" com o erro (se esta instância ainda é a dona)."""
+    updates = {"status": "failed", "error": str(error) or type(error).__name__, "leaseUntil": None,
+               "updatedAt": datetime.now(timezone.utc)}
+    if samples is not None:
+        updates["samples"] = samples
+    try:
+        _update_owned(ref, updates)
+    except LeaseLost:
+        pass
+
+
+def start(name: str, *, partitions: int = 4, dry_run: bool = False, rate: float | None = None,
+          restart: bool = False) -> bool:
+    """
+    Reserva a migração (409 se outra instância detém o lease) e a roda em
+    segundo plano neste processo. False se já estiver rodando aqui. Falhas
+    da thread ficam em `status`/`error` do checkpoint.
+    """
+    mig = get(name)
+    with _running_lock:
+        if name in _running:
+            return False
+        state = _claim(name, mig.version, dry_run, partitions, restart)
+        ref = checkpoint_ref(name, dry_run)
+
+        def target():
+            try:
+                _execute(mig, state, dry_run, rate)
+            except LeaseLost as e:
+                print(f"⚠️ Migração {name} interrompida: {e}")
+            except Exception as e:
+                print(f"⚠️ Migração {name} falhou: {e}")
+                _record_failure(ref, e)
+            finally:
+                with _running_lock:
+                    _running.pop(name, None)
+
+        thread = threading.Thread(target=target, name=f"migration-{name}", daemon=True)
+        _running[name] = thread
+        thread.start()
+        return True
+
+
+def main(argv=None):
+    import app.main  # noqa: F401 — importa os routers que registram as migrações
+
+    parser = argparse.ArgumentParser(description="Executa migrações de dados registradas.")
+    parser.add_argument("command", choices=("list", "status", "run"))
+    parser.add_argument("name", nargs="?")
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--rate", type=float, help="gravações por segundo (total)")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--restart", action="store_true", help="ignora o checkpoint e recomeça")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for mig in registered():
+            print(f"{mig.name} v{mig.version} ({mig.collection}) — {mig.description}")
+        return
+    if not args.name:
+        parser.error("informe o nome da migração")
+    if args.command == "status":
+        print(json.dumps(status(args.name), default=str, ensure_ascii=False, indent=2))
+        return
+
+    started = time.monotonic()
+    result = run(args.name, partitions=args.partitions, dry_run=args.dry_run, rate=args.rate, restart=args.restart)
+    result["elapsedSeconds"] = round(time.monotonic() - started, 1)
+    print(json.dumps(result, default=str, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
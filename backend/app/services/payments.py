@@ -0,0 +1,168 @@
+# app/services/payments.py
+"""
+Livro de pagamentos das reservas: `reservations/{id}/payments`.
+
+Cada pagamento (ou estorno) é um documento novo e nunca é alterado. Na
+mesma transação a reserva recebe o saldo já calculado:
+
+- amountReceived / amountReceivedCents   soma do livro
+- balanceDue / balanceDueCents           valor total − recebido
+- paymentStatus                          "confirmado" (quitada) ou "parcial"
+- paymentsCount, paymentMethod/paidOn    último lançamento
+
+Reservas pagas antes do livro existir ganham um lançamento de saldo
+inicial (`saldo_inicial`) com o valor antigo no primeiro pagamento, para
+que a soma do livro sempre bata com `amountReceived`.
+
+Os consolidados mensais (`financial_rollups`) contam a receita pelos
+lançamentos (mês do pagamento) e o saldo devedor pela reserva.
+"""
+from datetime import date
+
+from fastapi import HTTPException
+
+from app.core.firebase import db, firestore
+from app.services import financial_rollups, income_index, reservation_model
+
+LEDGER = "payments"
+
+KIND_PAYMENT = "pagamento"
+KIND_REFUND = "estorno"
+KIND_OPENING = "saldo_inicial"
+
+
+def ledger(reservation_id: str):
+    return db.collection("reservations").document(reservation_id).collection(LEDGER)
+
+
+def received_cents(data: dict) -> int:
+    """Valor já recebido segundo a reserva (livro ou campos antigos)."""
+    if data.get("ledger"):
+        return int(data.get("amountReceivedCents") or 0)
+    return reservation_model.legacy_received_cents(data)
+
+
+def _entry(kind: str, cents: int, method: str | None, paid_on: str, note: str | None = None) -> dict:
+    return {
+        "kind": kind,
+        "amount": cents / 100,
+        "amountCents": cents,
+        "method": method or financial_rollups.DEFAULT_METHOD,
+        "paidOn": paid_on,
+        "note": note or "",
+        "createdAt": firestore.SERVER_TIMESTAMP,
+    }
+
+
+def _opening_entries(data: dict) -> list[dict]:
+    if data.get("ledger"):
+        return []
+    legacy = reservation_model.legacy_received_cents(data)
+    if legacy <= 0:
+        return []
+    paid_on = data.get("paidOn") or data.get("checkOut") or date.today().isoformat()
+    return [_entry(KIND_OPENING, legacy, data.get("paymentMethod"), paid_on, "Pagamento registrado antes do livro")]
+
+
+def _balance_updates(total: int, received: int, count: int) -> dict:
+    balance = max(total - received, 0)
+    return {
+        "ledger": True,
+        "amountReceived": received / 100,
+        "amountReceivedCents": received,
+        "balanceDue": balance / 100,
+        "balanceDueCents": balance,
+        "paymentsCount": count,
+    }
+
+
+def _stage_entries(writer, reservation_id: str, data: dict, entries: list[dict], start_received: int, total: int):
+    received = start_received
+    name = reservation_model.display_name(data)
+    for entry in entries:
+        received += entry["amountCents"]
+        entry |= {"reservationId": reservation_id, "balanceAfterCents": max(total - received, 0)}
+        entry_ref = ledger(reservation_id).document()
+        writer.set(entry_ref, entry)
+        financial_rollups.stage_change(writer, LEDGER, None, entry)
+        income_index.stage(writer, *income_index.payment_entry(reservation_id, entry_ref.id, entry, name))
+
+
+def record_payment(reservation_id: str, amount_cents: int, method: str, *,
+                   total_cents: int | None = None, note: str | None = None) -> dict:
+    """
+    Lança um pagamento e atualiza o saldo da reserva na mesma transação.
+    Sem valor total definido na reserva, o primeiro pagamento define o total
+    (comportamento antigo do registro de pagamento).
+    """
+    res_ref = db.collection("reservations").document(reservation_id)
+
+    @firestore.transactional
+    def apply(transaction):
+        snap = res_ref.get(transaction=transaction)
+        if not snap.exists:
+            raise HTTPException(status_code=404, detail="Reserva não encontrada")
+        data = snap.to_dict() or {}
+        if reservation_model.stay_status(data) == reservation_model.STATUS_CANCELED:
+            raise HTTPException(status_code=409, detail="Reserva cancelada não aceita pagamentos")
+
+        today = date.today().isoformat()
+        entries = _opening_entries(data) + [_entry(KIND_PAYMENT, amount_cents, method, today, note)]
+        start = int(data.get("amountReceivedCents") or 0) if data.get("ledger") else 0
+        received = start + sum(e["amountCents"] for e in entries)
+
+        total = total_cents if total_cents is not None else int(round(reservation_model.amount(data) * 100))
+        if total <= 0:
+            total = received
+        if received > total:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Pagamento excede o saldo devedor (R$ {max(total - (received - amount_cents), 0) / 100:.2f})",
+            )
+
+        updates = _balance_updates(total, received, int(data.get("paymentsCount") or 0) + len(entries)) | {
+            "value": total / 100,
+            "paymentMethod": method,
+            "paidOn": today,
+            "lastPaymentAt": firestore.SERVER_TIMESTAMP,
+        }
+        updates["paymentStatus"] = "confirmado" if updates["balanceDueCents"] == 0 else "parcial"
+        updates = reservation_model.normalize_updates(data, updates)
+
+        _stage_entries(transaction, reservation_id, data, entries, start, total)
+        transaction.update(res_ref, updates)
+        financial_rollups.stage_change(transaction, "reservations", data, data | updates)
+        return updates
+
+    return apply(db.transaction())
+
+
+def _refund_entries(data: dict, note: str) -> list[dict]:
+    received = received_cents(data)
+    if received <= 0:
+        return []
+    refund = _entry(KIND_REFUND, -received, data.get("paymentMethod"), date.today().isoformat(), note)
+    return _opening_entries(data) + [refund]
+
+
+def refund_updates(data: dict) -> dict:
+    """Campos da reserva ao estornar tudo o que foi recebido (cancelamento)."""
+    entries = _refund_entries(data, "")
+    if not entries and not data.get("ledger"):
+        return {}
+    return _balance_updates(0, 0, int(data.get("paymentsCount") or 0) + len(entries))
+
+
+def stage_refund(writer, reservation_id: str, data: dict, note: str = "Cancelamento"):
+    """Lança no livro o estorno de tudo o que foi recebido, no mesmo lote da reserva."""
+    entries = _refund_entries(data, note)
+    start = int(data.get("amountReceivedCents") or 0) if data.get("ledger") else 0
+    # Reserva cancelada não deve mais nada: saldo após cada lançamento fica zerado
+    _stage_entries(writer, reservation_id, data, entries, start, 0)
+
+
+def list_entries(reservation_id: str) -> list[dict]:
+    entries = []
+    for doc in ledger(reservation_id).order_by("createdAt").stream():
+        entries.append((doc.to_dict() or {}) | {"id": doc.id})
+    return entries
@@ -0,0 +1,290 @@
+# app/services/rates.py
+"""
+Motor de tarifas: preço por quarto e noite a partir de settings.rates
+(valores em reais):
+
+    {
+      "base": {"Quarto Casal": 250, "Quarto Família": 320, "_default": 200},
+      "weekday": [1, 1, 1, 1, 1.1, 1.2, 1],              # segunda ... domingo
+      "seasons": [{"name": "Alta", "from": "12-15", "to": "02-28", "factor": 1.3}],
+      "occupancy": [{"from": 0.7, "factor": 1.1}, {"from": 0.9, "factor": 1.25}],
+      "companies": {"<companyId>": {"base": {"Quarto Casal": 180}, "discountPercent": 10}}
+    }
+
+tarifa da noite = base do tipo × dia da semana × temporada × faixa de
+ocupação (quartos reservados ÷ quartos não bloqueados naquela noite, lida
+dos bitmaps do índice de ocupação). Temporadas são intervalos MM-DD
+inclusivos e podem virar o ano.
+
+Tarifa negociada da empresa: a base fixa do tipo, quando existe, substitui
+a tarifa dinâmica; senão `discountPercent` é aplicado sobre ela.
+
+A tabela tipo × noite de hoje até `RATE_HORIZON_DAYS` é montada com NumPy
+uma vez por geração do índice, versão das configurações e dia; uma cotação
+é só a soma de uma fatia da linha do tipo.
+"""
+import os
+import threading
+import unicodedata
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+
+from app.core import cache
+from app.services import availability, reservation_model
+
+HORIZON_DAYS = int(os.getenv("RATE_HORIZON_DAYS", "365"))
+DEFAULT_BASE_KEY = "_default"
+
+_lock = threading.Lock()
+_table = None  # última RateTable montada
+
+
+def _fold(text) -> str:
+    folded = unicodedata.normalize("NFKD", str(text or "").strip().lower())
+    return "".join(c for c in folded if not unicodedata.combining(c))
+
+
+def rate_settings(settings: dict | None = None) -> dict:
+    settings = settings if settings is not None else (cache.get("settings") or {})
+    return settings.get("rates") or {}
+
+
+def _month_day(value) -> tuple[int, int] | None:
+    try:
+        month, day = str(value).split("-")
+        return int(month), int(day)
+    except (TypeError, ValueError):
+        return None
+
+
+def _season_factors(days: list[date], seasons: list[dict]) -> tuple[list[float], list[str | None]]:
+    factors, names = [1.0] * len(days), [None] * len(days)
+    for season in seasons or []:
+        first, last = _month_day(season.get("from")), _month_day(season.get("to"))
+        if not first or not last:
+            continue
+        factor = float(season.get("factor") or 1)
+        for i, d in enumerate(days):
+            md = (d.month, d.day)
+            inside = first <= md <= last if first <= last else (md >= first or md <= last)
+            if inside:
+                factors[i], names[i] = factor, season.get("name")
+    return factors, names
+
+
+def _occupancy_factors(occupancy, tiers: list[dict]):
+    """Fator da maior faixa com `from` <= ocupação da noite."""
+    import numpy as np
+
+    factors = np.ones(len(occupancy))
+    for tier in sorted(tiers or [], key=lambda t: float(t.get("from") or 0)):
+        factors[occupancy >= float(tier.get("from") or 0)] = float(tier.get("factor") or 1)
+    return factors
+
+
+@dataclass
+class RateTable:
+    first: date
+    days: int
+    types: list[str]           # tipos (normalizados) -> linha de `prices`
+    room_types: dict           # chave do quarto -> linha
+    prices: object             # int64[tipos, noites], centavos (0 = sem tarifa base)
+    occupancy: object          # float[noites]
+    factors: dict              # "weekday" / "season" / "occupancy" -> float[noites]
+    seasons: list
+    booked: dict               # chave do quarto -> bitmap de reservas/bloqueios na janela
+    key: tuple                 # (dia, geração do índice)
+    settings: object           # objeto de configurações usado (comparado por identidade)
+
+    def offset(self, d: date) -> int:
+        return (d - self.first).days
+
+    def check_range(self, start: date, end: date):
+        if end <= start:
+            raise HTTPException(status_code=400, detail="checkOut deve ser posterior ao checkIn")
+        if start < self.first or self.offset(end) > self.days:
+            last = self.first + timedelta(days=self.days)
+            raise HTTPException(status_code=400, detail=f"Cotações só entre {self.first.isoformat()} e {last.isoformat()}")
+
+
+def _build(today: date, settings: dict | None, key: tuple) -> RateTable:
+    import numpy as np
+
+    config = rate_settings(settings or {})
+    days = [today + timedelta(days=i) for i in range(HORIZON_DAYS)]
+    end = today + timedelta(days=HORIZON_DAYS)
+
+    # ocupação de cada noite a partir dos bitmaps do índice
+    booked_nights = np.zeros(HORIZON_DAYS)
+    blocked_nights = np.zeros(HORIZON_DAYS)
+    nbytes = (HORIZON_DAYS + 7) // 8
+
+    def unpack(bits):
+        raw = np.frombuffer(bits.to_bytes(nbytes, "little"), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder="little")[:HORIZON_DAYS]
+
+    types, room_types, busy = [], {}, {}
+    for info, booked, blocked in availability.index.window_bits(today, end):
+        if booked:
+            booked_nights += unpack(booked & ~blocked)
+        if blocked:
+            blocked_nights += unpack(blocked)
+        folded = _fold(info.type)
+        if folded not in types:
+            types.append(folded)
+        room_types[info.key] = types.index(folded)
+        busy[info.key] = booked | blocked
+    sellable = len(room_types) - blocked_nights
+    occupancy = np.divide(booked_nights, sellable, out=np.ones(HORIZON_DAYS), where=sellable > 0)
+
+    ordinals = np.array([d.toordinal() for d in days])
+    weekday_config = list(config.get("weekday") or [])
+    weekday = np.array([float(v or 1) for v in (weekday_config + [1] * 7)[:7]])[(ordinals - 1) % 7]
+    season, season_names = _season_factors(days, config.get("seasons"))
+    season = np.array(season)
+    by_occupancy = _occupancy_factors(occupancy, config.get("occupancy"))
+
+    bases = {_fold(k): reservation_model.to_cents(v) for k, v in (config.get("base") or {}).items()}
+    default = bases.get(_fold(DEFAULT_BASE_KEY), 0)
+    base = np.array([bases.get(t, default) for t in types] or [0], dtype="float64")
+    prices = np.rint(base[:, None] * (weekday * season * by_occupancy)[None, :]).astype("int64")
+
+    return RateTable(
+        first=today, days=HORIZON_DAYS, types=types, room_types=room_types, prices=prices,
+        occupancy=occupancy, factors={"weekday": weekday, "season": season, "occupancy": by_occupancy},
+        seasons=season_names, booked=busy, key=key, settings=settings,
+    )
+
+
+def table() -> RateTable:
+    """Tabela atual (remontada quando o índice, as configurações ou o dia mudam)."""
+    global _table
+    availability.index.ensure_fresh()
+    settings = cache.get("settings")
+    key = (date.today(), availability.index.generation)
+    current = _table
+    if current is not None and current.key == key and current.settings is settings:
+        return current
+    with _lock:
+        if _table is None or _table.key != key or _table.settings is not settings:
+            _table = _build(key[0], settings, key)
+        return _table
+
+
+# =======================================================
+# 🔹 Cotações
+# =======================================================
+def _negotiated(company_id: str | None, room_type: str, settings: dict | None) -> tuple[int | None, float]:
+    """(base fixa em centavos ou None, desconto %) da empresa para o tipo."""
+    if not company_id:
+        return None, 0.0
+    deal = (rate_settings(settings or {}).get("companies") or {}).get(company_id) or {}
+    fixed = {_fold(k): reservation_model.to_cents(v) for k, v in (deal.get("base") or {}).items()}
+    return fixed.get(room_type) or None, float(deal.get("discountPercent") or 0)
+
+
+def _company_rates(rates, company_id: str | None, room_type: str, settings: dict | None):
+    """Aplica a tarifa negociada da empresa a uma fatia de tarifas."""
+    import numpy as np
+
+    fixed, discount = _negotiated(company_id, room_type, settings)
+    if fixed:
+        return np.full(len(rates), fixed, dtype="int64"), True
+    if discount:
+        return np.rint(rates * (1 - discount / 100)).astype("int64"), True
+    return rates, False
+
+
+def quote(start: date, end: date, room_ref: str | None = None, room_type: str | None = None,
+          company_id: str | None = None) -> dict:
+    """Preço de uma estadia [start, end) para um quarto ou um tipo de quarto."""
+    rates_table = table()
+    rates_table.check_range(start, end)
+    a, b = rates_table.offset(start), rates_table.offset(end)
+
+    info = None
+    if room_ref:
+        key = availability.index.resolve_room(room_ref)
+        info = availability.index.room(key) if key else None
+        if info is None:
+            raise HTTPException(status_code=404, detail="Quarto não encontrado")
+        row = rates_table.room_types[info.key]
+        folded = rates_table.types[row]
+    elif room_type:
+        folded = _fold(room_type)
+        if folded not in rates_table.types:
+            raise HTTPException(status_code=404, detail=f"Nenhum quarto do tipo '{room_type}'")
+        row = rates_table.types.index(folded)
+    else:
+        raise HTTPException(status_code=400, detail="Informe roomId ou type")
+
+    rates, negotiated = _company_rates(rates_table.prices[row, a:b], company_id, folded, rates_table.settings)
+    if not rates.all():
+        raise HTTPException(status_code=400, detail=f"Sem tarifa base para o tipo '{folded or 'sem tipo'}' em settings.rates.base")
+
+    nights = []
+    for i, cents in enumerate(rates.tolist(), start=a):
+        nights.append({
+            "date": (rates_table.first + timedelta(days=i)).isoformat(),
+            "rateCents": cents,
+            "occupancy": round(float(rates_table.occupancy[i]), 4),
+            "weekdayFactor": float(rates_table.factors["weekday"][i]),
+            "seasonFactor": float(rates_table.factors["season"][i]),
+            "season": rates_table.seasons[i],
+            "occupancyFactor": float(rates_table.factors["occupancy"][i]),
+        })
+    total = int(rates.sum())
+    result = {
+        "checkIn": start.isoformat(),
+        "checkOut": end.isoformat(),
+        "type": folded or None,
+        "companyId": company_id,
+        "negotiated": negotiated,
+        "nights": nights,
+        "totalCents": total,
+        "averageRateCents": int(round(total / len(nights))),
+    }
+    if info:
+        result |= {"room": info.as_dict() | {"key": info.key},
+                   "available": availability.index.is_free(info.key, start, end)}
+    else:
+        result["freeRooms"] = [
+            r.as_dict() | {"key": r.key}
+            for r in availability.index.free_rooms(start, end)
+            if rates_table.room_types.get(r.key) == row
+        ]
+    return result
+
+
+def batch(start: date, days: int, room_type: str | None = None, company_id: str | None = None) -> dict:
+    """Tarifa de cada quarto em cada noite de [start, start + days), com disponibilidade."""
+    rates_table = table()
+    end = start + timedelta(days=days)
+    rates_table.check_range(start, end)
+    a, b = rates_table.offset(start), rates_table.offset(end)
+    wanted = _fold(room_type) if room_type else None
+
+    rooms = []
+    for info in availability.index.rooms():
+        row = rates_table.room_types.get(info.key)
+        if row is None or (wanted is not None and rates_table.types[row] != wanted):
+            continue
+        rates, negotiated = _company_rates(
+            rates_table.prices[row, a:b], company_id, rates_table.types[row], rates_table.settings)
+        busy = rates_table.booked.get(info.key, 0) >> a
+        rooms.append(info.as_dict() | {
+            "key": info.key,
+            "negotiated": negotiated,
+            "rateCents": [cents or None for cents in rates.tolist()],
+            "free": [not (busy >> i) & 1 for i in range(b - a)],
+        })
+    return {
+        "from": start.isoformat(),
+        "days": days,
+        "companyId": company_id,
+        "dates": [(start + timedelta(days=i)).isoformat() for i in range(days)],
+        "occupancy": [round(float(v), 4) for v in rates_table.occupancy[a:b]],
+        "rooms": rooms,
+    }
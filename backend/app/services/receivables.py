@@ -0,0 +1,291 @@
+# app/services/receivables.py
+"""
+Contas a receber por idade (aging), por empresa e por hóspede.
+
+Cada reserva com saldo devedor (`balanceDueCents` > 0, mantido pelo livro
+de pagamentos) vira um título vencendo no checkOut. Os títulos são
+agrupados por cliente — empresa (companyId/companyName) ou hóspede
+(CPF, ou nome) — e somados em faixas de atraso:
+
+    a_vencer | 0-30 | 31-60 | 61-90 | 90+   (dias após o checkOut)
+
+As somas por cliente ficam prontas em memória:
+- reconstrução completa na primeira consulta, por `invalidate()` ou a cada
+  `RECEIVABLES_REBUILD_SECONDS` (consulta só as reservas com saldo);
+- entre reconstruções, os eventos `reservation` do barramento marcam
+  reservas como sujas; só elas são relidas e a diferença é aplicada às
+  faixas do cliente;
+- na virada do dia as faixas são recalculadas a partir dos títulos em
+  memória (sem reler o Firestore).
+
+Reservas gravadas antes do campo `balanceDueCents` entram depois da
+migração `normalize_reservations`.
+"""
+import os
+import threading
+import time
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from datetime import date
+
+from app.core import events
+from app.core.firebase import db
+from app.services import reservation_model
+
+REBUILD_SECONDS = float(os.getenv("RECEIVABLES_REBUILD_SECONDS", "900"))
+
+BUCKETS = ("a_vencer", "0-30", "31-60", "61-90", "90+")
+PARTY_COMPANY = "company"
+PARTY_GUEST = "guest"
+PARTY_TYPES = (PARTY_COMPANY, PARTY_GUEST)
+
+
+def bucket_for(days_past_due: int) -> int:
+    if days_past_due < 0:
+        return 0
+    if days_past_due <= 30:
+        return 1
+    if days_past_due <= 60:
+        return 2
+    if days_past_due <= 90:
+        return 3
+    return 4
+
+
+def _fold(text) -> str:
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().split())
+
+
+def party_of(data: dict) -> tuple[str, str, str]:
+    """(tipo, chave, nome) do cliente devedor de uma reserva."""
+    company_name = (data.get("companyName") or "").strip()
+    if data.get("companyId") or company_name:
+        key = data.get("companyId") or _fold(company_name)
+        return PARTY_COMPANY, f"{PARTY_COMPANY}:{key}", company_name or reservation_model.display_name(data)
+    name = reservation_model.display_name(data)
+    cpf = "".join(ch for ch in str(data.get("guestCPF") or data.get("cpf") or "") if ch.isdigit())
+    return PARTY_GUEST, f"{PARTY_GUEST}:{cpf or _fold(name)}", name
+
+
+@dataclass
+class Item:
+    id: str
+    partyType: str
+    partyKey: str
+    partyName: str
+    name: str
+    room: str | None
+    checkIn: str | None
+    dueDate: date
+    totalCents: int
+    receivedCents: int
+    balanceCents: int
+
+    def as_dict(self, today: date) -> dict:
+        days = (today - self.dueDate).days
+        return asdict(self) | {
+            "dueDate": self.dueDate.isoformat(),
+            "daysPastDue": max(days, 0),
+            "bucket": BUCKETS[bucket_for(days)],
+            "balance": self.balanceCents / 100,
+        }
+
+
+@dataclass
+class Party:
+    key: str
+    type: str
+    name: str
+    buckets: list[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+    count: int = 0
+    oldestDue: date | None = None
+
+    @property
+    def total(self) -> int:
+        return sum(self.buckets)
+
+    def as_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "type": self.type,
+            "name": self.name,
+            "count": self.count,
+            "oldestDue": self.oldestDue.isoformat() if self.oldestDue else None,
+            "totalCents": self.total,
+            "bucketsCents": dict(zip(BUCKETS, self.buckets)),
+        }
+
+
+def _item_from(res_id: str, data: dict | None) -> Item | None:
+    if not data or reservation_model.stay_status(data) == reservation_model.STATUS_CANCELED:
+        return None
+    balance = int(round(reservation_model.balance_due(data) * 100))
+    due = reservation_model.check_out_date(data)
+    if balance <= 0 or due is None:
+        return None
+    party_type, party_key, party_name = party_of(data)
+    return Item(
+        id=res_id,
+        partyType=party_type,
+        partyKey=party_key,
+        partyName=party_name,
+        name=reservation_model.display_name(data),
+        room=str(data.get("roomNumber") or data.get("roomId") or "") or None,
+        checkIn=data.get("checkIn"),
+        dueDate=due,
+        totalCents=int(round(reservation_model.amount(data) * 100)),
+        receivedCents=int(round(reservation_model.amount_received(data) * 100)),
+        balanceCents=balance,
+    )
+
+
+class ReceivablesIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._items: dict[str, Item] = {}
+        self._parties: dict[str, Party] = {}
+        self._dirty: set[str] = set()
+        self._day: date | None = None
+        self._built_at = 0.0
+        self._stale = True
+        self.generation = 0
+        events.add_listener(self._on_event)
+
+    # ---------------- ciclo de vida ----------------
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+    def _on_event(self, event):
+        if event.type == "import" and event.data.get("kind") == "reservations":
+            self.invalidate()
+            return
+        doc_id = event.data.get("id")
+        if event.type == "reservation" and doc_id:
+            with self._lock:
+                self._dirty.add(doc_id)
+
+    def ensure_fresh(self):
+        with self._lock:
+            if self._stale or time.monotonic() - self._built_at > REBUILD_SECONDS:
+                self._rebuild()
+                return
+            if self._day != date.today():
+                self._rebucket()
+            if self._dirty:
+                self._apply_dirty()
+
+    # ---------------- construção ----------------
+    def _account(self, item: Item, sign: int):
+        party = self._parties.get(item.partyKey)
+        if party is None:
+            if sign < 0:
+                return
+            party = self._parties[item.partyKey] = Party(item.partyKey, item.partyType, item.partyName)
+        party.buckets[bucket_for((self._day - item.dueDate).days)] += sign * item.balanceCents
+        party.count += sign
+        if party.count <= 0:
+            del self._parties[item.partyKey]
+        elif sign > 0 and (party.oldestDue is None or item.dueDate < party.oldestDue):
+            party.oldestDue = item.dueDate
+        elif sign < 0 and item.dueDate == party.oldestDue:
+            party.oldestDue = min(i.dueDate for i in self._items.values() if i.partyKey == party.key)
+
+    def _put(self, res_id: str, data: dict | None):
+        old = self._items.pop(res_id, None)
+        if old:
+            self._account(old, -1)
+        item = _item_from(res_id, data)
+        if item:
+            self._items[res_id] = item
+            self._account(item, +1)
+
+    def _rebucket(self):
+        self._day = date.today()
+        self._parties = {}
+        for item in self._items.values():
+            self._account(item, +1)
+        self.generation += 1
+
+    def _rebuild(self):
+        self._dirty.clear()
+        items = {}
+        for doc in db.collection("reservations").where("balanceDueCents", ">", 0).stream():
+            item = _item_from(doc.id, doc.to_dict() or {})
+            if item:
+                items[doc.id] = item
+        self._items = items
+        self._rebucket()
+        self._built_at = time.monotonic()
+        self._stale = False
+
+    def _apply_dirty(self):
+        ids, self._dirty = self._dirty, set()
+        refs = [db.collection("reservations").document(i) for i in ids]
+        for snap in db.get_all(refs):
+            self._put(snap.id, snap.to_dict() if snap.exists else None)
+        self.generation += 1
+
+    # ---------------- consultas ----------------
+    def summary(self, party_type: str | None = None) -> dict:
+        """Totais por faixa (geral e por tipo de cliente)."""
+        self.ensure_fresh()
+        with self._lock:
+            totals = {t: [0] * len(BUCKETS) for t in PARTY_TYPES}
+            for party in self._parties.values():
+                for i, cents in enumerate(party.buckets):
+                    totals[party.type][i] += cents
+            by_type = {
+                t: {"totalCents": sum(v), "bucketsCents": dict(zip(BUCKETS, v))}
+                for t, v in totals.items() if party_type in (None, t)
+            }
+            overall = [sum(totals[t][i] for t in by_type) for i in range(len(BUCKETS))]
+            return {
+                "asOf": self._day.isoformat(),
+                "totalCents": sum(overall),
+                "bucketsCents": dict(zip(BUCKETS, overall)),
+                "byType": by_type,
+                "openItems": sum(p.count for p in self._parties.values() if party_type in (None, p.type)),
+            }
+
+    def parties(self, party_type: str | None = None, bucket: str | None = None) -> list[Party]:
+        """Clientes com saldo, do maior para o menor (na faixa, se informada)."""
+        self.ensure_fresh()
+        with self._lock:
+            selected = [p for p in self._parties.values() if party_type in (None, p.type)]
+            if bucket:
+                i = BUCKETS.index(bucket)
+                selected = [p for p in selected if p.buckets[i]]
+                return sorted(selected, key=lambda p: (-p.buckets[i], p.name))
+            return sorted(selected, key=lambda p: (-p.total, p.name))
+
+    def party(self, key: str) -> Party | None:
+        self.ensure_fresh()
+        with self._lock:
+            return self._parties.get(key)
+
+    def items(self, party_key: str | None = None, bucket: str | None = None) -> list[Item]:
+        """Títulos em aberto, do vencimento mais antigo para o mais novo."""
+        self.ensure_fresh()
+        with self._lock:
+            today = self._day
+            selected = [
+                i for i in self._items.values()
+                if (party_key is None or i.partyKey == party_key)
+                and (bucket is None or BUCKETS[bucket_for((today - i.dueDate).days)] == bucket)
+            ]
+        return sorted(selected, key=lambda i: (i.dueDate, i.id))
+
+    @property
+    def day(self) -> date:
+        self.ensure_fresh()
+        return self._day
+
+
+index = ReceivablesIndex()
+
+
+def invalidate():
+    """Força reconstrução completa na próxima consulta (ex.: após importações em massa)."""
+    index.invalidate()
@@ -0,0 +1,203 @@
+# app/services/reservation_model.py
+"""
+Campos canônicos das reservas, calculados na gravação.
+
+Os documentos de 'reservations' vieram de várias telas e guardam o mesmo
+dado com nomes diferentes (guestName/companyName/guestOrCompany/...,
+value/totalAmount como texto ou número, datas "yyyy-MM-dd"). Toda rota que
+grava uma reserva acrescenta os campos abaixo, e a migração
+`normalize_reservations` regrava os documentos antigos:
+
+- displayName          nome do hóspede ou da empresa
+- amountCents          valor total em centavos (int)
+- amountReceivedCents  valor recebido em centavos (int)
+- balanceDueCents      saldo devedor em centavos (mantido pelo livro de
+                       pagamentos, ver `payments`)
+- checkInOrd/checkOutOrd  datas como ordinal (date.toordinal()), para
+                       filtros de intervalo no Firestore
+- nights               noites da estadia
+- statusCode           STATUS_* (estado da estadia)
+- paymentCode          PAYMENT_* (estado do pagamento)
+
+As funções de leitura (`display_name`, `amount`, ...) usam o campo
+canônico quando existe e só recalculam para documentos ainda não migrados
+(ex.: gravados direto pelo frontend).
+"""
+from datetime import date
+
+from app.core import versions
+from app.services import migrations
+
+SCHEMA_VERSION = 2
+
+STATUS_CONFIRMED = "confirmed"
+STATUS_IN_HOUSE = "in_house"
+STATUS_CHECKED_OUT = "checked_out"
+STATUS_CANCELED = "canceled"
+STATUSES = (STATUS_CONFIRMED, STATUS_IN_HOUSE, STATUS_CHECKED_OUT, STATUS_CANCELED)
+
+PAYMENT_PENDING = "pending"
+PAYMENT_PAID = "paid"
+PAYMENT_CANCELED = "canceled"
+
+_NAME_FIELDS = ("guestOrCompany", "guestName", "guest", "name", "companyName", "company", "clientName")
+_PAID_WORDS = ("confirmado", "pago", "aprovado")
+
+
+def to_cents(value) -> int:
+    """'1.234,50' / '150,5' / 150.5 / None -> centavos."""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, (int, float)):
+        return int(round(value * 100))
+    text = str(value).strip().replace("R$", "").replace(" ", "")
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        return int(round(float(text) * 100))
+    except ValueError:
+        return 0
+
+
+def to_ordinal(value) -> int | None:
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value or "")[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def status_code(data: dict) -> str:
+    status = str(data.get("status") or "").lower()
+    if "cancel" in status:
+        return STATUS_CANCELED
+    if str(data.get("checkOutStatus") or "").lower() == "concluido" or status == "finalizada":
+        return STATUS_CHECKED_OUT
+    if str(data.get("checkInStatus") or "").lower() == "concluido":
+        return STATUS_IN_HOUSE
+    return STATUS_CONFIRMED
+
+
+def payment_code(data: dict) -> str:
+    payment = str(data.get("paymentStatus") or "").lower()
+    if "cancel" in payment or "cancel" in str(data.get("status") or "").lower():
+        return PAYMENT_CANCELED
+    if any(word in payment for word in _PAID_WORDS):
+        return PAYMENT_PAID
+    return PAYMENT_PENDING
+
+
+def _display_name(data: dict) -> str:
+    for field in _NAME_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return "—"
+
+
+def legacy_received_cents(data: dict) -> int:
+    """Recebido em reservas sem livro: amountReceived, ou o valor total se marcada como paga."""
+    received = to_cents(data.get("amountReceived"))
+    if received or payment_code(data) != PAYMENT_PAID:
+        return received
+    return to_cents(data.get("value") if data.get("value") is not None else data.get("totalAmount"))
+
+
+def _balance_due_cents(data: dict, total: int) -> int:
+    code = payment_code(data)
+    if code == PAYMENT_CANCELED or status_code(data) == STATUS_CANCELED:
+        return 0
+    if not data.get("ledger") and code == PAYMENT_PAID:
+        return 0
+    return max(total - to_cents(data.get("amountReceived")), 0)
+
+
+def canonical_fields(data: dict) -> dict:
+    """Campos canônicos calculados a partir do documento completo."""
+    check_in, check_out = to_ordinal(data.get("checkIn")), to_ordinal(data.get("checkOut"))
+    value = data.get("value") if data.get("value") is not None else data.get("totalAmount")
+    total = to_cents(value)
+    return {
+        "displayName": _display_name(data),
+        "amountCents": total,
+        "amountReceivedCents": to_cents(data.get("amountReceived")),
+        "balanceDueCents": _balance_due_cents(data, total),
+        "checkInOrd": check_in,
+        "checkOutOrd": check_out,
+        "nights": max(check_out - check_in, 0) if check_in and check_out else 0,
+        "statusCode": status_code(data),
+        "paymentCode": payment_code(data),
+        "schemaVersion": SCHEMA_VERSION,
+    }
+
+
+def normalize(data: dict) -> dict:
+    """Documento novo completo: dados originais + campos canônicos."""
+    return data | canonical_fields(data)
+
+
+def normalize_updates(current: dict, updates: dict) -> dict:
+    """Atualização sobre um documento lido: recalcula os canônicos do resultado."""
+    merged = current | updates
+    fields = canonical_fields(merged)
+    return updates | {k: v for k, v in fields.items() if current.get(k) != v}
+
+
+# =======================================================
+# 🔹 Leitura (campo canônico com recálculo para documentos antigos)
+# =======================================================
+def display_name(data: dict) -> str:
+    return data.get("displayName") or _display_name(data)
+
+
+def amount(data: dict) -> float:
+    cents = data.get("amountCents")
+    if cents is None:
+        cents = to_cents(data.get("value") if data.get("value") is not None else data.get("totalAmount"))
+    return cents / 100
+
+
+def amount_received(data: dict) -> float:
+    cents = data.get("amountReceivedCents")
+    if cents is None:
+        cents = to_cents(data.get("amountReceived"))
+    return cents / 100
+
+
+def balance_due(data: dict) -> float:
+    """Saldo devedor (valor total − recebido; zero para pagas sem livro e canceladas)."""
+    cents = data.get("balanceDueCents")
+    if cents is None:
+        cents = _balance_due_cents(data, round(amount(data) * 100))
+    return cents / 100
+
+
+def stay_status(data: dict) -> str:
+    return data.get("statusCode") or status_code(data)
+
+
+def payment_status(data: dict) -> str:
+    return data.get("paymentCode") or payment_code(data)
+
+
+def check_in_date(data: dict) -> date | None:
+    ordinal = data.get("checkInOrd") or to_ordinal(data.get("checkIn"))
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def check_out_date(data: dict) -> date | None:
+    ordinal = data.get("checkOutOrd") or to_ordinal(data.get("checkOut"))
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+# =======================================================
+# 🔹 Migração dos documentos existentes
+# =======================================================
+@migrations.migration("normalize_reservations", version=SCHEMA_VERSION, collection="reservations",
+                      after=lambda: versions.bump("reservations"))
+def _normalize_reservation(data: dict, doc_id: str) -> dict | None:
+    """Grava displayName, amountCents, checkInOrd/checkOutOrd, statusCode e paymentCode."""
+    fields = canonical_fields(data)
+    changed = {k: v for k, v in fields.items() if data.get(k) != v}
+    return changed or None
@@ -0,0 +1,167 @@
+# app/services/room_calendar.py
+"""
+Agenda por quarto para impedir reservas sobrepostas (double booking).
+
+Cada quarto tem um documento `room_calendars/{chave}` com o mapa
+`stays: {id_da_reserva: {"in": "yyyy-MM-dd", "out": "yyyy-MM-dd"}}`.
+Quem cria uma reserva lê esse documento dentro da mesma transação do
+insert, verifica sobreposição e grava a nova estadia: duas recepções
+reservando o mesmo quarto ao mesmo tempo disputam o mesmo documento e o
+Firestore reexecuta a transação perdedora, que então encontra o conflito.
+A verificação lê um único documento — nunca a coleção de reservas.
+
+Cancelamentos removem a estadia e check-outs encurtam a saída para o dia
+real, no mesmo lote da reserva. Quando um quarto ainda não tem agenda, ela
+é semeada a partir do índice de ocupação (`availability`);
+`POST /calendar/room-calendars/rebuild` reconcilia todas com as reservas,
+cada quarto na sua própria transação, sem apagar estadias gravadas
+durante a reconstrução.
+"""
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+
+from app.core.firebase import db, firestore
+from app.services import availability
+
+COLLECTION = "room_calendars"
+
+# Estadias que terminaram há mais que isso saem da agenda na próxima gravação
+PRUNE_AFTER_DAYS = 30
+
+
+def key_for(room_ref) -> str | None:
+    """Chave do quarto (id, número ou identifier → chave do índice de ocupação)."""
+    availability.index.ensure_fresh()
+    return availability.index.resolve_room(room_ref)
+
+
+def calendar_ref(room_key: str):
+    # quartos de empresa têm chave "empresa/quarto"; '/' não é permitido em ids
+    return db.collection(COLLECTION).document(room_key.replace("/", ":"))
+
+
+def _seed(room_key: str) -> dict:
+    stays = availability.index.room_stays(room_key)
+    return {
+        s.id: {"in": availability.index_date(s.start).isoformat(), "out": availability.index_date(s.end).isoformat()}
+        for s in stays
+    }
+
+
+def _prune_cutoff() -> str:
+    return (date.today() - timedelta(days=PRUNE_AFTER_DAYS)).isoformat()
+
+
+class RoomCalendar:
+    """Agenda de um quarto lida dentro de uma transação."""
+
+    def __init__(self, room_key: str, stays: dict):
+        self.room_key = room_key
+        self.stays = stays
+
+    def conflicts(self, check_in: date, check_out: date, ignore: str | None = None) -> list[str]:
+        start, end = check_in.isoformat(), check_out.isoformat()
+        # datas ISO comparam lexicalmente; [in, out) sobrepõe se in < end e out > start
+        return sorted(
+            res_id for res_id, stay in self.stays.items()
+            if res_id != ignore and stay.get("in", "") < end and stay.get("out", "") > start
+        )
+
+    def add(self, res_id: str, check_in: date, check_out: date):
+        self.stays[res_id] = {"in": check_in.isoformat(), "out": check_out.isoformat()}
+
+    def stage(self, transaction):
+        cutoff = _prune_cutoff()
+        stays = {k: v for k, v in self.stays.items() if v.get("out", "") >= cutoff}
+        transaction.set(calendar_ref(self.room_key), {
+            "roomKey": self.room_key,
+            "stays": stays,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        })
+
+
+def read(transaction, room_key: str) -> RoomCalendar:
+    snap = calendar_ref(room_key).get(transaction=transaction)
+    if snap.exists:
+        return RoomCalendar(room_key, dict((snap.to_dict() or {}).get("stays") or {}))
+    return RoomCalendar(room_key, _seed(room_key))
+
+
+def reserve(transaction, room_key: str, res_id: str, check_in: date, check_out: date) -> RoomCalendar:
+    """
+    Lê a agenda na transação e reserva [check_in, check_out) para `res_id`.
+    Sobreposição → 409 com os ids das reservas em conflito.
+    Chame antes de qualquer gravação na transação (leituras vêm primeiro).
+    """
+    calendar = read(transaction, room_key)
+    conflicts = calendar.conflicts(check_in, check_out, ignore=res_id)
+    if conflicts:
+        raise HTTPException(status_code=409, detail={
+            "message": "Quarto já reservado em parte do período.",
+            "roomKey": room_key,
+            "conflicts": conflicts,
+        })
+    calendar.add(res_id, check_in, check_out)
+    calendar.stage(transaction)
+    return calendar
+
+
+def stage_release(writer, room_key: str | None, res_id: str):
+    """Remove a estadia (cancelamento) no lote/transação do chamador."""
+    if room_key:
+        writer.set(calendar_ref(room_key), {"stays": {res_id: firestore.DELETE_FIELD}}, merge=True)
+
+
+def stage_checkout(writer, room_key: str | None, res_id: str, check_in: str | None, check_out: str | None):
+    """Encurta a estadia para terminar hoje quando o hóspede sai antes do previsto."""
+    if not room_key or not check_in or not check_out:
+        return
+    today = date.today().isoformat()
+    if check_out <= today:
+        return
+    writer.set(calendar_ref(room_key), {"stays": {res_id: {"in": check_in[:10], "out": today}}}, merge=True)
+
+
+def _merge_room(transaction, room_key: str, computed: dict) -> int:
+    """
+    Funde a agenda gravada com a recalculada a partir das reservas.
+
+    Estadias em que as duas concordam ficam como estão; nas divergentes
+    (reserva criada, alterada ou cancelada depois que o índice foi montado)
+    vale a reserva lida nesta transação. Uma reserva gravada em paralelo
+    altera a agenda e faz o Firestore reexecutar a fusão.
+    """
+    cutoff = _prune_cutoff()
+    snap = calendar_ref(room_key).get(transaction=transaction)
+    current = dict((snap.to_dict() or {}).get("stays") or {}) if snap.exists else {}
+    current = {k: v for k, v in current.items() if v.get("out", "") >= cutoff}
+    computed = {k: v for k, v in computed.items() if v["out"] >= cutoff}
+
+    stays = {res_id: stay for res_id, stay in computed.items() if current.get(res_id) == stay}
+    disputed = sorted((current.keys() | computed.keys()) - stays.keys())
+    if disputed:
+        refs = [db.collection("reservations").document(res_id) for res_id in disputed]
+        for res in db.get_all(refs, transaction=transaction):
+            data = res.to_dict() if res.exists else None
+            nights = availability.stay_range(data) if data else None
+            owner = availability.index.resolve_room(data.get("roomId") or data.get("roomNumber")) if data else None
+            if nights and owner == room_key and nights[1].isoformat() >= cutoff:
+                stays[res.id] = {"in": nights[0].isoformat(), "out": nights[1].isoformat()}
+
+    transaction.set(calendar_ref(room_key), {
+        "roomKey": room_key,
+        "stays": stays,
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    })
+    return len(stays)
+
+
+def rebuild() -> dict:
+    """Reconstrói as agendas a partir das reservas, um quarto por transação."""
+    availability.invalidate()
+    written = stays = 0
+    for room in availability.index.rooms():
+        stays += firestore.transactional(_merge_room)(db.transaction(), room.key, _seed(room.key))
+        written += 1
+    return {"rooms": written, "stays": stays}
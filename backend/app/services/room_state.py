@@ -0,0 +1,175 @@
+# app/services/room_state.py
+"""
+Máquina de estados do quarto (disponível / reservado / ocupado / manutenção).
+
+Todas as mudanças de status de quarto passam por aqui:
+- `TRANSITIONS` define quais mudanças são válidas (409 caso contrário);
+- `room_updates()` monta sempre o mesmo conjunto de campos para cada
+  status (status, guest, guestNotes, activeReservationId);
+- o status atual usado na validação vem de um snapshot do documento lido
+  na hora (`read()`, ou dentro da transação do chamador), nunca do cache;
+- a gravação leva a precondição `last_update_time` desse snapshot: se
+  outra pessoa mudou o quarto entre a leitura e o commit, o Firestore
+  rejeita a escrita e a mudança falha com 409 (`CONFLICT`);
+- depois do commit, `announce()` incrementa a versão de 'rooms' e publica
+  os eventos `room.status`.
+
+Para gravar junto com outros documentos (check-in, check-out, manutenção)
+use `stage()` com o snapshot dentro do lote/transação do chamador e
+`announce()` após o commit.
+"""
+import unicodedata
+
+from fastapi import HTTPException
+
+from app.core import events, versions
+from app.core.firebase import db, api_exceptions
+
+DISPONIVEL = "disponível"
+RESERVADO = "reservado"
+OCUPADO = "ocupado"
+MANUTENCAO = "manutenção"
+
+STATUSES = (DISPONIVEL, RESERVADO, OCUPADO, MANUTENCAO)
+
+# status atual -> status de destino permitidos (manter o mesmo status é sempre válido)
+TRANSITIONS = {
+    DISPONIVEL: {RESERVADO, OCUPADO, MANUTENCAO},
+    RESERVADO: {DISPONIVEL, OCUPADO, MANUTENCAO},
+    OCUPADO: {DISPONIVEL, MANUTENCAO},
+    MANUTENCAO: {DISPONIVEL},
+}
+
+_ALIASES = {
+    "disponivel": DISPONIVEL,
+    "livre": DISPONIVEL,
+    "reservado": RESERVADO,
+    "ocupado": OCUPADO,
+    "manutencao": MANUTENCAO,
+}
+
+BATCH_LIMIT = 400
+
+CONFLICT = "O quarto foi alterado por outro usuário. Atualize e tente novamente."
+
+
+def normalize_status(status: str | None) -> str | None:
+    """'Manutencao', 'MANUTENÇÃO', 'manutenção' -> 'manutenção'."""
+    if not status:
+        return None
+    folded = unicodedata.normalize("NFKD", str(status).strip().lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _ALIASES.get(folded)
+
+
+def check_transition(current: str | None, new_status: str) -> str:
+    """Valida a transição e devolve o status de destino normalizado."""
+    target = normalize_status(new_status)
+    if target is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Status inválido: {new_status}. Use: {', '.join(STATUSES)}",
+        )
+    source = normalize_status(current)
+    if source and source != target and target not in TRANSITIONS[source]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Transição inválida do quarto: {source} → {target}",
+        )
+    return target
+
+
+def room_updates(new_status: str, *, current: str | None = None, guest: str | None = None,
+                 notes: str | None = None, reservation_id: str | None = None) -> dict:
+    """Campos gravados no documento do quarto para o novo status."""
+    status = check_transition(current, new_status)
+    updates = {"status": status}
+
+    if status == DISPONIVEL:
+        updates.update({"guest": None, "guestNotes": None, "activeReservationId": None})
+    else:
+        if guest is not None:
+            updates["guest"] = guest
+        if notes is not None:
+            updates["guestNotes"] = notes
+        if reservation_id is not None:
+            updates["activeReservationId"] = reservation_id
+    return updates
+
+
+def read(room_id: str, transaction=None):
+    """Snapshot atual do quarto (404 se não existe)."""
+    snap = db.collection("rooms").document(room_id).get(transaction=transaction)
+    if not snap.exists:
+        raise HTTPException(status_code=404, detail="Quarto não encontrado")
+    return snap
+
+
+def stage(writer, snap, new_status: str, *, extra: dict | None = None, **fields) -> dict:
+    """
+    Valida a transição contra o snapshot `snap` e adiciona a gravação (com
+    precondição de `last_update_time`) ao WriteBatch/Transaction do chamador.
+    `extra` são outros campos do quarto gravados no mesmo `update`.
+    """
+    updates = (extra or {}) | room_updates(new_status, current=(snap.to_dict() or {}).get("status"), **fields)
+    writer.update(snap.reference, updates, option=db.write_option(last_update_time=snap.update_time))
+    return updates
+
+
+def commit(batch):
+    """Commit de um lote com mudanças de quarto (404 / 409 como HTTPException)."""
+    try:
+        batch.commit()
+    except api_exceptions.NotFound:
+        raise HTTPException(status_code=404, detail="Quarto não encontrado")
+    except api_exceptions.FailedPrecondition:
+        raise HTTPException(status_code=409, detail=CONFLICT)
+
+
+def announce(*changes: tuple[str, str]):
+    """Publica (room_id, status) após o commit bem-sucedido."""
+    if not changes:
+        return
+    versions.bump("rooms")
+    for room_id, status in changes:
+        events.publish("room.status", {"roomId": room_id, "status": status})
+
+
+def set_status(room_id: str, new_status: str, *, extra: dict | None = None, **fields) -> dict:
+    """Muda o status de um quarto: uma leitura e uma gravação condicionada a ela."""
+    batch = db.batch()
+    updates = stage(batch, read(room_id), new_status, extra=extra, **fields)
+    commit(batch)
+    announce((room_id, updates["status"]))
+    return updates
+
+
+def set_many(room_ids: list[str], new_status: str, **fields) -> list[str]:
+    """
+    Muda vários quartos para o mesmo status em lotes atômicos.
+    Todas as transições são validadas antes de qualquer gravação.
+    """
+    room_ids = list(dict.fromkeys(room_ids))
+    refs = [db.collection("rooms").document(room_id) for room_id in room_ids]
+    snaps = {snap.id: snap for snap in db.get_all(refs)}
+    missing = [room_id for room_id in room_ids if not (snaps.get(room_id) and snaps[room_id].exists)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Quartos não encontrados: {', '.join(missing)}")
+    for room_id in room_ids:
+        check_transition((snaps[room_id].to_dict() or {}).get("status"), new_status)
+
+    staged, done = [], []
+    for start in range(0, len(room_ids), BATCH_LIMIT):
+        chunk = room_ids[start:start + BATCH_LIMIT]
+        batch = db.batch()
+        updates = [(room_id, stage(batch, snaps[room_id], new_status, **fields)) for room_id in chunk]
+        try:
+            commit(batch)
+        except HTTPException:
+            announce(*[(room_id, u["status"]) for room_id, u in staged])
+            raise
+        staged.extend(updates)
+        done.extend(chunk)
+
+    announce(*[(room_id, updates["status"]) for room_id, updates in staged])
+    return done
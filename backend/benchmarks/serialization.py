@@ -0,0 +1,139 @@
+"""
+Benchmark de serialização das respostas grandes.
+
+Gera payloads sintéticos com o mesmo formato de `/reservations`,
+`/incomes` e `/financial-dashboard` e compara, por endpoint:
+- o caminho padrão do FastAPI (`jsonable_encoder` + `json.dumps`);
+- JSON rápido (`encode_json`) e MessagePack (`encode_msgpack`);
+- bytes após gzip/brotli.
+
+Uso (dentro de backend/):
+    python -m benchmarks.serialization --rows 5000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import responses
+
+
+def _reservations(n: int) -> list[dict]:
+    start = date(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        check_in = start + timedelta(days=random.randint(0, 700))
+        rows.append({
+            "id": f"res{i:06d}xYz{random.randint(1000, 9999)}",
+            "guestOrCompany": random.choice(["Maria Souza", "João Lima", "Construtora Alfa Ltda"]),
+            "room": str(random.randint(101, 130)),
+            "guestsCount": random.randint(1, 4),
+            "checkIn": check_in.isoformat(),
+            "checkOut": (check_in + timedelta(days=random.randint(1, 10))).isoformat(),
+            "reservationStatus": random.choice(["confirmado", "cancelado"]),
+            "checkInStatus": random.choice(["pendente", "concluido"]),
+            "checkOutStatus": random.choice(["pendente", "concluido"]),
+            "paymentStatus": random.choice(["pendente", "confirmado"]),
+            "paymentMethod": random.choice(["PIX", "Cartão", "Dinheiro", "—"]),
+            "total": round(random.uniform(150, 3000), 2),
+        })
+    return rows
+
+
+def _incomes(n: int) -> list[dict]:
+    return [
+        {
+            "id": f"inc{i:06d}",
+            "description": f"Reserva - Hóspede {i}",
+            "date": (date(2024, 1, 1) + timedelta(days=i % 700)).isoformat(),
+            "amount": round(random.uniform(50, 2500), 2),
+            "method": random.choice(["PIX", "Cartão", "Dinheiro", "Transferência"]),
+            "origin": random.choice(["Manual", "Automática"]),
+        }
+        for i in range(n)
+    ]
+
+
+def _financial_dashboard(n: int) -> dict:
+    entries = [
+        {
+            "id": f"res{i:06d}",
+            "name": f"Cliente {i}",
+            "dueDate": (date(2024, 1, 1) + timedelta(days=i % 700)).isoformat(),
+            "amount": f"R$ {random.uniform(100, 5000):,.2f}",
+            "status": random.choice(["Em aberto", "Pago"]),
+        }
+        for i in range(n)
+    ]
+    return {
+        "kpis": {"grossRevenue": "R$ 1.234.567,89", "receivables": "R$ 12.345,67",
+                 "expenses": "R$ 98.765,43", "estimatedProfit": "R$ 1.135.802,46"},
+        "paymentOverview": [{"method": "PIX", "amount": "R$ 500.000,00"}],
+        "insights": ["Existem reservas pendentes aguardando pagamento."],
+        "receivablesCompanies": entries[: n // 3],
+        "receivablesGeneral": entries[n // 3:],
+    }
+
+
+def _time(fn, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def bench(name: str, payload, repeat: int) -> dict:
+    baseline_ms, baseline = _time(
+        lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode("utf-8"), repeat
+    )
+    json_ms, fast_json = _time(lambda: responses.encode_json(payload), repeat)
+    msgpack_ms, packed = _time(lambda: responses.encode_msgpack(payload), repeat)
+
+    result = {
+        "endpoint": name,
+        "baseline_ms": round(baseline_ms, 2),
+        "json_ms": round(json_ms, 2),
+        "msgpack_ms": round(msgpack_ms, 2),
+        "baseline_bytes": len(baseline),
+        "json_bytes": len(fast_json),
+        "msgpack_bytes": len(packed),
+        "json_gzip_bytes": len(responses.compress(fast_json, "gzip")),
+        "msgpack_gzip_bytes": len(responses.compress(packed, "gzip")),
+    }
+    if responses.brotli is not None:
+        result["json_br_bytes"] = len(responses.compress(fast_json, "br"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    payloads = {
+        "/reservations": _reservations(args.rows),
+        "/incomes": _incomes(args.rows),
+        "/financial-dashboard": _financial_dashboard(args.rows),
+    }
+
+    for name, payload in payloads.items():
+        r = bench(name, payload, args.repeat)
+        saved = 100 * (1 - r["json_gzip_bytes"] / r["baseline_bytes"])
+        print(f"🔹 {name} ({args.rows} linhas)")
+        print(f"   serialização: padrão {r['baseline_ms']} ms | json rápido {r['json_ms']} ms | msgpack {r['msgpack_ms']} ms")
+        print(f"   bytes: padrão {r['baseline_bytes']} | msgpack {r['msgpack_bytes']} | "
+              f"json+gzip {r['json_gzip_bytes']} | msgpack+gzip {r['msgpack_gzip_bytes']}"
+              + (f" | json+br {r['json_br_bytes']}" if "json_br_bytes" in r else ""))
+        print(f"   economia com json+gzip: {saved:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
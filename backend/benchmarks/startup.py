@@ -0,0 +1,91 @@
+"""
+Benchmark de cold start da API.
+
+Mede, em processos Python novos, o tempo para importar `app.main` e a
+memória residente (RSS máximo) antes da primeira requisição. Também lista
+quais dependências pesadas foram carregadas no import — com a
+inicialização tardia nenhuma delas deve aparecer.
+
+Uso (dentro de backend/):
+    python -m benchmarks.startup            # 5 rodadas
+    python -m benchmarks.startup --runs 10 --json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = [
+    "firebase_admin",
+    "google.cloud.firestore",
+    "grpc",
+    "google.generativeai",
+    "reportlab",
+    "openpyxl",
+    "numpy",
+]
+
+_PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss //= 1024  # macOS reporta em bytes
+print(json.dumps({
+    "import_seconds": elapsed,
+    "max_rss_kb": rss,
+    "heavy_loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    times = [s["import_seconds"] * 1000 for s in samples]
+    rss = [s["max_rss_kb"] / 1024 for s in samples]
+
+    result = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(times), 1),
+        "import_ms_min": round(min(times), 1),
+        "max_rss_mb_median": round(statistics.median(rss), 1),
+        "heavy_loaded": sorted({m for s in samples for m in s["heavy_loaded"]}),
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"🔹 import app.main: {result['import_ms_median']} ms (mediana de {args.runs}), "
+          f"mínimo {result['import_ms_min']} ms")
+    print(f"🔹 RSS antes da 1ª requisição: {result['max_rss_mb_median']} MB")
+    if result["heavy_loaded"]:
+        print("⚠️ Dependências pesadas carregadas no startup:", ", ".join(result["heavy_loaded"]))
+    else:
+        print("✅ Nenhuma dependência pesada carregada no startup")
+
+
+if __name__ == "__main__":
+    main()
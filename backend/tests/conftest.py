@@ -0,0 +1,23 @@
+import pytest
+
+from app.core import cache, firebase
+from app.services import analytics, availability, forecast, receivables
+
+from fakes import FakeFirestore, firestore_module
+
+
+def _reset_indexes():
+    cache.invalidate(*cache._loaders)
+    for module in (availability, analytics, receivables, forecast):
+        module.invalidate()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Troca o cliente Firestore da aplicação por um em memória (caches e índices zerados)."""
+    client = FakeFirestore()
+    monkeypatch.setattr(firebase, "_client", client)
+    monkeypatch.setattr(firebase.firestore, "_module", firestore_module())
+    _reset_indexes()
+    yield client
+    _reset_indexes()
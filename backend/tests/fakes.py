@@ -0,0 +1,388 @@
+"""
+Firestore em memória para os testes.
+
+Cobre o que a aplicação usa: documentos e subcoleções, `where`/`order_by`/
+`limit`/`select`, `collection_group`, `get_all`, lotes e transações com
+precondição `last_update_time` (transações reexecutadas quando um
+documento lido muda antes do commit), `create()` (AlreadyExists), `update()`
+(NotFound) e as sentinelas SERVER_TIMESTAMP / Increment / DELETE_FIELD.
+"""
+import copy
+import itertools
+import types
+from datetime import datetime
+
+from google.api_core import exceptions as api_exceptions
+from google.cloud import firestore as real_firestore
+
+_ids = itertools.count(1)
+
+
+def _resolve(value, old=None):
+    if value is real_firestore.SERVER_TIMESTAMP:
+        return datetime.now()
+    if isinstance(value, real_firestore.Increment):
+        return (old or 0) + value.value
+    if isinstance(value, dict):
+        return {k: _resolve(v, (old or {}).get(k) if isinstance(old, dict) else None) for k, v in value.items()}
+    return copy.deepcopy(value)
+
+
+def _get_path(data: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def _set_path(data: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    if value is real_firestore.DELETE_FIELD:
+        data.pop(parts[-1], None)
+    else:
+        data[parts[-1]] = _resolve(value, data.get(parts[-1]))
+
+
+def _merge(target: dict, updates: dict):
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif value is real_firestore.DELETE_FIELD:
+            target.pop(key, None)
+        else:
+            target[key] = _resolve(value, target.get(key))
+
+
+class WriteOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class Snapshot:
+    def __init__(self, reference, data, update_time, fields=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = copy.deepcopy(data)
+        if data is not None and fields:
+            self._data = {f: data[f] for f in fields if f in data}
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        return _get_path(self._data or {}, field)
+
+
+class DocumentReference:
+    def __init__(self, client, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def collection(self, name):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, transaction=None, field_paths=None):
+        self._client.round_trips += 1
+        return self._read(transaction, field_paths)
+
+    def _read(self, transaction=None, field_paths=None):
+        data, update_time = self._client._docs.get(self.path, (None, None))
+        if transaction is not None:
+            transaction._reads.setdefault(self.path, update_time)
+        return Snapshot(self, data, update_time, field_paths)
+
+    def set(self, data, merge=False):
+        self._client._apply([("set", self, data, {"merge": merge})])
+
+    def create(self, data):
+        self._client._apply([("create", self, data, {})])
+
+    def update(self, data, option=None):
+        self._client._apply([("update", self, data, {"option": option})])
+
+    def delete(self, option=None):
+        self._client._apply([("delete", self, None, {"option": option})])
+
+
+class Query:
+    def __init__(self, client, path, group=False, filters=(), orders=(), limit=None,
+                 offset=0, fields=None, after=None):
+        self._client = client
+        self._path = path
+        self._group = group
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit
+        self._offset = offset
+        self._fields = fields
+        self._after = after
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, orders=self._orders, limit=self._limit, offset=self._offset,
+                     fields=self._fields, after=self._after) | changes
+        return Query(self._client, self._path, self._group, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + [(field, direction)])
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, count):
+        return self._copy(offset=count)
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def start_after(self, snapshot_or_values):
+        return self._copy(after=snapshot_or_values)
+
+    def _matches(self, data):
+        for field, op, value in self._filters:
+            current = self._field(data, field)
+            if isinstance(value, DocumentReference):
+                value = value.id
+            if op == "==" and current != value:
+                return False
+            if op == "!=" and current == value:
+                return False
+            if op in ("<", "<=", ">", ">=") and (current is None or not _compare(current, op, value)):
+                return False
+            if op == "in" and current not in value:
+                return False
+            if op == "array_contains" and value not in (current or []):
+                return False
+        return True
+
+    @staticmethod
+    def _field(data, field):
+        if field == "__name__":
+            return data.get("__name__")
+        return _get_path(data, str(field))
+
+    def _candidates(self):
+        depth = self._path.count("/")
+        for path, (data, update_time) in sorted(self._client._docs.items()):
+            parent, _, doc_id = path.rpartition("/")
+            if self._group:
+                if parent.rsplit("/", 1)[-1] != self._path:
+                    continue
+            elif parent != self._path or path.count("/") != depth + 1:
+                continue
+            yield DocumentReference(self._client, path), data, update_time
+
+    def stream(self, transaction=None):
+        rows = [(ref, data, t) for ref, data, t in self._candidates()
+                if self._matches(data | {"__name__": ref.id})]
+        for field, direction in reversed(self._orders):
+            descending = str(direction).upper().startswith("DESC")
+            rows.sort(key=lambda r: (self._field(r[1] | {"__name__": r[0].id}, field) is None,
+                                     self._field(r[1] | {"__name__": r[0].id}, field)),
+                      reverse=descending)
+        if self._after is not None:
+            after_id = self._after.id if isinstance(self._after, (Snapshot, DocumentReference)) else None
+            if after_id is not None:
+                ids = [ref.id for ref, _, _ in rows]
+                rows = rows[ids.index(after_id) + 1:] if after_id in ids else rows
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        for ref, data, update_time in rows:
+            yield Snapshot(ref, data, update_time, self._fields)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+def _compare(current, op, value):
+    try:
+        return {"<": current < value, "<=": current <= value, ">": current > value, ">=": current >= value}[op]
+    except TypeError:
+        return False
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        if "/" not in self._path:
+            return None
+        return DocumentReference(self._client, self._path.rsplit("/", 1)[0])
+
+    def document(self, doc_id=None):
+        return DocumentReference(self._client, f"{self._path}/{doc_id or f'auto{next(_ids)}'}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def list_documents(self):
+        return [ref for ref, _, _ in self._candidates()]
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(("set", ref, data, {"merge": merge}))
+
+    def create(self, ref, data):
+        self._ops.append(("create", ref, data, {}))
+
+    def update(self, ref, data, option=None):
+        self._ops.append(("update", ref, data, {"option": option}))
+
+    def delete(self, ref, option=None):
+        self._ops.append(("delete", ref, None, {"option": option}))
+
+    def commit(self):
+        ops, self._ops = self._ops, []
+        self._client._apply(ops, getattr(self, "_reads", None))
+        self._client.commits += 1
+        return []
+
+    def __len__(self):
+        return len(self._ops)
+
+
+class Transaction(WriteBatch):
+    """
+    Lote com leituras registradas: se um documento lido mudou antes do
+    commit, falha com Aborted e `transactional` reexecuta (como o Firestore).
+    """
+    id = b"fake"
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._reads = {}  # caminho -> update_time visto
+
+    def _reset(self):
+        self._ops, self._reads = [], {}
+
+
+class FakeFirestore:
+    def __init__(self):
+        self._docs = {}  # caminho -> (dados, update_time)
+        self._clock = itertools.count(1)
+        self.commits = 0
+        self.round_trips = 0  # leituras de documento (get / get_all) enviadas ao servidor
+        self.before_commit = None  # gancho para simular escritas concorrentes
+
+    # ---------------- API do cliente ----------------
+    def collection(self, path):
+        return CollectionReference(self, path)
+
+    def document(self, path):
+        return DocumentReference(self, path)
+
+    def collection_group(self, name):
+        return Query(self, name, group=True)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, **_):
+        return Transaction(self)
+
+    def get_all(self, refs, field_paths=None, transaction=None):
+        self.round_trips += 1
+        return [ref._read(transaction, field_paths) for ref in refs]
+
+    @staticmethod
+    def write_option(last_update_time=None):
+        return WriteOption(last_update_time)
+
+    # ---------------- utilidades dos testes ----------------
+    def put(self, path, data):
+        self._docs[path] = (copy.deepcopy(data), next(self._clock))
+
+    def data(self, path):
+        entry = self._docs.get(path)
+        return copy.deepcopy(entry[0]) if entry else None
+
+    def paths(self, prefix=""):
+        return sorted(p for p in self._docs if p.startswith(prefix))
+
+    # ---------------- escrita atômica ----------------
+    def _apply(self, ops, reads=None):
+        if self.before_commit:
+            hook, self.before_commit = self.before_commit, None
+            hook()
+        for path, seen in (reads or {}).items():
+            if self._docs.get(path, (None, None))[1] != seen:
+                raise api_exceptions.Aborted(f"{path} mudou durante a transação")
+        for kind, ref, _, opts in ops:
+            current = self._docs.get(ref.path)
+            if kind == "create" and current is not None:
+                raise api_exceptions.AlreadyExists(f"{ref.path} já existe")
+            if kind == "update" and current is None:
+                raise api_exceptions.NotFound(f"{ref.path} não existe")
+            option = opts.get("option")
+            if option is not None and (current is None or current[1] != option.last_update_time):
+                raise api_exceptions.FailedPrecondition(f"{ref.path} foi alterado")
+
+        for kind, ref, data, opts in ops:
+            now = next(self._clock)
+            current = copy.deepcopy(self._docs.get(ref.path, (None, None))[0])
+            if kind == "delete":
+                self._docs.pop(ref.path, None)
+                continue
+            if kind == "update":
+                for field, value in data.items():
+                    _set_path(current, field, value)
+            elif kind == "set" and opts.get("merge") and current is not None:
+                _merge(current, data)
+            else:
+                current = {}
+                _merge(current, data)
+            self._docs[ref.path] = (current, now)
+
+
+def transactional(fn, max_attempts=5):
+    """Substituto de `firestore.transactional`: executa, faz o commit e reexecuta se houve disputa."""
+    def run(transaction, *args, **kwargs):
+        for attempt in range(max_attempts):
+            transaction._reset()
+            result = fn(transaction, *args, **kwargs)
+            try:
+                transaction.commit()
+                return result
+            except api_exceptions.Aborted:
+                if attempt == max_attempts - 1:
+                    raise
+    return run
+
+
+class _FakeModule(types.SimpleNamespace):
+    def __getattr__(self, name):
+        return getattr(real_firestore, name)
+
+
+def firestore_module():
+    """`google.cloud.firestore` com `transactional` trocado pelo da transação falsa."""
+    return _FakeModule(transactional=transactional)
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from app.core import events, versions
+from app.services import bulk_import, financial_rollups, income_index
+
+PAST = date.today() - timedelta(days=400)
+
+
+def _write_csv(tmp_path, rows):
+    path = tmp_path / "reservas.csv"
+    lines = ["quarto,entrada,saida,hospede,valor,statuspagamento"] + [",".join(r) for r in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _import(path):
+    since = events._seq
+    result = list(bulk_import.run_import("reservations", path, "csv"))
+    published = [e for e in events._buffer if e.seq > since]
+    return result, published
+
+
+def test_import_stages_rollups_income_and_events(fake_db, tmp_path):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    check_in, check_out = PAST, PAST + timedelta(days=2)
+    path = _write_csv(tmp_path, [("101", check_in.isoformat(), check_out.isoformat(), "Ana", "300", "pago")])
+    version = versions.current("reservations")["reservations"]
+
+    _, published = _import(path)
+
+    res_id = fake_db.paths("reservations/")[0].rsplit("/", 1)[1]
+    month = financial_rollups.month_key(check_out.isoformat())
+    assert fake_db.data(f"{financial_rollups.COLLECTION}/{month}")["revenueCents"] == 30000
+    assert fake_db.data(f"{income_index.COLLECTION}/{income_index.legacy_fingerprint(res_id)}")["amountCents"] == 30000
+    assert [(e.type, e.data.get("action")) for e in published] == [("import", "finished")]
+    assert published[0].data == {"kind": "reservations", "action": "finished", "written": 1}
+    assert versions.current("reservations")["reservations"] > version
+
+
+def test_reimport_does_not_double_count(fake_db, tmp_path):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    check_in, check_out = PAST, PAST + timedelta(days=2)
+    month = financial_rollups.month_key(check_out.isoformat())
+
+    _import(_write_csv(tmp_path, [("101", check_in.isoformat(), check_out.isoformat(), "Ana", "300", "pago")]))
+    _import(_write_csv(tmp_path, [("101", check_in.isoformat(), check_out.isoformat(), "Ana", "300", "pendente")]))
+
+    rollup = fake_db.data(f"{financial_rollups.COLLECTION}/{month}")
+    assert rollup["revenueCents"] == 0
+    assert rollup["receivablesCents"] == 30000
+    assert fake_db.paths(f"{income_index.COLLECTION}/") == []
+
+
+def test_finished_import_marks_indexes_stale(fake_db, tmp_path):
+    from app.services import analytics, forecast, receivables
+
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    for index in (analytics.snapshot, receivables.index, forecast.model):
+        index._stale = False
+    _import(_write_csv(tmp_path, [("101", PAST.isoformat(), (PAST + timedelta(days=1)).isoformat(), "Ana", "10", "pago")]))
+    assert all(index._stale for index in (analytics.snapshot, receivables.index, forecast.model))
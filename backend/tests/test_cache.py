@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from app.core import cache
+
+
+@pytest.fixture
+def entry():
+    """Entrada de teste com loader controlável."""
+    name = "test_entry"
+    state = {"value": "v1", "calls": 0, "before_return": None}
+
+    @cache.cached(name)
+    def _load():
+        state["calls"] += 1
+        value = state["value"]
+        if state["before_return"]:
+            state["before_return"]()
+        return value
+
+    yield name, state
+    cache._loaders.pop(name, None)
+    cache._entries.pop(name, None)
+    cache._invalidations.pop(name, None)
+
+
+def test_get_caches_loaded_value(entry):
+    name, state = entry
+    assert cache.get(name) == "v1"
+    state["value"] = "v2"
+    assert cache.get(name) == "v1"
+    assert state["calls"] == 1
+
+
+def test_invalidate_forces_reload(entry):
+    name, state = entry
+    cache.get(name)
+    state["value"] = "v2"
+    cache.invalidate(name)
+    assert cache.get(name) == "v2"
+
+
+def test_load_overtaken_by_invalidate_is_not_stored(entry):
+    name, state = entry
+
+    def write_during_load():
+        # a escrita acontece depois que o loader leu o valor antigo
+        state["value"] = "v2"
+        cache.invalidate(name)
+
+    state["before_return"] = write_during_load
+    assert cache.refresh(name) == "v1"
+    assert name not in cache._entries
+
+    state["before_return"] = None
+    assert cache.get(name) == "v2"
+    assert cache._entries[name][1] == "v2"
+
+
+def test_reconcile_does_not_resurrect_stale_value(entry, monkeypatch):
+    name, state = entry
+    monkeypatch.setattr(cache, "_loaders", {name: cache._loaders[name]})
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    state["before_return"] = block
+    worker = threading.Thread(target=cache.reconcile)
+    worker.start()
+    started.wait(5)
+    cache.invalidate(name)
+    release.set()
+    worker.join(5)
+
+    assert name not in cache._entries
+
+
+def test_snapshot_only_contains_stored_entries(entry, tmp_path):
+    name, state = entry
+    state["before_return"] = lambda: cache.invalidate(name)
+    cache.refresh(name)
+    path = str(tmp_path / "snap.json.gz")
+    cache.write_snapshot(path)
+    cache._entries.pop(name, None)
+    assert name not in cache.load_snapshot(path)
@@ -0,0 +1,59 @@
+from datetime import date
+
+from app.services import expense_analytics
+
+
+def _setup(fake_db, budgets=None):
+    fake_db.put("settings/main", {"expenseBudgets": budgets or {}})
+    fake_db.put("financial_monthly/2025-01", {"month": "2025-01", "expensesCents": 10000,
+                                              "expensesByCategory": {"Limpeza": 10000}})
+    fake_db.put("financial_monthly/2025-02", {"month": "2025-02", "expensesCents": 30000,
+                                              "expensesByCategory": {"Limpeza": 5000, "Manutenção": 25000}})
+    fake_db.put("financial_monthly/2025-03", {"month": "2025-03", "expensesCents": 40000,
+                                              "expensesByCategory": {"Manutenção": 40000}})
+
+
+def test_budgets_ignore_invalid_values():
+    settings = {"expenseBudgets": {"Limpeza": "800,00", "Lavanderia": 0, "_total": 5000}}
+    assert expense_analytics.budgets_cents(settings) == {"Limpeza": 80000, "_total": 500000}
+
+
+def test_analyze_months_deltas_and_categories(fake_db):
+    _setup(fake_db)
+    result = expense_analytics.analyze("2025-02", "2025-03", today=date(2025, 6, 1))
+
+    assert result["totalCents"] == 70000
+    assert result["monthsWithData"] == ["2025-02", "2025-03"]
+    # janeiro só entra como base da primeira variação
+    assert result["months"] == [
+        {"month": "2025-02", "cents": 30000, "delta": {"cents": 20000, "percent": 200.0}},
+        {"month": "2025-03", "cents": 40000, "delta": {"cents": 10000, "percent": 33.3}},
+    ]
+    assert [c["category"] for c in result["categories"]] == ["Manutenção", "Limpeza"]
+    maintenance = result["categories"][0]
+    assert maintenance["totalCents"] == 65000
+    assert maintenance["months"][0]["delta"] == {"cents": 25000, "percent": None}
+    assert "currentMonth" not in result
+
+
+def test_analyze_without_previous_month_has_no_first_delta(fake_db):
+    _setup(fake_db)
+    result = expense_analytics.analyze("2025-01", "2025-01", today=date(2025, 6, 1))
+    assert result["months"] == [{"month": "2025-01", "cents": 10000, "delta": None}]
+
+
+def test_current_month_projection_against_budgets(fake_db):
+    _setup(fake_db, budgets={"Manutenção": 500, "Limpeza": 100, "Lavanderia": 50, "_total": 700})
+    result = expense_analytics.analyze("2025-03", "2025-03", today=date(2025, 3, 10))
+
+    current = result["currentMonth"]
+    assert current["spentCents"] == 40000
+    assert current["projectedCents"] == round(40000 / 10 * 31)
+    assert current["status"] == "risco"
+    assert current["budgetUsedPercent"] == 57.1
+    assert current["overBudget"] == ["Manutenção"]
+
+    by_name = {c["category"]: c for c in result["categories"]}
+    assert by_name["Manutenção"]["currentMonth"]["projectedOverrunCents"] == round(40000 / 10 * 31) - 50000
+    # categoria só com orçamento também aparece
+    assert by_name["Lavanderia"]["totalCents"] == 0 and by_name["Lavanderia"]["currentMonth"]["status"] == "ok"
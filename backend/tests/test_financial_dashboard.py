@@ -0,0 +1,61 @@
+import pytest
+
+from app.api import financial_dashboard
+from app.core import singleflight
+
+
+@pytest.fixture
+def dashboard(fake_db):
+    singleflight.flights.invalidate()
+    yield lambda: financial_dashboard.get_financial_dashboard(from_month=None, to_month=None)
+    singleflight.flights.invalidate()
+
+
+def test_partially_paid_reservation_splits_received_and_balance(fake_db, dashboard):
+    fake_db.put("reservations/a", {"guestName": "Ana", "value": 1000, "amountReceived": 300, "ledger": True,
+                                   "balanceDueCents": 70000, "paymentStatus": "parcial",
+                                   "paymentMethod": "PIX", "checkOut": "2025-03-05"})
+    fake_db.put("reservations/b", {"guestName": "Bia", "value": 200, "paymentStatus": "pago",
+                                   "paymentMethod": "Dinheiro", "checkOut": "2025-03-06"})
+
+    result = dashboard()
+    assert result["kpis"]["grossRevenue"] == "R$ 500,00"
+    assert result["kpis"]["receivables"] == "R$ 700,00"
+    assert {m["method"]: m["amount"] for m in result["paymentOverview"]} == {
+        "PIX": "R$ 300,00", "Dinheiro": "R$ 200,00",
+    }
+    entries = {e["id"]: e for e in result["receivablesGeneral"]}
+    assert (entries["a"]["status"], entries["a"]["amount"]) == ("Em aberto", "R$ 700,00")
+
+
+def test_legacy_pending_reservation_without_ledger(fake_db, dashboard):
+    fake_db.put("reservations/a", {"guestName": "Ana", "value": "500,00", "amountReceived": 100,
+                                   "paymentStatus": "pendente", "checkOut": "2025-03-05"})
+    result = dashboard()
+    assert result["kpis"]["grossRevenue"] == "R$ 100,00"
+    assert result["kpis"]["receivables"] == "R$ 400,00"
+
+
+def test_period_reads_closed_days_from_cash_close(fake_db):
+    # Dia 03 fechado; o pagamento foi editado depois e não pode mudar o passado
+    fake_db.put("cash_close/2025-03-03", {"date": "2025-03-03", "revenueCents": 20000,
+                                          "revenueByMethod": {"PIX": 20000}, "expensesCents": 5000,
+                                          "expensesByCategory": {"Limpeza": 5000}, "netCents": 15000})
+    fake_db.put("reservations/a/payments/p1", {"reservationId": "a", "paidOn": "2025-03-03",
+                                               "method": "PIX", "amountCents": 99900})
+    # Dia 04 ainda aberto: calculado a partir das coleções
+    fake_db.put("reservations/a/payments/p2", {"reservationId": "a", "paidOn": "2025-03-04",
+                                               "method": "Dinheiro", "amountCents": 10000})
+    fake_db.put("expenses/e1", {"date": "2025-03-04", "amount": 30, "category": "Limpeza"})
+
+    singleflight.flights.invalidate()
+    result = financial_dashboard.get_financial_dashboard(from_month="2025-03", to_month="2025-03")
+
+    assert result["period"] == {"from": "2025-03", "to": "2025-03", "closedDays": 1, "openDays": 30}
+    assert result["kpis"]["grossRevenue"] == "R$ 300,00"
+    assert result["kpis"]["expenses"] == "R$ 80,00"
+    assert result["kpis"]["estimatedProfit"] == "R$ 220,00"
+    assert {m["method"]: m["amount"] for m in result["paymentOverview"]} == {
+        "PIX": "R$ 200,00", "Dinheiro": "R$ 100,00",
+    }
+    assert result["expensesByCategory"] == [{"category": "Limpeza", "amount": "R$ 80,00"}]
@@ -0,0 +1,75 @@
+from app.services import financial_rollups as fr
+
+PATH = "financial_monthly/2025-03"
+
+
+def test_month_helpers():
+    assert fr.month_key("2025-03-10T12:00:00") == "2025-03"
+    assert fr.month_key("10/03/2025") is None
+    assert fr.months_between("2024-11", "2025-02") == ["2024-11", "2024-12", "2025-01", "2025-02"]
+
+
+def test_paid_reservation_counts_revenue_in_payment_month():
+    contribution = fr.reservation_contribution({
+        "paymentStatus": "pago", "value": 300, "paidOn": "2025-02-28", "checkOut": "2025-03-02",
+        "paymentMethod": "Pix",
+    })
+    assert dict(contribution) == {
+        ("2025-02", ("revenueCents",)): 30000,
+        ("2025-02", ("reservationRevenueCents",)): 30000,
+        ("2025-02", ("revenueByMethod", "Pix")): 30000,
+        ("2025-02", ("profitCents",)): 30000,
+    }
+
+
+def test_open_reservation_counts_receivable_in_checkout_month():
+    contribution = fr.reservation_contribution({"value": "250,00", "amountReceived": 50, "checkOut": "2025-03-05"})
+    assert dict(contribution) == {("2025-03", ("receivablesCents",)): 20000, ("2025-03", ("receivablesCount",)): 1}
+
+
+def test_ledger_and_canceled_reservations():
+    # com livro, a receita vem dos lançamentos; só o saldo conta pela reserva
+    ledger = {"paymentStatus": "pago", "ledger": True, "value": 100, "amountReceived": 100, "checkOut": "2025-03-05"}
+    assert dict(fr.reservation_contribution(ledger)) == {}
+    assert dict(fr.reservation_contribution({"status": "cancelada", "value": 100, "checkOut": "2025-03-05"})) == {}
+    assert dict(fr.reservation_contribution(None)) == {}
+
+
+def test_payment_income_and_expense_contributions():
+    assert fr.payment_contribution({"paidOn": "2025-03-01", "amountCents": -5000, "method": "Pix"})[
+        ("2025-03", ("revenueCents",))] == -5000
+    assert dict(fr.income_contribution({"date": "2025-03-01", "amount": 10, "duplicateOf": "x"})) == {}
+    assert fr.income_contribution({"date": "2025-03-01", "amount": "10,50"})[
+        ("2025-03", ("manualIncomeCents",))] == 1050
+    expense = fr.expense_contribution({"date": "2025-03-01", "amount": 40, "category": "Limpeza"})
+    assert expense[("2025-03", ("expensesByCategory", "Limpeza"))] == 4000
+    assert expense[("2025-03", ("profitCents",))] == -4000
+
+
+def test_stage_change_applies_only_the_difference(fake_db):
+    before = {"value": 300, "checkOut": "2025-03-05"}
+    after = before | {"paymentStatus": "pago", "paidOn": "2025-03-04"}
+
+    batch = fake_db.batch()
+    assert fr.stage_change(batch, "reservations", None, before) == ["2025-03"]
+    batch.commit()
+    batch = fake_db.batch()
+    fr.stage_change(batch, "reservations", before, after)
+    batch.commit()
+
+    doc = fake_db.data(PATH)
+    assert doc["receivablesCents"] == 0 and doc["receivablesCount"] == 0
+    assert doc["revenueCents"] == 30000 and doc["revenueByMethod"] == {fr.DEFAULT_METHOD: 30000}
+
+    batch = fake_db.batch()
+    fr.stage_change(batch, "reservations", after, None)
+    batch.commit()
+    assert fake_db.data(PATH)["revenueCents"] == 0
+
+
+def test_read_period_sums_existing_months(fake_db):
+    fake_db.put("financial_monthly/2025-01", {"month": "2025-01", "revenueCents": 100, "revenueByMethod": {"Pix": 100}})
+    fake_db.put(PATH, {"month": "2025-03", "revenueCents": 50, "revenueByMethod": {"Pix": 20, "Dinheiro": 30}})
+    period = fr.read_period("2025-01", "2025-03")
+    assert period["monthsWithData"] == ["2025-01", "2025-03"]
+    assert period["totals"] == {"revenueCents": 150, "revenueByMethod": {"Pix": 120, "Dinheiro": 30}}
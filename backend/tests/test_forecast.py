@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.services import analytics, forecast
+
+TODAY = date.today()
+
+
+def iso(offset: int) -> str:
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+
+def test_fit_seasonality_weekday_factors_and_level():
+    first = date(2025, 3, 3)  # segunda-feira
+    ordinals = np.arange(first.toordinal(), first.toordinal() + 28)
+    series = np.where(analytics.Frame.weekday(ordinals) >= 5, 2.0, 1.0)  # fim de semana cheio
+
+    season = forecast.fit_seasonality(series, ordinals)
+    assert season.weekday[:5] == pytest.approx([7 / 9] * 5)
+    assert season.weekday[5:] == pytest.approx([14 / 9] * 2)
+    assert season.month == pytest.approx(np.ones(12))
+    assert season.level == pytest.approx(9 / 7)
+    assert season.factor(ordinals[5:7]) == pytest.approx([14 / 9] * 2)
+
+
+def test_fit_seasonality_without_history_is_neutral():
+    season = forecast.fit_seasonality(np.zeros(14), np.arange(738000, 738014))
+    assert season.level == 0 and list(season.weekday) == [1.0] * 7
+
+
+def test_pickup_curve_counts_nights_by_lead_time(fake_db):
+    fake_db.put("rooms/101", {"number": "101"})
+    # 1 noite, reservada 3 dias antes
+    fake_db.put("reservations/a", {"roomId": "101", "checkIn": iso(-5), "checkOut": iso(-4), "createdAt": iso(-8)})
+    curve = forecast.pickup_curve(analytics.snapshot.frame(), TODAY - timedelta(days=10), TODAY)
+    assert len(curve) == forecast.HORIZON_DAYS + 1
+    assert curve[3] == 0 and curve[4] == pytest.approx(0.1) and curve[-1] == pytest.approx(0.1)
+
+
+def test_forecast_includes_reservations_on_the_books(fake_db):
+    fake_db.put("rooms/101", {"number": "101"})
+    fake_db.put("rooms/102", {"number": "102"})
+    fake_db.put("reservations/a", {"roomId": "101", "checkIn": iso(1), "checkOut": iso(4), "value": 300,
+                                   "createdAt": iso(0)})
+
+    result = forecast.model.current()
+    assert result["from"] == TODAY.isoformat() and result["rooms"] == 2
+    assert len(result["days"]) == forecast.HORIZON_DAYS
+    day = result["days"][1]
+    assert (day["onTheBooks"], day["occupied"], day["occupancy"]) == (1, 1.0, 0.5)
+    assert day["onTheBooksRevenueCents"] == 10000
+    assert result["days"][0]["onTheBooks"] == 0 and result["days"][4]["onTheBooks"] == 0
+    assert forecast.model.current() is result
@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from app.services import kpis
+
+FIRST, LAST = date(2025, 3, 1), date(2025, 3, 10)
+
+
+@pytest.fixture
+def hotel(fake_db):
+    fake_db.put("rooms/101", {"number": "101", "type": "Casal"})
+    fake_db.put("rooms/102", {"number": "102", "type": "Casal"})
+    fake_db.put("reservations/a", {"roomId": "101", "checkIn": "2025-03-01", "checkOut": "2025-03-05",
+                                   "value": 400, "createdAt": "2025-02-20", "status": "finalizada"})
+    # 4 noites, 3 dentro do período: receita rateada
+    fake_db.put("reservations/b", {"roomId": "102", "checkIn": "2025-03-08", "checkOut": "2025-03-12",
+                                   "value": 800, "createdAt": "2025-03-07"})
+    fake_db.put("reservations/c", {"roomId": "101", "checkIn": "2025-03-06", "checkOut": "2025-03-08",
+                                   "value": 200, "createdAt": "2025-03-01", "status": "cancelada"})
+    return fake_db
+
+
+def test_property_kpis(hotel):
+    result = kpis.compute(FIRST, LAST)
+    assert result["days"] == 10 and result["rooms"] == 2
+    prop = result["property"]
+    assert {k: v for k, v in prop.items() if k != "occupancyByNight"} == {
+        "availableNights": 20,
+        "soldNights": 7,
+        "revenueCents": 100000,
+        "occupancy": 0.35,
+        "adrCents": 14286,
+        "revparCents": 5000,
+        "arrivals": 2,
+        "averageLengthOfStay": 4.0,
+        "averageLeadTimeDays": 5.0,
+        "cancellationRate": 0.3333,
+    }
+    nightly = {n["date"]: n["occupancy"] for n in prop["occupancyByNight"]}
+    assert nightly["2025-03-01"] == 0.5 and nightly["2025-03-06"] == 0.0 and nightly["2025-03-09"] == 0.5
+
+
+def test_kpis_by_room_and_trend(hotel):
+    result = kpis.compute(FIRST, LAST, trend=True)
+    rooms = {r["roomKey"]: r for r in result["byRoom"]}
+    assert rooms["101"]["soldNights"] == 4 and rooms["101"]["occupancy"] == 0.4
+    assert rooms["102"]["revenueCents"] == 60000 and rooms["102"]["cancellationRate"] == 0.0
+    assert [t["month"] for t in result["trend"]] == ["2025-03"]
+    assert result["trend"][0]["soldNights"] == 7
+
+
+def test_empty_period_has_no_ratios(fake_db):
+    fake_db.put("rooms/101", {"number": "101"})
+    prop = kpis.compute(FIRST, LAST)["property"]
+    assert prop["soldNights"] == 0 and prop["adrCents"] is None and prop["cancellationRate"] is None
+    assert prop["revparCents"] == 0
+
+
+def test_cached_reuses_result_until_generation_changes(hotel):
+    first = kpis.cached(FIRST, LAST)
+    assert kpis.cached(FIRST, LAST) is first
+    from app.services import analytics
+    analytics.invalidate()
+    assert kpis.cached(FIRST, LAST) is not first
+
+
+def test_by_company_resolves_name_only_reservations(fake_db):
+    fake_db.put("rooms/101", {"number": "101"})
+    fake_db.put("companies/acme", {"name": "Acme"})
+    fake_db.put("companies/acme/rooms/201", {"number": "201"})
+    fake_db.put("reservations/a", {"roomId": "101", "companyId": "acme", "checkIn": "2025-03-01",
+                                   "checkOut": "2025-03-03", "value": 200})
+    # Reserva antiga: só o nome da empresa
+    fake_db.put("reservations/b", {"roomId": "101", "companyName": " acme ", "checkIn": "2025-03-04",
+                                   "checkOut": "2025-03-07", "value": 300})
+
+    by_company = kpis.compute(FIRST, LAST)["byCompany"]
+    assert len(by_company) == 1
+    acme = by_company[0]
+    assert (acme["company"], acme["rooms"], acme["availableNights"]) == ("acme", 1, 10)
+    assert (acme["soldNights"], acme["arrivals"], acme["revparCents"]) == (5, 2, 5000)
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from app.services import migrations
+
+
+@pytest.fixture
+def counter_migration():
+    """Migração de teste que marca `migrated` e deixa ganchos por documento."""
+    hooks = {"each": None}
+
+    def transform(data, doc_id):
+        if hooks["each"]:
+            hooks["each"](doc_id)
+        return None if data.get("migrated") else {"migrated": True}
+
+    migrations.migration("test_counter", version=1, collection="things")(transform)
+    yield hooks
+    migrations._registry.pop("test_counter", None)
+
+
+def _seed(fake_db, count):
+    for i in range(count):
+        fake_db.put(f"things/{migrations.ID_ALPHABET[i]}", {"n": i})
+
+
+def test_page_size_fits_in_lease():
+    assert migrations.page_size(None) == migrations.PAGE_SIZE
+    assert migrations.page_size(1.0) == migrations.LEASE_SECONDS // 3
+    assert migrations.page_size(0.001) == 1
+
+
+def test_run_updates_all_documents_and_checkpoints(fake_db, counter_migration, monkeypatch):
+    monkeypatch.setattr(migrations, "PAGE_SIZE", 2)
+    _seed(fake_db, 5)
+    result = migrations.run("test_counter", partitions=2)
+
+    assert result["status"] == "done" and result["leaseUntil"] is None
+    assert all(fake_db.data(p)["migrated"] for p in fake_db.paths("things/"))
+    parts = result["partitions"].values()
+    assert all(p["done"] for p in parts)
+    assert sum(p["updated"] for p in parts) == 5
+
+
+def test_checkpoint_is_not_written_after_lease_is_taken(fake_db, counter_migration, monkeypatch):
+    monkeypatch.setattr(migrations, "PAGE_SIZE", 2)
+    _seed(fake_db, 5)
+    ckpt = "_migrations/test_counter"
+
+    def take_over(doc_id):
+        # outra instância reivindica o lease vencido no meio da primeira página
+        state = fake_db.data(ckpt)
+        fake_db.put(ckpt, state | {"owner": "other"})
+        counter_migration["each"] = None
+
+    counter_migration["each"] = take_over
+    with pytest.raises(migrations.LeaseLost):
+        migrations.run("test_counter", partitions=1)
+
+    state = fake_db.data(ckpt)
+    assert state["owner"] == "other" and state["status"] == "running"
+    assert state["partitions"]["p0"]["cursor"] is None
+
+
+def test_lease_is_renewed_during_slow_pages(fake_db, counter_migration, monkeypatch):
+    monkeypatch.setattr(migrations, "LEASE_SECONDS", 0.3)
+    _seed(fake_db, 3)
+    seen = []
+
+    def slow(doc_id):
+        seen.append(fake_db.data("_migrations/test_counter")["leaseUntil"])
+        time.sleep(0.15)
+
+    counter_migration["each"] = slow
+    migrations.run("test_counter", partitions=1)
+    # uma única página de 3 documentos: só a thread de lease pode ter renovado
+    assert seen[-1] > seen[0]
+
+
+def test_start_rejects_lease_held_by_another_instance(fake_db, counter_migration):
+    from datetime import datetime, timedelta, timezone
+    from fastapi import HTTPException
+
+    _seed(fake_db, 2)
+    fake_db.put("_migrations/test_counter", {"status": "running", "owner": "other",
+                                             "leaseUntil": datetime.now(timezone.utc) + timedelta(minutes=1)})
+    with pytest.raises(HTTPException) as exc:
+        migrations.start("test_counter", partitions=1)
+    assert exc.value.status_code == 409
+    assert "test_counter" not in migrations._running
+
+
+def test_start_records_thread_failure_in_checkpoint(fake_db, counter_migration):
+    _seed(fake_db, 2)
+
+    def boom(doc_id):
+        raise ValueError("documento inválido")
+
+    counter_migration["each"] = boom
+    assert migrations.start("test_counter", partitions=1) is True
+    thread = migrations._running.get("test_counter")
+    if thread:
+        thread.join(timeout=5)
+
+    checkpoint = migrations.status("test_counter")["checkpoint"]
+    assert checkpoint["status"] == "failed" and checkpoint["error"] == "documento inválido"
+    assert checkpoint["leaseUntil"] is None
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.core import cache
+from app.services import rates
+
+TODAY = date.today()
+SATURDAY = 5
+
+
+def day(offset: int) -> date:
+    return TODAY + timedelta(days=offset)
+
+
+@pytest.fixture
+def hotel(fake_db):
+    fake_db.put("rooms/101", {"number": "101", "type": "Quarto Casal"})
+    fake_db.put("rooms/102", {"number": "102", "type": "Quarto Casal"})
+    fake_db.put("rooms/201", {"number": "201", "type": "Suíte"})
+    fake_db.put("settings/main", {"rates": {
+        "base": {"Quarto Casal": 200, "_default": "150,00"},
+        "weekday": [1, 1, 1, 1, 1, 1.5, 1],
+        "occupancy": [{"from": 0.6, "factor": 1.2}],
+        "companies": {"acme": {"base": {"Quarto Casal": 180}}, "beta": {"discountPercent": 10}},
+    }})
+    # 2 de 3 quartos ocupados na noite de amanhã
+    for room, res_id in (("101", "a"), ("201", "b")):
+        fake_db.put(f"reservations/{res_id}", {"roomId": room, "checkIn": day(1).isoformat(),
+                                               "checkOut": day(2).isoformat()})
+    return fake_db
+
+
+def expected(base_cents: int, d: date, occupancy_factor: float = 1.0) -> int:
+    return int(np.rint(base_cents * (1.5 if d.weekday() == SATURDAY else 1.0) * occupancy_factor))
+
+
+def test_season_factors_wrap_around_the_year():
+    days = [date(2025, 12, 14), date(2025, 12, 20), date(2026, 1, 5), date(2026, 3, 1)]
+    factors, names = rates._season_factors(days, [{"name": "Alta", "from": "12-15", "to": "02-28", "factor": 1.3},
+                                                  {"name": "ruim", "from": "x", "to": "02-28"}])
+    assert factors == [1.0, 1.3, 1.3, 1.0]
+    assert names == [None, "Alta", "Alta", None]
+
+
+def test_occupancy_factors_use_highest_matching_tier():
+    tiers = [{"from": 0.9, "factor": 1.25}, {"from": 0.7, "factor": 1.1}]
+    assert list(rates._occupancy_factors(np.array([0.2, 0.7, 0.95]), tiers)) == [1.0, 1.1, 1.25]
+
+
+def test_quote_for_room_applies_weekday_and_occupancy(hotel):
+    result = rates.quote(day(0), day(3), room_ref="102")
+    cents = [n["rateCents"] for n in result["nights"]]
+    assert cents == [expected(20000, day(0)), expected(20000, day(1), 1.2), expected(20000, day(2))]
+    assert result["nights"][1]["occupancy"] == pytest.approx(0.6667, abs=1e-4)
+    assert result["totalCents"] == sum(cents)
+    assert result["available"] is True and result["negotiated"] is False
+
+
+def test_quote_by_type_uses_default_base_and_lists_free_rooms(hotel):
+    result = rates.quote(day(1), day(2), room_type="suite")
+    assert result["nights"][0]["rateCents"] == expected(15000, day(1), 1.2)
+    assert result["freeRooms"] == []
+    assert rates.quote(day(2), day(3), room_type="Suíte")["freeRooms"][0]["key"] == "201"
+
+
+def test_company_rates(hotel):
+    fixed = rates.quote(day(0), day(2), room_ref="102", company_id="acme")
+    assert fixed["negotiated"] and [n["rateCents"] for n in fixed["nights"]] == [18000, 18000]
+    discounted = rates.quote(day(0), day(1), room_ref="102", company_id="beta")
+    assert discounted["totalCents"] == int(np.rint(expected(20000, day(0)) * 0.9))
+
+
+@pytest.mark.parametrize("kwargs, status", [
+    ({"start": day(2), "end": day(2), "room_ref": "102"}, 400),
+    ({"start": day(-1), "end": day(1), "room_ref": "102"}, 400),
+    ({"start": day(0), "end": day(1), "room_ref": "999"}, 404),
+    ({"start": day(0), "end": day(1), "room_type": "Chalé"}, 404),
+    ({"start": day(0), "end": day(1)}, 400),
+])
+def test_quote_errors(hotel, kwargs, status):
+    with pytest.raises(HTTPException) as exc:
+        rates.quote(**kwargs)
+    assert exc.value.status_code == status
+
+
+def test_batch_prices_and_availability(hotel):
+    result = rates.batch(day(0), 3, room_type="Quarto Casal")
+    rooms = {r["key"]: r for r in result["rooms"]}
+    assert set(rooms) == {"101", "102"}
+    assert rooms["101"]["free"] == [True, False, True]
+    assert rooms["102"]["rateCents"][1] == expected(20000, day(1), 1.2)
+    assert result["occupancy"][1] == pytest.approx(0.6667, abs=1e-4)
+
+
+def test_table_is_rebuilt_when_settings_change(hotel):
+    first = rates.table()
+    assert rates.table() is first
+    hotel.put("settings/main", {"rates": {"base": {"_default": 100}}})
+    cache.invalidate("settings")
+    assert rates.table() is not first
+    assert rates.quote(day(0), day(1), room_ref="102")["nights"][0]["rateCents"] == 10000
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+from app.services import reservation_model as rm
+
+
+@pytest.mark.parametrize("value, cents", [
+    (None, 0),
+    ("", 0),
+    (150, 15000),
+    (150.5, 15050),
+    (0.1 + 0.2, 30),
+    ("150,5", 15050),
+    ("1.234,50", 123450),
+    ("R$ 1.234,50", 123450),
+    ("99.90", 9990),
+    ("abc", 0),
+])
+def test_to_cents(value, cents):
+    assert rm.to_cents(value) == cents
+
+
+def test_normalize_adds_canonical_fields():
+    data = {
+        "guestName": "  Ana  ", "value": "1.200,00", "amountReceived": "200",
+        "checkIn": "2025-03-10", "checkOut": "2025-03-13T12:00:00",
+        "checkInStatus": "concluido", "paymentStatus": "pendente",
+    }
+    doc = rm.normalize(data)
+    assert doc["guestName"] == "  Ana  "  # dados originais preservados
+    assert doc | data == doc
+    assert {k: doc[k] for k in rm.canonical_fields(data)} == {
+        "displayName": "Ana",
+        "amountCents": 120000,
+        "amountReceivedCents": 20000,
+        "balanceDueCents": 100000,
+        "checkInOrd": date(2025, 3, 10).toordinal(),
+        "checkOutOrd": date(2025, 3, 13).toordinal(),
+        "nights": 3,
+        "statusCode": rm.STATUS_IN_HOUSE,
+        "paymentCode": rm.PAYMENT_PENDING,
+        "schemaVersion": rm.SCHEMA_VERSION,
+    }
+
+
+@pytest.mark.parametrize("data, status, payment, balance", [
+    ({"status": "Cancelada", "value": 100}, rm.STATUS_CANCELED, rm.PAYMENT_CANCELED, 0),
+    ({"status": "finalizada", "paymentStatus": "Pago", "value": 100}, rm.STATUS_CHECKED_OUT, rm.PAYMENT_PAID, 0),
+    # com livro de pagamentos o saldo vem do recebido, mesmo marcada como paga
+    ({"paymentStatus": "pago", "value": 100, "amountReceived": 40, "ledger": True},
+     rm.STATUS_CONFIRMED, rm.PAYMENT_PAID, 6000),
+])
+def test_normalize_status_and_balance(data, status, payment, balance):
+    doc = rm.normalize(data)
+    assert (doc["statusCode"], doc["paymentCode"], doc["balanceDueCents"]) == (status, payment, balance)
+
+
+def test_normalize_without_dates_or_name():
+    doc = rm.normalize({"totalAmount": 80})
+    assert (doc["displayName"], doc["amountCents"], doc["checkInOrd"], doc["nights"]) == ("—", 8000, None, 0)
+
+
+def test_normalize_updates_only_returns_changed_canonical_fields():
+    current = rm.normalize({"guestName": "Ana", "value": 100, "checkIn": "2025-03-10", "checkOut": "2025-03-12"})
+    updates = rm.normalize_updates(current, {"checkOut": "2025-03-14"})
+    assert updates == {"checkOut": "2025-03-14", "checkOutOrd": date(2025, 3, 14).toordinal(), "nights": 4}
+
+
+def test_readers_fall_back_for_unmigrated_documents():
+    legacy = {"companyName": "ACME", "totalAmount": "250,00", "amountReceived": "50"}
+    assert rm.display_name(legacy) == "ACME"
+    assert rm.amount(legacy) == 250.0
+    assert rm.amount_received(legacy) == 50.0
+    assert rm.balance_due(legacy) == 200.0
+    assert rm.check_in_date({"checkIn": "2025-01-02"}) == date(2025, 1, 2)
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import reservations
+from app.core import cache
+from app.services import availability
+
+
+def iso(offset: int) -> str:
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def booked(fake_db):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    fake_db.put("rooms/102", {"number": "102", "status": "disponível"})
+    fake_db.put("reservations/a", {"roomId": "101", "guestName": "Ana", "checkIn": iso(0), "checkOut": iso(2)})
+    # caches e índice já aquecidos, como num servidor em operação
+    cache.room_lookup()
+    availability.index.ensure_fresh()
+    fake_db.round_trips = 0
+    return fake_db
+
+
+def test_checkin_reads_reservation_and_room_in_one_round_trip(booked):
+    reservations.confirm_checkin("a")
+    assert booked.round_trips == 1
+    assert booked.commits == 1
+    assert booked.data("rooms/101")["status"] == "ocupado"
+    assert booked.data("reservations/a")["checkInStatus"] == "concluido"
+
+
+def test_room_changed_outside_index_falls_back_to_second_read(booked):
+    # a reserva mudou de quarto direto no Firestore e o índice ainda não sabe
+    booked.put("reservations/a", booked.data("reservations/a") | {"roomId": "102"})
+    booked.round_trips = 0
+    reservations.confirm_checkin("a")
+    assert booked.round_trips == 2
+    assert booked.data("rooms/102")["status"] == "ocupado"
+    assert booked.data("rooms/101")["status"] == "disponível"
+
+
+def test_checkin_conflicts_when_room_changes_before_commit(booked):
+    booked.before_commit = lambda: booked.put("rooms/101", {"number": "101", "status": "manutenção"})
+    with pytest.raises(HTTPException) as exc:
+        reservations.confirm_checkin("a")
+    assert exc.value.status_code == 409
+    assert booked.data("reservations/a").get("checkInStatus") is None
+
+
+def test_missing_reservation(booked):
+    with pytest.raises(HTTPException) as exc:
+        reservations.confirm_checkin("nope")
+    assert exc.value.status_code == 404
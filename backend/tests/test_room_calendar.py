@@ -0,0 +1,133 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import bulk_import, room_calendar
+
+TODAY = date.today()
+
+
+def day(offset: int) -> date:
+    return TODAY + timedelta(days=offset)
+
+
+def stay(start: int, end: int) -> dict:
+    return {"in": day(start).isoformat(), "out": day(end).isoformat()}
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (0, 3, ["a"]),     # mesmo período
+    (2, 4, ["a"]),     # começa antes da saída
+    (3, 5, []),        # entra no dia da saída (check-out e check-in no mesmo dia)
+    (-2, 0, []),       # sai no dia da entrada
+    (-1, 10, ["a", "b"]),
+])
+def test_conflicts_use_half_open_nights(start, end, expected):
+    calendar = room_calendar.RoomCalendar("101", {"a": stay(0, 3), "b": stay(5, 7)})
+    assert calendar.conflicts(day(start), day(end)) == expected
+
+
+def test_conflicts_ignore_same_reservation():
+    calendar = room_calendar.RoomCalendar("101", {"a": stay(0, 3)})
+    assert calendar.conflicts(day(1), day(2), ignore="a") == []
+
+
+def test_stage_prunes_old_stays(fake_db):
+    calendar = room_calendar.RoomCalendar("101", {"old": stay(-60, -50), "new": stay(1, 2)})
+    batch = fake_db.batch()
+    calendar.stage(batch)
+    batch.commit()
+    assert list(fake_db.data("room_calendars/101")["stays"]) == ["new"]
+
+
+def test_reserve_rejects_overlap(fake_db):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    fake_db.put("room_calendars/101", {"roomKey": "101", "stays": {"a": stay(0, 3)}})
+    with pytest.raises(HTTPException) as exc:
+        room_calendar.reserve(fake_db.transaction(), "101", "b", day(2), day(4))
+    assert exc.value.status_code == 409
+    assert exc.value.detail["conflicts"] == ["a"]
+
+
+def test_rebuild_keeps_stays_written_after_index_was_built(fake_db):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    fake_db.put("reservations/a", {"roomId": "101", "checkIn": day(0).isoformat(), "checkOut": day(2).isoformat()})
+    fake_db.put("reservations/gone", {"roomId": "101", "checkIn": day(5).isoformat(),
+                                      "checkOut": day(6).isoformat(), "status": "cancelada"})
+
+    def reserve_during_rebuild():
+        # a recepção grava uma reserva depois que o índice foi montado
+        fake_db.put("reservations/b", {"roomId": "101", "checkIn": day(3).isoformat(), "checkOut": day(4).isoformat()})
+        fake_db.put("room_calendars/101", {"roomKey": "101", "stays": {
+            "a": stay(0, 2), "b": stay(3, 4), "gone": stay(5, 6),
+        }})
+
+    fake_db.before_commit = reserve_during_rebuild
+    room_calendar.rebuild()  # primeira transação: semeia a agenda (gancho dispara aqui)
+    assert room_calendar.rebuild() == {"rooms": 1, "stays": 2}
+    assert fake_db.data("room_calendars/101")["stays"] == {"a": stay(0, 2), "b": stay(3, 4)}
+
+
+def _write_csv(tmp_path, rows):
+    path = tmp_path / "reservas.csv"
+    lines = ["quarto,entrada,saida,hospede"] + [",".join(r) for r in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_import_reserves_calendar_and_rejects_conflicting_rows(fake_db, tmp_path):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    path = _write_csv(tmp_path, [
+        ("101", day(10).isoformat(), day(12).isoformat(), "Ana"),
+        ("101", day(20).isoformat(), day(22).isoformat(), "Bia"),
+    ])
+
+    def reserve_during_import():
+        # reserva feita pela recepção enquanto o arquivo era lido
+        fake_db.put("room_calendars/101", {"roomKey": "101", "stays": {"walkin": stay(21, 23)}})
+
+    fake_db.before_commit = reserve_during_import
+    events = list(bulk_import.run_import("reservations", path, "csv"))
+
+    errors = [e for e in events if e["type"] == "error"]
+    assert [e["row"] for e in errors] == [3]
+    assert "walkin" in errors[0]["errors"][0]["message"]
+    summary = events[-1]
+    assert summary["queued"] == 2 and summary["rejected"] == 1
+
+    stays = fake_db.data("room_calendars/101")["stays"]
+    assert set(stays) == {"walkin", next(iter(p.rsplit("/", 1)[1] for p in fake_db.paths("reservations/")))}
+    assert len(fake_db.paths("reservations/")) == 1
+
+
+def test_import_dry_run_writes_nothing(fake_db, tmp_path):
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    path = _write_csv(tmp_path, [("101", day(10).isoformat(), day(12).isoformat(), "Ana")])
+    events = list(bulk_import.run_import("reservations", path, "csv", dry_run=True))
+    assert [e["type"] for e in events] == ["summary"]
+    assert fake_db.paths("reservations/") == []
+    assert fake_db.paths("room_calendars/") == []
+
+
+def test_checkin_resolves_calendar_key_once_across_retries(fake_db, monkeypatch):
+    from app.api import rooms
+
+    fake_db.put("rooms/101", {"number": "101", "status": "disponível"})
+    calls = []
+    key_for = room_calendar.key_for
+    monkeypatch.setattr(room_calendar, "key_for", lambda ref: calls.append(ref) or key_for(ref))
+
+    # outra reserva grava a agenda durante a transação: o Firestore reexecuta o corpo
+    fake_db.before_commit = lambda: fake_db.put("room_calendars/101", {"roomKey": "101", "stays": {"x": stay(20, 22)}})
+    result = rooms.checkin_room("101", {"guestName": "Ana", "checkInDate": day(0).isoformat(),
+                                        "checkOutDate": day(2).isoformat()})
+
+    assert calls == ["101"]
+    stays = fake_db.data("room_calendars/101")["stays"]
+    assert set(stays) == {"x", result["reservationId"]}
+
+    calls.clear()
+    rooms.checkout_room("101")
+    assert calls == ["101"]
+    assert fake_db.data("rooms/101")["status"] == "disponível"
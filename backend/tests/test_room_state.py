@@ -0,0 +1,79 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services import room_state
+
+
+@pytest.mark.parametrize("current, target, expected", [
+    ("disponível", "reservado", "reservado"),
+    ("Disponivel", "OCUPADO", "ocupado"),
+    ("ocupado", "disponivel", "disponível"),
+    ("manutenção", "manutencao", "manutenção"),
+    (None, "livre", "disponível"),
+])
+def test_check_transition_accepts_valid_changes(current, target, expected):
+    assert room_state.check_transition(current, target) == expected
+
+
+@pytest.mark.parametrize("current, target", [
+    ("manutenção", "ocupado"),
+    ("manutenção", "reservado"),
+    ("ocupado", "reservado"),
+])
+def test_check_transition_rejects_invalid_changes(current, target):
+    with pytest.raises(HTTPException) as exc:
+        room_state.check_transition(current, target)
+    assert exc.value.status_code == 409
+
+
+def test_check_transition_rejects_unknown_status():
+    with pytest.raises(HTTPException) as exc:
+        room_state.check_transition("disponível", "quebrado")
+    assert exc.value.status_code == 400
+
+
+def test_room_updates_clears_guest_when_available():
+    updates = room_state.room_updates("disponível", current="ocupado")
+    assert updates == {"status": "disponível", "guest": None, "guestNotes": None, "activeReservationId": None}
+
+
+def test_set_status_validates_against_stored_document(fake_db):
+    fake_db.put("rooms/101", {"status": "manutenção"})
+    with pytest.raises(HTTPException) as exc:
+        room_state.set_status("101", "ocupado")
+    assert exc.value.status_code == 409
+    assert fake_db.data("rooms/101")["status"] == "manutenção"
+
+
+def test_set_status_fails_when_room_changes_before_commit(fake_db):
+    fake_db.put("rooms/101", {"status": "disponível"})
+    # outra recepção coloca o quarto em manutenção entre a leitura e o commit
+    fake_db.before_commit = lambda: fake_db.put("rooms/101", {"status": "manutenção"})
+    with pytest.raises(HTTPException) as exc:
+        room_state.set_status("101", "ocupado", guest="Ana")
+    assert exc.value.status_code == 409
+    assert fake_db.data("rooms/101") == {"status": "manutenção"}
+
+
+def test_set_status_writes_and_keeps_extra_fields(fake_db):
+    fake_db.put("rooms/101", {"status": "disponível", "number": "101"})
+    room_state.set_status("101", "ocupado", extra={"notes": "vista mar"}, guest="Ana")
+    assert fake_db.data("rooms/101") == {"status": "ocupado", "number": "101", "notes": "vista mar", "guest": "Ana"}
+
+
+def test_set_status_missing_room(fake_db):
+    with pytest.raises(HTTPException) as exc:
+        room_state.set_status("999", "ocupado")
+    assert exc.value.status_code == 404
+
+
+def test_set_many_validates_all_before_writing(fake_db):
+    fake_db.put("rooms/101", {"status": "disponível"})
+    fake_db.put("rooms/102", {"status": "manutenção"})
+    with pytest.raises(HTTPException) as exc:
+        room_state.set_many(["101", "102"], "ocupado")
+    assert exc.value.status_code == 409
+    assert fake_db.data("rooms/101")["status"] == "disponível"
+
+    assert room_state.set_many(["101", "101", "102"], "disponível") == ["101", "102"]
+    assert fake_db.data("rooms/102")["status"] == "disponível"
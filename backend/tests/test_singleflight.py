@@ -0,0 +1,80 @@
+import threading
+
+from app.core import singleflight, versions
+from app.core.singleflight import SingleFlight, coalesce
+
+
+def test_concurrent_calls_are_coalesced():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("r", ("r",), compute, ttl=0)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("r", ("r",), compute, ttl=0)))
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == ["ok", "ok"]
+    assert len(calls) == 1
+    assert flights.stats()["r"]["coalesced"] == 1
+
+
+def test_result_is_cached_for_ttl():
+    flights = SingleFlight()
+    values = iter(["a", "b"])
+    assert flights.do("r", ("r",), lambda: next(values), ttl=60) == "a"
+    assert flights.do("r", ("r",), lambda: next(values), ttl=60) == "a"
+    flights.invalidate("r")
+    assert flights.do("r", ("r",), lambda: next(values), ttl=60) == "b"
+
+
+def test_errors_are_not_cached():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    for _ in range(2):
+        try:
+            flights.do("r", ("r",), fail, ttl=60)
+        except ValueError:
+            pass
+    assert flights.stats()["r"]["computed"] == 2
+
+
+def test_version_bump_skips_cached_result(monkeypatch):
+    monkeypatch.setattr(singleflight, "flights", SingleFlight())
+    counter = {"n": 0}
+
+    @coalesce("test-route", ttl=60, collections=("test_collection",))
+    def route(x):
+        counter["n"] += 1
+        return counter["n"]
+
+    assert route(1) == 1
+    assert route(1) == 1
+    versions.bump("test_collection")
+    assert route(1) == 2
+    assert route(2) == 3
+    assert route(1) == 2
+
+
+def test_expired_results_are_pruned(monkeypatch):
+    flights = SingleFlight()
+    clock = {"now": 100.0}
+    monkeypatch.setattr(singleflight.time, "monotonic", lambda: clock["now"])
+    flights.do("r", ("r", 1), lambda: 1, ttl=5)
+    clock["now"] += 10
+    flights.do("r", ("r", 2), lambda: 2, ttl=5)
+    assert list(flights._results) == [("r", 2)]